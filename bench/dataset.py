@@ -0,0 +1,79 @@
+import csv
+import random
+import argparse
+from datetime import date, timedelta
+
+from src.validation import PATIENT_FIELDS
+
+# ===================== CONFIGURATION =====================
+# Valeurs et distributions proches de healthcare_dataset.csv
+FIRST_NAMES = ["Bobby", "Leslie", "Danny", "Andrew", "Adrienne", "Emily", "Edward", "Christina",
+               "Jasmine", "Christopher", "Michael", "Sarah", "David", "Jennifer", "Joshua", "Amanda"]
+LAST_NAMES = ["Jackson", "Terry", "Smith", "Watts", "Bell", "Johnson", "Edwards", "Martinez",
+              "Palmer", "Berg", "Brown", "Davis", "Miller", "Wilson", "Moore", "Taylor", "Anderson"]
+GENDERS = ["Male", "Female"]
+BLOOD_TYPES = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
+CONDITIONS = ["Arthritis", "Asthma", "Cancer", "Diabetes", "Hypertension", "Obesity"]
+INSURERS = ["Aetna", "Blue Cross", "Cigna", "Medicare", "UnitedHealthcare"]
+HOSPITAL_SUFFIXES = ["Inc", "Ltd", "Group", "PLC", "and Sons", "LLC"]
+ADMISSION_TYPES = ["Urgent", "Emergency", "Elective"]
+MEDICATIONS = ["Aspirin", "Ibuprofen", "Lipitor", "Paracetamol", "Penicillin"]
+TEST_RESULTS = ["Normal", "Abnormal", "Inconclusive"]
+FIRST_ADMISSION = date(2019, 5, 1)
+ADMISSION_DAYS = 5 * 365
+MAX_STAY_DAYS = 30
+
+
+def _random_case(rng: random.Random, text: str) -> str:
+    """Casse aléatoire comme dans le dataset d'origine ("BobBy JacksOn")"""
+    return "".join(c.upper() if rng.random() < 0.5 else c.lower() for c in text)
+
+def generate_rows(rows: int, seed: int = 42, invalid_rate: float = 0.0, doctors: int = 500, hospitals: int = 300):
+    """Lignes patient synthétiques (15 colonnes), reproductibles pour un même seed"""
+    rng = random.Random(seed)
+    doctor_names = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(doctors)]
+    hospital_names = [f"{rng.choice(LAST_NAMES)} {rng.choice(HOSPITAL_SUFFIXES)}" for _ in range(hospitals)]
+
+    for _ in range(rows):
+        admission = FIRST_ADMISSION + timedelta(days=rng.randrange(ADMISSION_DAYS))
+        discharge = admission + timedelta(days=rng.randint(1, MAX_STAY_DAYS))
+        row = {
+            "Name": _random_case(rng, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"),
+            "Age": rng.randint(13, 89),
+            "Gender": rng.choice(GENDERS),
+            "Blood Type": rng.choice(BLOOD_TYPES),
+            "Medical Condition": rng.choice(CONDITIONS),
+            "Date of Admission": admission.isoformat(),
+            "Doctor": rng.choice(doctor_names),
+            "Hospital": rng.choice(hospital_names),
+            "Insurance Provider": rng.choice(INSURERS),
+            "Billing Amount": rng.uniform(-2000, 52000),
+            "Room Number": rng.randint(101, 500),
+            "Admission Type": rng.choice(ADMISSION_TYPES),
+            "Discharge Date": discharge.isoformat(),
+            "Medication": rng.choice(MEDICATIONS),
+            "Test Results": rng.choice(TEST_RESULTS),
+        }
+        if invalid_rate and rng.random() < invalid_rate:
+            # Ligne rejetée par la validation (groupe sanguin ou date invalide)
+            row[rng.choice(["Blood Type", "Date of Admission"])] = "??"
+        yield row
+
+def generate_csv(path: str, rows: int, seed: int = 42, invalid_rate: float = 0.0) -> str:
+    """Écrit un CSV de rows patients avec les colonnes de healthcare_dataset.csv"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PATIENT_FIELDS)
+        writer.writeheader()
+        writer.writerows(generate_rows(rows, seed, invalid_rate))
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génère un dataset patient synthétique (CSV)")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    generate_csv(args.path, args.rows, args.seed, args.invalid_rate)
+    print(f"✔️ {args.rows:,} lignes écrites dans {args.path}")
@@ -0,0 +1,315 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import contextlib
+from pathlib import Path
+from datetime import datetime, timezone
+
+from bench.dataset import generate_csv, generate_rows
+
+# ===================== CONFIGURATION =====================
+ROWS = 10000
+BATCH_SIZE = 1000
+# Lectures mesurées par type de recherche (par id, par nom)
+READ_SAMPLES = 500
+# Patients ajoutés / mis à jour / supprimés par les opérations en masse
+BULK_SIZE = 1000
+EXPORT_FORMATS = ["json", "ndjson", "csv", "xlsx", "parquet", "arrow"]
+# Base dédiée : le benchmark supprime et recharge la collection
+BENCH_DB = "medical_bench"
+RSS_INTERVAL = 0.005
+
+
+# ===================== MESURES =====================
+def current_rss() -> int | None:
+    """Mémoire résidente actuelle du processus en octets (Linux : /proc/self/statm)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def max_rss() -> int:
+    """Pic de mémoire résidente depuis le démarrage du processus"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class PeakRss:
+    """Pic de mémoire résidente pendant un bloc (échantillonné dans un thread)"""
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        if self.start is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is None:
+            # Pas de /proc : pic du processus entier (majorant)
+            self.start, self.peak = 0, max_rss()
+            return
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+    def stats(self) -> dict:
+        return {"peak_rss_mb": round(self.peak / 1e6, 1), "rss_delta_mb": round((self.peak - self.start) / 1e6, 1)}
+
+def percentiles(latencies: list[float]) -> dict:
+    """Latences en millisecondes : p50 / p90 / p99 (rang le plus proche), moyenne, max"""
+    values = sorted(latencies)
+    if not values:
+        return {"count": 0}
+    rank = lambda p: values[min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))]
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(rank(50) * 1000, 3),
+        "p90_ms": round(rank(90) * 1000, 3),
+        "p99_ms": round(rank(99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+@contextlib.contextmanager
+def quiet():
+    """Coupe les affichages du pipeline pendant la mesure"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ===================== BACKEND =====================
+def use_backend(backend: str, db_name: str = BENCH_DB):
+    """
+    mongod : serveur du .env (base db_name) ; memory : mongomock en mémoire (pip install mongomock).
+    Doit être appelé avant la première connexion.
+    """
+    from src import connection
+
+    os.environ["MONGO_DB"] = db_name
+    if backend == "memory":
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock est requis pour --backend memory : pip install mongomock") from None
+        for var, value in {"MONGO_PORT": "27017", "MONGO_USER": "bench", "MONGO_PASSWORD": "bench",
+                           "MONGO_AUTH_SOURCE": "admin", "MONGO_COLLECTION": "patients"}.items():
+            os.environ.setdefault(var, value)
+        client = mongomock.MongoClient()
+        connection.MongoClient = lambda **settings: client
+    connection.close_connection()
+
+
+# ===================== SCÉNARIOS =====================
+def bench_migrate(source: str, rows: int, batch_size: int, workers: int, storage: str) -> dict:
+    from bson import encode
+    from src.migration import migrate
+    from src.connection import get_collection
+
+    results = {}
+    for mode, stream in (("batch", False), ("stream", True)):
+        with quiet(), PeakRss() as rss:
+            start = time.perf_counter()
+            ok = migrate(stream=stream, batch_size=batch_size, workers=workers, drop=True, source=source, storage=storage)
+            seconds = time.perf_counter() - start
+        inserted = get_collection().estimated_document_count()
+        results[mode] = {
+            "ok": bool(ok),
+            "rows": rows,
+            "inserted": inserted,
+            "seconds": round(seconds, 3),
+            "rows_per_s": round(rows / seconds),
+            **rss.stats(),
+        }
+
+    # Taille BSON moyenne d'un document stocké (format standard / compact)
+    sizes = [len(encode(doc)) for doc in get_collection().find()]
+    results["avg_doc_bytes"] = round(sum(sizes) / len(sizes), 1) if sizes else None
+    return results
+
+def bench_reads(samples: int, seed: int) -> dict:
+    from src.crud import read_patient, find_patients, disable_cache
+
+    disable_cache()
+    rng = random.Random(seed)
+    docs = find_patients(fields=["Name"], as_="dict")
+    picks = [rng.choice(docs) for _ in range(samples)]
+
+    results = {}
+    searches = {
+        "by_id": [doc["patient_id"] for doc in picks],
+        # Début du nom de famille (recherche par préfixe de mot, index name_tokens)
+        "by_name": [doc["Name"].split()[-1][:4] for doc in picks],
+    }
+    for kind, terms in searches.items():
+        latencies = []
+        with quiet():
+            for term in terms:
+                start = time.perf_counter()
+                read_patient(term)
+                latencies.append(time.perf_counter() - start)
+        results[kind] = percentiles(latencies)
+    return results
+
+def bench_bulk(size: int, seed: int) -> dict:
+    from src.crud import add_patients, update_patients, delete_patients
+
+    patients = list(generate_rows(size, seed + 1))
+    results = {}
+
+    start = time.perf_counter()
+    with quiet():
+        added = add_patients(patients)
+    ids = [r["patient_id"] for r in added if r["status"] == "inserted"]
+    results["add_patients"] = (time.perf_counter() - start, len(ids))
+
+    updates = {patient_id: {"Test Results": "Normal", "Room Number": 101 + i % 400} for i, patient_id in enumerate(ids)}
+    start = time.perf_counter()
+    with quiet():
+        updated = update_patients(updates)
+    results["update_patients"] = (time.perf_counter() - start, sum(r["status"] == "updated" for r in updated))
+
+    start = time.perf_counter()
+    with quiet():
+        deleted = delete_patients(ids)
+    results["delete_patients"] = (time.perf_counter() - start, sum(r["status"] == "deleted" for r in deleted))
+
+    return {
+        name: {"docs": docs, "seconds": round(seconds, 3), "docs_per_s": round(docs / seconds) if seconds else None}
+        for name, (seconds, docs) in results.items()
+    }
+
+def bench_exports(formats: list[str], directory: str) -> dict:
+    from src import export
+    from src.connection import get_collection
+
+    export.EXPORT_DIR = Path(directory)
+    collection = get_collection()
+    results = {}
+    for fmt in formats:
+        try:
+            with quiet(), PeakRss() as rss:
+                sink = export.export_all(collection, [fmt])[0]
+        except ImportError as e:
+            # Format colonne sans pyarrow : ignoré, le reste du benchmark continue
+            results[fmt] = {"skipped": str(e)}
+            continue
+        results[fmt] = {**sink.stats, **rss.stats()}
+        Path(sink.path).unlink()
+    return results
+
+
+# ===================== RAPPORT =====================
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """{"exports": {"csv": {"docs_per_s": 1}}} → {"exports.csv.docs_per_s": 1} (valeurs numériques)"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(previous: dict, current: dict):
+    """Affiche l'écart entre deux rapports (débits : plus haut = mieux, ms / Mo / s : plus bas = mieux)"""
+    old, new = flatten(previous["results"]), flatten(current["results"])
+    print(f"{'mesure':<45} {'avant':>12} {'après':>12} {'écart':>9}")
+    for name in sorted(old.keys() & new.keys()):
+        if not old[name] or name.endswith((".count", ".rows", ".docs", ".inserted", ".bytes", ".raw_bytes")):
+            continue
+        change = (new[name] - old[name]) / old[name] * 100
+        higher_is_better = name.endswith(("per_s", ".ratio"))
+        flag = "⚠️" if (change < -10 if higher_is_better else change > 10) else ""
+        print(f"{name:<45} {old[name]:>12,} {new[name]:>12,} {change:>+8.1f}% {flag}")
+
+def run(rows: int = ROWS, backend: str = "memory", source: str | None = None, batch_size: int = BATCH_SIZE,
+        workers: int = 4, read_samples: int = READ_SAMPLES, bulk_size: int = BULK_SIZE,
+        formats: list[str] = EXPORT_FORMATS, seed: int = 42, storage: str = "standard") -> dict:
+    """Lance tous les scénarios et retourne le rapport (dictionnaire sérialisable en JSON)"""
+    use_backend(backend)
+    from src import migration
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        # Le journal du benchmark ne pollue pas logs/migration_report.log
+        migration.log_dir, migration.log_file = tmp, os.path.join(tmp, "bench.log")
+        if source is None:
+            source = generate_csv(os.path.join(tmp, f"patients_{rows}.csv"), rows, seed)
+        else:
+            rows = migration.count_source_rows(source)
+
+        results = {
+            "migrate": bench_migrate(source, rows, batch_size, workers, storage),
+            "read_patient": bench_reads(read_samples, seed),
+            "bulk": bench_bulk(bulk_size, seed),
+            "exports": bench_exports(formats, tmp),
+        }
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "backend": backend,
+            "storage": storage,
+            "rows": rows,
+            "batch_size": batch_size,
+            "workers": workers,
+            "seed": seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark migration / CRUD / export")
+    parser.add_argument("--rows", type=int, default=ROWS, help="taille du dataset synthétique")
+    parser.add_argument("--source", help="fichier CSV ou Parquet existant (au lieu du dataset synthétique)")
+    parser.add_argument("--backend", choices=["memory", "mongod"], default="memory")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--reads", type=int, default=READ_SAMPLES)
+    parser.add_argument("--bulk", type=int, default=BULK_SIZE)
+    parser.add_argument("--formats", default=",".join(EXPORT_FORMATS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--storage", choices=["standard", "compact"], default="standard",
+                        help="format de stockage des documents (src/codec.py)")
+    parser.add_argument("--output", help="fichier JSON du rapport (sinon affiché)")
+    parser.add_argument("--compare", help="rapport JSON précédent à comparer")
+    args = parser.parse_args()
+
+    report = run(args.rows, args.backend, args.source, args.batch_size, args.workers,
+                 args.reads, args.bulk, args.formats.split(","), args.seed, args.storage)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✔️ Rapport écrit dans {args.output}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
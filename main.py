@@ -1,13 +1,23 @@
 from src.migration import *
 from src.crud import *
 from src.export import *
+from src.connection import get_collection
+from src.metrics import write_metrics
+import os
+
+# Rien n'est fait à l'import des modules : journal et index sont initialisés ici
+setup_logging()
 
 # ===================== EXÉCUTION =====================
 print("="*60)
 print("DÉMARRAGE DE main.py")
 print("="*60)
 
-success = migrate()
+# MIGRATION_MODE=delta : n'applique que les lignes ajoutées / modifiées / supprimées
+if os.getenv("MIGRATION_MODE", "full") == "delta":
+    success = migrate_delta()
+else:
+    success = migrate(drop=True)
 if success:    
     print("\nSuccès de la migration !")
 else:
@@ -31,8 +41,12 @@ patient = {
     "Test Results": "Stable"
 }
 
+init()
 print(add_patient(patient))
 
+# Client MongoDB partagé par la migration, le CRUD et l'export (un seul pool)
+collection = get_collection()
+
 last_patient = collection.find().sort("_id", -1).limit(1).__next__()
 id_patient = last_patient["patient_id"]
 
@@ -57,6 +71,10 @@ print("\n--- Test de recherche par nom du patient 'jackson' ---")
 read_patient("jackson")
 
 print("\n--- Exportation de la BDD au format CSV, JSON et Excel ---")
-export_json(collection)
-export_csv(collection)
-export_excel(collection)
\ No newline at end of file
+# Un seul passage sur la collection pour les 3 formats
+export_all(collection, ["json", "csv", "xlsx"])
+
+# METRICS_FILE=logs/metrics.prom (ou .json) : compteurs et latences de l'exécution
+# PROFILE_DIR=logs/profiles : profil CPU / mémoire de chaque phase (migration, export)
+if os.getenv("METRICS_FILE"):
+    print(f"Métriques écrites dans {write_metrics(os.getenv('METRICS_FILE'))}")
\ No newline at end of file
@@ -0,0 +1,173 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from .metrics import counter
+from .search import NAME_TOKENS_FIELD
+
+# ===================== CONFIGURATION =====================
+MAX_ENTRIES = 1024
+TTL_SECONDS = 60.0
+MAX_BYTES = 16 * 1024 * 1024
+
+# kind : id / name, result : hit / miss
+CACHE_REQUESTS = counter("cache_requests_total", "Lectures du cache patients par résultat")
+CACHE_EVICTIONS = counter("cache_evictions_total", "Entrées retirées du cache (LRU, expiration)")
+
+
+def estimate_size(value) -> int:
+    """Taille approximative en mémoire (dict / list / valeurs simples)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class PatientCache:
+    """
+    Cache LRU + TTL en mémoire pour les lectures de patients.
+    Clés : ("id", patient_id) ou ("name", requête normalisée, ...).
+    Borné en nombre d'entrées et en octets (estimation), compteurs hits/misses/evictions.
+    Un index inverse patient_id → clés permet d'invalider toutes les entrées
+    (par id ou par nom) qui contiennent un patient modifié.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()        # clé → (expiration, taille, valeur)
+        self.keys_by_patient = {}           # patient_id → {clés}
+        self.patient_by_doc_id = {}         # _id → patient_id (pour les change streams)
+        self.bytes = 0
+        self.lock = threading.RLock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    # ----- lecture / écriture -----
+    def get(self, key):
+        """Retourne la valeur en cache ou None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                CACHE_REQUESTS.inc(kind=key[0], result="miss")
+                return None
+            expires, _, value = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                CACHE_EVICTIONS.inc(reason="expired")
+                CACHE_REQUESTS.inc(kind=key[0], result="miss")
+                return None
+            self.entries.move_to_end(key)
+            self.counters["hits"] += 1
+            CACHE_REQUESTS.inc(kind=key[0], result="hit")
+            return [dict(doc) for doc in value]
+
+    def set(self, key, patients: list[dict]):
+        size = estimate_size(patients)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, size, [dict(doc) for doc in patients])
+            self.bytes += size
+            for doc in patients:
+                patient_id = doc.get("patient_id")
+                self.keys_by_patient.setdefault(patient_id, set()).add(key)
+                if "_id" in doc:
+                    self.patient_by_doc_id[doc["_id"]] = patient_id
+
+            # Éviction LRU tant que les bornes sont dépassées
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.counters["evictions"] += 1
+                CACHE_EVICTIONS.inc(reason="lru")
+
+    def _remove(self, key):
+        _, size, value = self.entries.pop(key)
+        self.bytes -= size
+        for doc in value:
+            keys = self.keys_by_patient.get(doc.get("patient_id"))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_patient[doc.get("patient_id")]
+                    self.patient_by_doc_id.pop(doc.get("_id"), None)
+
+    # ----- invalidation -----
+    def invalidate_patient(self, patient_id: str):
+        """Supprime toutes les entrées contenant ce patient"""
+        with self.lock:
+            for key in list(self.keys_by_patient.get(patient_id, ())):
+                if key in self.entries:
+                    self._remove(key)
+                    self.counters["invalidations"] += 1
+
+    def invalidate_doc_id(self, doc_id):
+        """Invalidation à partir d'un _id MongoDB (événements de change stream)"""
+        with self.lock:
+            patient_id = self.patient_by_doc_id.get(doc_id)
+        if patient_id is not None:
+            self.invalidate_patient(patient_id)
+
+    def invalidate_names(self):
+        """Supprime les résultats de recherche par nom (un ajout peut les compléter)"""
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == "name"]:
+                self._remove(key)
+                self.counters["invalidations"] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.keys_by_patient.clear()
+            self.patient_by_doc_id.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            }
+
+
+# ===================== INVALIDATION MULTI-PROCESSUS =====================
+def watch_invalidations(collection, cache: PatientCache) -> threading.Thread:
+    """
+    Abonnement au change stream de la collection (replica set requis) :
+    les écritures faites par d'autres processus invalident aussi ce cache.
+    """
+    def run():
+        try:
+            with collection.watch() as stream:
+                for change in stream:
+                    operation = change["operationType"]
+                    if operation == "insert":
+                        cache.invalidate_names()
+                    elif operation in ("update", "replace", "delete"):
+                        cache.invalidate_doc_id(change["documentKey"]["_id"])
+                        # Un nouveau nom peut correspondre à d'autres recherches
+                        # (name_tokens change avec le nom, quel que soit le format de stockage)
+                        updated = change.get("updateDescription", {}).get("updatedFields", {})
+                        if operation == "replace" or NAME_TOKENS_FIELD in updated:
+                            cache.invalidate_names()
+                    elif operation in ("drop", "invalidate"):
+                        cache.clear()
+        except Exception as e:
+            logging.error(f"Change stream du cache interrompu : {e}")
+            cache.clear()
+
+    thread = threading.Thread(target=run, name="patient-cache-watch", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+from .loader import META_COLLECTION
+
+# ===================== CONFIGURATION =====================
+# Date de dernière écriture (ajout, mise à jour, migration) de chaque patient
+UPDATED_AT_FIELD = "updated_at"
+# Suppressions enregistrées pour les exports incrémentaux : {patient_id, deleted_at}
+TOMBSTONE_COLLECTION = "patient_tombstones"
+# Marge de sécurité : une écriture horodatée juste avant la fin de la fenêtre
+# d'export peut n'être visible qu'un peu plus tard, elle sera dans l'export suivant
+WATERMARK_LAG = timedelta(seconds=5)
+
+
+def utc_now() -> datetime:
+    """Heure UTC tronquée à la milliseconde (précision des dates MongoDB)"""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def stamp(doc: dict, when: datetime | None = None) -> dict:
+    """Ajoute (ou met à jour) la date de dernière écriture du document"""
+    doc[UPDATED_AT_FIELD] = when or utc_now()
+    return doc
+
+
+# ===================== SUPPRESSIONS =====================
+def tombstones(collection):
+    return collection.database[TOMBSTONE_COLLECTION]
+
+def record_tombstones(collection, patient_ids, when: datetime | None = None):
+    """Trace les patient_id supprimés (lus par export_changes)"""
+    when = when or utc_now()
+    docs = [{"patient_id": patient_id, "deleted_at": when} for patient_id in patient_ids]
+    if docs:
+        tombstones(collection).insert_many(docs, ordered=False)
+
+def purge_tombstones(collection, before: datetime) -> int:
+    """Supprime les traces déjà exportées (deleted_at <= before)"""
+    return tombstones(collection).delete_many({"deleted_at": {"$lte": before}}).deleted_count
+
+
+# ===================== WATERMARK =====================
+class ExportWatermark:
+    """
+    Fin de la fenêtre du dernier export incrémental, stockée dans migration_meta.
+    Le prochain export reprend les documents avec updated_at > watermark.
+    """
+
+    def __init__(self, collection):
+        self.meta = collection.database[META_COLLECTION]
+        self.key = f"export_watermark:{collection.name}"
+
+    def load(self) -> datetime | None:
+        doc = self.meta.find_one({"_id": self.key})
+        return doc["until"] if doc else None
+
+    def save(self, until: datetime, summary: dict):
+        self.meta.replace_one({"_id": self.key}, {"until": until, **summary}, upsert=True)
+
+    def clear(self):
+        self.meta.delete_one({"_id": self.key})
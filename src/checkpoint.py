@@ -0,0 +1,70 @@
+import os
+import hashlib
+from datetime import datetime
+
+from .loader import META_COLLECTION
+
+# Taille des échantillons lus en début et fin de fichier pour l'empreinte
+FINGERPRINT_SAMPLE = 1 << 20
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Empreinte rapide du fichier source : taille + hash du premier et du dernier Mo.
+    Suffisant pour détecter un fichier remplacé sans relire des Go de données.
+    """
+    size = os.path.getsize(path)
+    sha = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        sha.update(f.read(FINGERPRINT_SAMPLE))
+        if size > FINGERPRINT_SAMPLE:
+            f.seek(max(size - FINGERPRINT_SAMPLE, FINGERPRINT_SAMPLE))
+            sha.update(f.read())
+    return sha.hexdigest()
+
+
+class CheckpointStore:
+    """
+    Point de reprise de la migration, stocké dans la collection migration_meta :
+    dernier batch validé (tous les précédents le sont aussi), position dans le fichier
+    source (octet pour un CSV, ligne pour un Parquet) et nombre de lignes déjà insérées.
+    """
+
+    def __init__(self, collection):
+        self.meta = collection.database[META_COLLECTION]
+        self.key = f"checkpoint:{collection.name}"
+
+    def load(self) -> dict | None:
+        return self.meta.find_one({"_id": self.key})
+
+    def start(self, source: str, fingerprint: str, batch_size: int):
+        """Nouveau point de reprise pour une migration complète"""
+        self.meta.replace_one(
+            {"_id": self.key},
+            {
+                "source": source,
+                "fingerprint": fingerprint,
+                "batch_size": batch_size,
+                "last_batch": 0,
+                "offset": None,
+                "rows": 0,
+                "completed": False,
+                "updated_at": datetime.now(),
+            },
+            upsert=True,
+        )
+
+    def save(self, last_batch: int, offset: int, rows: int):
+        self.meta.update_one(
+            {"_id": self.key},
+            {"$set": {"last_batch": last_batch, "offset": offset, "rows": rows, "updated_at": datetime.now()}},
+        )
+
+    def complete(self):
+        self.meta.update_one(
+            {"_id": self.key},
+            {"$set": {"completed": True, "updated_at": datetime.now()}},
+        )
+
+    def clear(self):
+        self.meta.delete_one({"_id": self.key})
@@ -0,0 +1,341 @@
+import os
+import logging
+import threading
+from decimal import Decimal, ROUND_HALF_UP
+from bson.decimal128 import Decimal128
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from .loader import META_COLLECTION
+
+# ===================== CONFIGURATION =====================
+# standard : documents avec les en-têtes du CSV ("Date of Admission"...), format historique
+# compact  : clés courtes, montants en Decimal128, valeurs répétées remplacées par un code entier
+STORAGE_MODES = ("standard", "compact")
+# Format choisi par migrate(drop=True) quand storage n'est pas précisé (STORAGE_MODE dans le .env)
+DEFAULT_STORAGE_MODE = "standard"
+STORAGE_KEY = "storage_schema"
+
+# Clés courtes du format compact (patient_id, name_tokens, updated_at et _id sont inchangés)
+SHORT_KEYS = {
+    "Name": "n",
+    "Age": "a",
+    "Gender": "g",
+    "Blood Type": "bt",
+    "Medical Condition": "mc",
+    "Date of Admission": "da",
+    "Doctor": "dr",
+    "Hospital": "h",
+    "Insurance Provider": "ip",
+    "Billing Amount": "b",
+    "Room Number": "r",
+    "Admission Type": "at",
+    "Discharge Date": "dd",
+    "Medication": "m",
+    "Test Results": "tr",
+}
+LONG_KEYS = {short: field for field, short in SHORT_KEYS.items()}
+
+# Champs à faible cardinalité stockés sous forme de code (dictionnaire partagé par la base)
+DICTIONARY_FIELDS = ["Hospital", "Doctor", "Insurance Provider", "Medication"]
+DICTIONARY_COLLECTION = "storage_dictionary"
+# Montants stockés en Decimal128 arrondis au centime (relus en float)
+DECIMAL_FIELDS = ["Billing Amount"]
+CENTS = Decimal("0.01")
+# Code d'une valeur absente du dictionnaire dans un filtre : aucun document ne correspond
+UNKNOWN_CODE = -1
+
+
+# ===================== DICTIONNAIRE DES VALEURS =====================
+class ValueDictionary:
+    """
+    Codes entiers des valeurs texte répétées, un jeu de codes par champ :
+    {_id: "<champ>:<code>", field, code, value} dans storage_dictionary.
+    Les nouveaux codes sont réservés par bloc (compteur $inc dans migration_meta) ;
+    l'index unique (field, value) départage deux processus qui ajoutent la même valeur.
+    Tout le dictionnaire est gardé en mémoire (quelques milliers de valeurs).
+    """
+
+    def __init__(self, database):
+        self.collection = database[DICTIONARY_COLLECTION]
+        self.meta = database[META_COLLECTION]
+        self.codes = {}     # (champ, valeur) → code
+        self.values = {}    # (champ, code) → valeur
+        self.lock = threading.Lock()
+        self.loaded = False
+
+    def _remember(self, doc: dict):
+        self.codes[(doc["field"], doc["value"])] = doc["code"]
+        self.values[(doc["field"], doc["code"])] = doc["value"]
+
+    def load(self):
+        if self.loaded:
+            return
+        with self.lock:
+            if not self.loaded:
+                self.collection.create_index([("field", 1), ("value", 1)], unique=True)
+                for doc in self.collection.find({}, {"field": 1, "code": 1, "value": 1}):
+                    self._remember(doc)
+                self.loaded = True
+
+    def encode(self, field: str, values) -> dict:
+        """{valeur: code} pour les valeurs données (codes créés pour les nouvelles valeurs)"""
+        self.load()
+        missing = {value for value in values if (field, value) not in self.codes}
+        if missing:
+            self._allocate(field, missing)
+        return {value: self.codes[(field, value)] for value in values}
+
+    def _allocate(self, field: str, values: set):
+        with self.lock:
+            values = sorted(value for value in values if (field, value) not in self.codes)
+            if not values:
+                return
+            counter = self.meta.find_one_and_update(
+                {"_id": f"dictionary_counter:{field}"},
+                {"$inc": {"next": len(values)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            first = counter["next"] - len(values)
+            docs = [{"_id": f"{field}:{first + i}", "field": field, "code": first + i, "value": value}
+                    for i, value in enumerate(values)]
+            try:
+                self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError:
+                pass    # valeur ajoutée au même moment par un autre processus : son code est conservé
+            for doc in self.collection.find({"field": field, "value": {"$in": values}}):
+                self._remember(doc)
+
+    def lookup(self, field: str, value):
+        """Code d'une valeur existante, sans en créer (filtres de requête)"""
+        self.load()
+        code = self.codes.get((field, value))
+        if code is None:
+            doc = self.collection.find_one({"field": field, "value": value})
+            if doc is None:
+                return None
+            self._remember(doc)
+            code = doc["code"]
+        return code
+
+    def decode(self, field: str, code):
+        value = self.values.get((field, code))
+        if value is None:
+            self.load()
+            doc = self.collection.find_one({"field": field, "code": code})
+            if doc is None:
+                logging.warning(f"Code {code} inconnu dans le dictionnaire de {field}")
+                return code
+            self._remember(doc)
+            value = doc["value"]
+        return value
+
+
+# ===================== CODECS =====================
+class StandardCodec:
+    """Format historique : documents stockés tels quels (aucune conversion)"""
+    mode = "standard"
+    identity = True
+
+    def field(self, name: str) -> str:
+        return name
+
+    def encode(self, doc: dict) -> dict:
+        return doc
+
+    def encode_many(self, docs: list[dict]) -> list[dict]:
+        return docs
+
+    def decode(self, doc: dict | None) -> dict | None:
+        return doc
+
+    def decode_many(self, docs: list[dict]) -> list[dict]:
+        return docs
+
+    def encode_query(self, query: dict | None) -> dict | None:
+        return query
+
+    def encode_projection(self, projection: dict | None) -> dict | None:
+        return projection
+
+    def encode_sort(self, sort: list | None) -> list | None:
+        return sort
+
+    def encode_value(self, field: str, value):
+        return value
+
+    def query_value(self, field: str, value):
+        return value
+
+    def decode_value(self, field: str, value):
+        return value
+
+
+class CompactCodec(StandardCodec):
+    """
+    Format compact : clés courtes (SHORT_KEYS), Decimal128 pour les montants,
+    codes entiers pour DICTIONARY_FIELDS. Les dates sont déjà des datetime (validation).
+    Les filtres sur un champ codé acceptent l'égalité, $eq/$ne, $in/$nin et $exists ;
+    un tri sur ces champs suit l'ordre des codes, pas l'ordre alphabétique.
+    """
+    mode = "compact"
+    identity = False
+
+    def __init__(self, dictionary: ValueDictionary):
+        self.dictionary = dictionary
+
+    def field(self, name: str) -> str:
+        return SHORT_KEYS.get(name, name)
+
+    # ----- Écriture -----
+    def encode(self, doc: dict) -> dict:
+        return self.encode_many([doc])[0]
+
+    def encode_many(self, docs: list[dict]) -> list[dict]:
+        """Codes de tout le lot calculés en une fois (une requête par champ pour les nouvelles valeurs)"""
+        codes = {
+            field: self.dictionary.encode(field, {doc[field] for doc in docs if isinstance(doc.get(field), str)})
+            for field in DICTIONARY_FIELDS
+        }
+        return [self._encode(doc, codes) for doc in docs]
+
+    def _encode(self, doc: dict, codes: dict) -> dict:
+        encoded = {}
+        for key, value in doc.items():
+            if key in codes and isinstance(value, str):
+                value = codes[key][value]
+            elif key in DECIMAL_FIELDS:
+                value = _to_decimal128(value)
+            encoded[SHORT_KEYS.get(key, key)] = value
+        return encoded
+
+    def encode_value(self, field: str, value):
+        if field in DICTIONARY_FIELDS and isinstance(value, str):
+            return self.dictionary.encode(field, [value])[value]
+        if field in DECIMAL_FIELDS:
+            return _to_decimal128(value)
+        return value
+
+    # ----- Lecture -----
+    def decode(self, doc: dict | None) -> dict | None:
+        if doc is None:
+            return None
+        decoded = {}
+        for key, value in doc.items():
+            field = LONG_KEYS.get(key, key)
+            decoded[field] = self.decode_value(field, value)
+        return decoded
+
+    def decode_many(self, docs: list[dict]) -> list[dict]:
+        return [self.decode(doc) for doc in docs]
+
+    def decode_value(self, field: str, value):
+        if isinstance(value, Decimal128):
+            return float(value.to_decimal())
+        if field in DICTIONARY_FIELDS and isinstance(value, int):
+            return self.dictionary.decode(field, value)
+        return value
+
+    # ----- Requêtes -----
+    def query_value(self, field: str, value):
+        if field in DICTIONARY_FIELDS and isinstance(value, str):
+            code = self.dictionary.lookup(field, value)
+            return UNKNOWN_CODE if code is None else code
+        # Montants : MongoDB compare float et Decimal128 numériquement, rien à convertir
+        return value
+
+    def encode_query(self, query: dict | None) -> dict | None:
+        if not query:
+            return query
+        encoded = {}
+        for key, value in query.items():
+            if key in ("$and", "$or", "$nor"):
+                encoded[key] = [self.encode_query(condition) for condition in value]
+            elif key.startswith("$"):
+                encoded[key] = value
+            else:
+                encoded[self.field(key)] = self._encode_condition(key, value)
+        return encoded
+
+    def _encode_condition(self, field: str, condition):
+        if field not in DICTIONARY_FIELDS:
+            return condition
+        if not isinstance(condition, dict):
+            return self.query_value(field, condition)
+        encoded = {}
+        for op, operand in condition.items():
+            if op in ("$eq", "$ne"):
+                encoded[op] = self.query_value(field, operand)
+            elif op in ("$in", "$nin"):
+                encoded[op] = [self.query_value(field, value) for value in operand]
+            elif op in ("$exists", "$type"):
+                encoded[op] = operand
+            else:
+                raise ValueError(f"Opérateur {op} non supporté sur {field} (champ codé en stockage compact)")
+        return encoded
+
+    def encode_projection(self, projection: dict | None) -> dict | None:
+        if not projection:
+            return projection
+        return {self.field(key): value for key, value in projection.items()}
+
+    def encode_sort(self, sort: list | None) -> list | None:
+        if not sort:
+            return sort
+        return [(self.field(key), direction) for key, direction in sort]
+
+
+def _to_decimal128(value):
+    """Montant → Decimal128 arrondi au centime (None / NaN / Decimal128 inchangés)"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != value:
+        return value
+    return Decimal128(Decimal(repr(float(value))).quantize(CENTS, rounding=ROUND_HALF_UP))
+
+
+# ===================== CODEC D'UNE BASE =====================
+# Le format est enregistré dans migration_meta ({_id: "storage_schema", mode}) : toutes les
+# collections patients d'une base partagent le même format et le même dictionnaire.
+# Sans enregistrement (base migrée avant le format compact) : format standard.
+_codecs = {}
+_codecs_lock = threading.Lock()
+
+def _codec_key(database) -> tuple:
+    return (id(database.client), database.name, os.getpid())
+
+def storage_mode(database) -> str:
+    doc = database[META_COLLECTION].find_one({"_id": STORAGE_KEY})
+    return doc["mode"] if doc else "standard"
+
+def database_codec(database) -> StandardCodec:
+    """Codec de la base (lu une fois par client et par processus)"""
+    key = _codec_key(database)
+    codec = _codecs.get(key)
+    if codec is None:
+        with _codecs_lock:
+            codec = _codecs.get(key)
+            if codec is None:
+                mode = storage_mode(database)
+                codec = CompactCodec(ValueDictionary(database)) if mode == "compact" else StandardCodec()
+                _codecs[key] = codec
+    return codec
+
+def get_codec(collection) -> StandardCodec:
+    return database_codec(collection.database)
+
+def default_storage_mode() -> str:
+    """STORAGE_MODE lu au moment de l'appel (le .env n'est chargé qu'à la première connexion)"""
+    return os.getenv("STORAGE_MODE", DEFAULT_STORAGE_MODE)
+
+def set_storage_mode(database, mode: str) -> StandardCodec:
+    """
+    Enregistre le format de stockage de la base (à faire sur une base vide : les documents
+    existants ne sont pas convertis). Retourne le nouveau codec.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Format de stockage inconnu : {mode} (attendu : {', '.join(STORAGE_MODES)})")
+    database[META_COLLECTION].replace_one({"_id": STORAGE_KEY}, {"mode": mode}, upsert=True)
+    with _codecs_lock:
+        _codecs.pop(_codec_key(database), None)
+    logging.info(f"Format de stockage de la base {database.name} : {mode}")
+    return database_codec(database)
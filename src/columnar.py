@@ -0,0 +1,141 @@
+import math
+from datetime import datetime
+
+from .validation import PATIENT_FIELDS, DATE_FIELDS, DATE_FORMAT
+from .changes import UPDATED_AT_FIELD
+
+# ===================== CONFIGURATION =====================
+# Lignes par row group Parquet / record batch Arrow (= documents gardés en mémoire à l'export)
+ROW_GROUP_SIZE = 10000
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+
+INTEGER_FIELDS = ["Age", "Room Number"]
+FLOAT_FIELDS = ["Billing Amount"]
+
+
+def require_pyarrow():
+    """Import différé de pyarrow (dépendance lourde, seulement utile aux formats colonnes)"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("pyarrow est requis pour les formats Parquet / Arrow : pip install pyarrow") from None
+    return pyarrow
+
+def is_parquet(path) -> bool:
+    return str(path).lower().endswith(PARQUET_EXTENSIONS)
+
+
+# ===================== SCHÉMA PATIENT =====================
+def patient_schema():
+    """Schéma fixe des exports colonnes : types conservés (dates, entiers, montants)"""
+    pa = require_pyarrow()
+    types = {field: pa.string() for field in PATIENT_FIELDS}
+    types.update({field: pa.int64() for field in INTEGER_FIELDS})
+    types.update({field: pa.float64() for field in FLOAT_FIELDS})
+    types.update({field: pa.timestamp("ms") for field in DATE_FIELDS})
+    return pa.schema([("_id", pa.string()), ("patient_id", pa.string()),
+                      *((field, types[field]) for field in PATIENT_FIELDS),
+                      (UPDATED_AT_FIELD, pa.timestamp("ms", tz="UTC"))])
+
+def _coerce(field: str, value):
+    """Valeur MongoDB → valeur compatible avec le type de la colonne (None si impossible)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if field in DATE_FIELDS or field == UPDATED_AT_FIELD:
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.strptime(str(value).strip(), DATE_FORMAT)
+        except ValueError:
+            return None
+    if field in INTEGER_FIELDS or field in FLOAT_FIELDS:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return None
+        if field in FLOAT_FIELDS:
+            return number
+        return int(number) if number.is_integer() else None
+    return str(value)
+
+class ColumnBuffer:
+    """Accumule les documents colonne par colonne et produit des record batches"""
+
+    def __init__(self):
+        self.schema = patient_schema()
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+    def append(self, doc: dict):
+        for name, values in self.columns.items():
+            values.append(_coerce(name, doc.get(name)))
+        self.rows += 1
+
+    def take(self):
+        """Record batch des lignes accumulées, buffer vidé"""
+        import pyarrow as pa
+        batch = pa.RecordBatch.from_pydict(self.columns, schema=self.schema)
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+        return batch
+
+
+# ===================== LECTURE PARQUET =====================
+def parquet_row_count(path: str) -> int:
+    """Nombre de lignes lu dans les métadonnées (sans lire les données)"""
+    require_pyarrow()
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).metadata.num_rows
+
+def parquet_columns(path: str) -> list[str]:
+    require_pyarrow()
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).schema_arrow.names
+
+def read_parquet(path: str):
+    """Fichier Parquet complet en DataFrame (colonnes patient uniquement)"""
+    require_pyarrow()
+    import pyarrow.parquet as pq
+    columns = [field for field in PATIENT_FIELDS if field in parquet_columns(path)]
+    return pq.read_table(path, columns=columns).to_pandas()
+
+def iter_parquet_chunks(path: str, chunk_size: int, offset: int = 0):
+    """
+    Lit le Parquet par blocs d'exactement chunk_size lignes à partir de la ligne offset.
+    Renvoie (DataFrame, position de fin du bloc en lignes), comme iter_csv_chunks.
+    Les row groups entièrement avant offset ne sont pas lus.
+    Seules les colonnes patient sont lues (_id / patient_id d'un export sont ignorés).
+    """
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    columns = [field for field in PATIENT_FIELDS if field in parquet.schema_arrow.names]
+
+    row_groups, skip = [], offset
+    for i in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(i).num_rows
+        if not row_groups and skip >= rows:
+            skip -= rows
+            continue
+        row_groups.append(i)
+    if not row_groups:
+        return
+
+    position = offset
+    pending = None
+    for batch in parquet.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns):
+        table = pa.Table.from_batches([batch])
+        if skip:
+            dropped = min(skip, table.num_rows)
+            table = table.slice(dropped)
+            skip -= dropped
+        pending = table if pending is None else pa.concat_tables([pending, table])
+        # Les batchs pyarrow s'arrêtent aux limites des row groups : on redécoupe
+        while pending.num_rows >= chunk_size:
+            position += chunk_size
+            yield pending.slice(0, chunk_size).to_pandas(), position
+            pending = pending.slice(chunk_size)
+    if pending is not None and pending.num_rows:
+        position += pending.num_rows
+        yield pending.to_pandas(), position
@@ -0,0 +1,104 @@
+import gzip
+import lzma
+import queue
+import threading
+from pathlib import Path
+
+# ===================== CONFIGURATION =====================
+# Suffixe ajouté à l'extension du fichier exporté
+COMPRESSIONS = {"gzip": "gz", "zstd": "zst", "xz": "xz"}
+DEFAULT_LEVELS = {"gzip": 6, "zstd": 3, "xz": 6}
+# Texte encodé regroupé en blocs avant d'être transmis au thread de compression
+BLOCK_SIZE = 1 << 20
+# Blocs en attente au maximum (mémoire bornée si la compression est plus lente que la lecture)
+QUEUE_BLOCKS = 8
+
+
+def compressed_extension(extension: str, compression: str | None) -> str:
+    """csv + gzip → csv.gz"""
+    if not compression:
+        return extension
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Compression inconnue : {compression} (choix : {', '.join(COMPRESSIONS)})")
+    return f"{extension}.{COMPRESSIONS[compression]}"
+
+def open_compressed(path: Path, compression: str, level: int | None = None):
+    """Fichier binaire compressé en écriture (zstd : dépendance optionnelle zstandard)"""
+    level = DEFAULT_LEVELS[compression] if level is None else level
+    if compression == "gzip":
+        return gzip.open(path, "wb", compresslevel=level)
+    if compression == "xz":
+        return lzma.open(path, "wb", preset=level)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard est requis pour la compression zstd : pip install zstandard") from None
+    return zstandard.ZstdCompressor(level=level).stream_writer(open(path, "wb"), closefd=True)
+
+
+# ===================== ÉCRITURE COMPRESSÉE EN ARRIÈRE-PLAN =====================
+class CompressedWriter:
+    """
+    Fichier texte compressé au fil de l'eau.
+    Le thread appelant encode le texte (et lit le curseur), un thread dédié compresse
+    et écrit les blocs : zlib / lzma / zstd libèrent le GIL, les deux travaux se recouvrent.
+    raw_bytes : taille non compressée écrite (pour le taux de compression).
+    """
+
+    def __init__(self, path: Path, compression: str, level: int | None = None,
+                 block_size: int = BLOCK_SIZE, encoding: str = "utf-8"):
+        self.file = open_compressed(path, compression, level)
+        self.encoding = encoding
+        self.block_size = block_size
+        self.queue = queue.Queue(maxsize=QUEUE_BLOCKS)
+        self.buffer = []
+        self.buffered = 0
+        self.raw_bytes = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name=f"compress-{Path(path).name}", daemon=True)
+        self.thread.start()
+
+    def write(self, text: str) -> int:
+        data = text.encode(self.encoding)
+        self.buffer.append(data)
+        self.buffered += len(data)
+        self.raw_bytes += len(data)
+        if self.buffered >= self.block_size:
+            self._push()
+        return len(text)
+
+    def _push(self):
+        if self.error:
+            raise self.error
+        self.queue.put(b"".join(self.buffer))
+        self.buffer = []
+        self.buffered = 0
+
+    def _run(self):
+        try:
+            while (block := self.queue.get()) is not None:
+                self.file.write(block)
+        except Exception as e:
+            self.error = e
+            # On vide la file pour ne pas bloquer le thread appelant
+            while self.queue.get() is not None:
+                pass
+        finally:
+            self.file.close()
+
+    def close(self):
+        try:
+            if self.buffer and self.error is None:
+                self._push()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+        if self.error:
+            raise self.error
+
+
+def open_text_output(path: Path, compression: str | None = None, level: int | None = None):
+    """Sortie texte UTF-8 : fichier classique ou CompressedWriter"""
+    if compression:
+        return CompressedWriter(path, compression, level)
+    return open(path, "w", encoding="utf-8", newline="")
@@ -1,13 +1,19 @@
 import os
+import threading
 from pymongo import MongoClient
 import logging
 from dotenv import load_dotenv
 
-# Charge les variables d'environnement depuis un fichier .env
-load_dotenv()
+from .metrics import command_listener
+
+def _env_int(name: str, default: int | None) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
 
 class MongoDBConnection:
     def __init__(self):
+        # Charge les variables d'environnement depuis un fichier .env (sans écraser celles déjà définies)
+        load_dotenv()
         self.host = os.getenv("MONGO_HOST") if os.path.exists("/.dockerenv") else "localhost"
         self.port = int(os.getenv("MONGO_PORT"))
         self.username = os.getenv("MONGO_USER")
@@ -20,21 +26,52 @@ class MongoDBConnection:
         missing = [var for var, val in vars(self).items() if val is None]
         if missing:
             raise ValueError(f"Variables manquantes dans .env : {missing}")
-        
+
+        # Réglages optionnels du pool (valeurs par défaut de pymongo si absents)
+        self.max_pool_size = _env_int("MONGO_MAX_POOL_SIZE", 100)
+        self.min_pool_size = _env_int("MONGO_MIN_POOL_SIZE", 0)
+        self.connect_timeout_ms = _env_int("MONGO_CONNECT_TIMEOUT_MS", 20000)
+        self.server_selection_timeout_ms = _env_int("MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000)
+        self.socket_timeout_ms = _env_int("MONGO_SOCKET_TIMEOUT_MS", None)
+        # Compression réseau, par ordre de préférence : "zstd,snappy,zlib"
+        # (zstd nécessite zstandard, snappy nécessite python-snappy)
+        self.compressors = os.getenv("MONGO_COMPRESSORS") or None
+        # Latence / échecs / relances de chaque commande dans src/metrics.py (MONGO_COMMAND_METRICS=0 pour désactiver)
+        self.command_metrics = os.getenv("MONGO_COMMAND_METRICS", "1") != "0"
+
         self.client = None
         self.db = None
         self.collection = None
 
+    def client_settings(self) -> dict:
+        """Paramètres complets du client (partagés par MongoClient et le client asyncio motor)"""
+        return {
+            "host": self.host,
+            "port": self.port,
+            "username": self.username,
+            "password": self.password,
+            "authSource": self.auth_source,
+            "authMechanism": "SCRAM-SHA-256",
+            **self.client_options(),
+        }
+
+    def client_options(self) -> dict:
+        options = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "socketTimeoutMS": self.socket_timeout_ms,
+        }
+        if self.compressors:
+            options["compressors"] = self.compressors
+        if self.command_metrics:
+            options["event_listeners"] = [command_listener()]
+        return options
+
     def connect(self):
         try:
-            self.client = MongoClient(
-                host=self.host,
-                port=self.port,
-                username=self.username,
-                password=self.password,
-                authSource=self.auth_source,
-                authMechanism="SCRAM-SHA-256"
-            )
+            self.client = MongoClient(**self.client_settings())
             self.client.admin.command('ping')
             print("Connexion MongoDB réussie")
             logging.info("Connexion MongoDB établie")
@@ -46,4 +83,59 @@ class MongoDBConnection:
         except Exception as e:
             print(f"Échec connexion MongoDB → {e}")
             logging.error(f"Connexion échouée : {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = self.db = self.collection = None
+
+
+# ===================== CLIENT PARTAGÉ (un pool par processus) =====================
+# La connexion est ouverte au premier appel de get_collection() / get_database(),
+# puis réutilisée par tous les modules. Après un fork, le processus enfant
+# recrée son propre client (un MongoClient ne doit pas être partagé entre processus).
+_lock = threading.Lock()
+_connection = None
+_pid = None
+
+def get_connection() -> MongoDBConnection:
+    """Connexion partagée du processus (créée à la demande)"""
+    global _connection, _pid
+    if _connection is None or _pid != os.getpid():
+        with _lock:
+            if _connection is None or _pid != os.getpid():
+                mongo = MongoDBConnection()
+                if not mongo.connect():
+                    raise ConnectionError("Connexion MongoDB impossible (voir migration_report.log)")
+                print(f"Connecté → {mongo.db_name}.{mongo.collection_name}")
+                _connection, _pid = mongo, os.getpid()
+    return _connection
+
+def get_client() -> MongoClient:
+    return get_connection().client
+
+def get_database():
+    return get_connection().db
+
+def get_collection(name: str | None = None):
+    """Collection patients (ou une autre collection de la base si name est donné)"""
+    mongo = get_connection()
+    return mongo.db[name] if name else mongo.collection
+
+def close_connection():
+    """Ferme le client partagé (une nouvelle connexion sera ouverte au prochain appel)"""
+    global _connection, _pid
+    with _lock:
+        if _connection is not None and _pid == os.getpid():
+            _connection.close()
+        _connection, _pid = None, None
+
+def _reset_after_fork():
+    # Le client hérité appartient au parent : on l'oublie sans le fermer
+    global _lock, _connection, _pid
+    _lock = threading.Lock()
+    _connection, _pid = None, None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,35 +1,84 @@
-from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo import InsertOne, UpdateOne, DeleteMany
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import DuplicateKeyError, BulkWriteError
 from datetime import datetime
 import logging, os
-from dotenv import load_dotenv
-from .connection import MongoDBConnection
-
-
-# ===================== INITIALISATION DE LA CONNEXION =====================
-print("Initialisation de connexion à MongoDB...")
-mongo = MongoDBConnection()
-
-if not mongo.connect():
-    print("Impossible de se connecter à MongoDB. Arrêt du script.")
-    exit(1)
-
-collection = mongo.collection
-print(f"Connecté → {mongo.db_name}.{mongo.collection_name}")
-
-# On s'assure qu'il y a un index unique sur patient_id
-try:
-    collection.create_index("patient_id", unique=True)
-    print("Index unique sur 'patient_id' vérifié/créé")
-except Exception as e:
-    print("Index déjà existant ou erreur mineure :", e)
+from .connection import get_collection
+from .ids import PatientIdAllocator, normalize_patient_id, clean_patient_id, legacy_id_query, DUPLICATE_KEY
+from .search import add_search_fields, name_query, normalize_name, text_query, PAGE_SIZE
+from .cache import PatientCache, watch_invalidations, MAX_ENTRIES, TTL_SECONDS, MAX_BYTES
+from .models import Patient, projection, DISPLAY_FIELDS, FIELD_ATTRS
+from .changes import stamp, utc_now, record_tombstones
+from .delta import DigestIndex
+from .indexes import ensure_indexes
+from .validation import validate_frame, ALLOWED_GENDERS, ALLOWED_BLOOD_TYPES, VALIDATIONS
+from .metrics import timed
+from .summary import SUMMARY_FIELDS, summary_updates, apply_summary_updates
+from .codec import get_codec
+from .partitions import get_router
+
+__all__ = [
+    "init", "validate_date", "validate_patient", "validate_updates",
+    "enable_cache", "disable_cache", "cache_stats", "invalidate_cache",
+    "allocate_patient_ids", "get_next_patient_id", "renew_patient_ids",
+    "add_patient", "find_patients", "search_patients", "get_patient", "read_patient",
+    "update_patient", "delete_patient", "add_patients", "update_patients", "delete_patients",
+    "DISPLAY_FIELDS", "PAGE_SIZE",
+]
+
+# Latence de chaque opération (label operation = nom de la fonction), commandes MongoDB
+# mesurées séparément par le listener de src/metrics.py
+CRUD_SECONDS = "crud_operation_seconds"
+
+
+# ===================== INITIALISATION (explicite, rien n'est fait à l'import) =====================
+_indexed = None
+_allocator = None
+
+def init():
+    """
+    Ouvre la connexion partagée et crée les index déclarés manquants (src/indexes.py).
+    Appelée automatiquement par la première opération CRUD si besoin.
+    Retourne la collection patients.
+    """
+    global _indexed
+    collection = get_collection()
+    if _indexed is not collection:
+        # Index unique sur patient_id, recherche par nom, updated_at... (une seule commande)
+        try:
+            ensure_indexes(collection)
+            print("Index de la collection patients vérifiés/créés")
+        except Exception as e:
+            print("Index déjà existant ou erreur mineure :", e)
+        # Base chargée au format P00042 : les identifiants saisis (P00000042) ne la trouvent plus
+        if collection.find_one(legacy_id_query(), {"_id": 1}):
+            print("⚠️ patient_id au format hérité (P00042) → migration.widen_patient_ids()")
+            logging.warning("patient_id au format hérité présents - lancer widen_patient_ids()")
+        _indexed = collection
+    return collection
+
+def _collection():
+    """Collection patients du client partagé (init() au premier appel)"""
+    collection = get_collection()
+    return collection if _indexed is collection else init()
+
+def _id_allocator() -> PatientIdAllocator:
+    """Allocation atomique des patient_id (compteur MongoDB + blocs locaux), une par connexion"""
+    global _allocator
+    collection = _collection()
+    if _allocator is None or _allocator.collection is not collection:
+        _allocator = PatientIdAllocator(collection)
+    return _allocator
+
+def __getattr__(name):
+    # crud.collection reste disponible (connexion ouverte au premier accès)
+    if name == "collection":
+        return _collection()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ===================== VALIDATION & TYPAGE =====================
-from datetime import datetime
-
-ALLOWED_GENDERS = {"Male", "Female", "Other"}
-ALLOWED_BLOOD_TYPES = {"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"}
 
 def validate_date(value: str) -> datetime | bool:
     if not value:
@@ -42,136 +91,261 @@ def validate_date(value: str) -> datetime | bool:
 def validate_patient(patient_data: dict) -> dict | bool:
     """
     Retourne un dictionnaire nettoyé si tout est valide, sinon False.
+    Même moteur de validation que la migration (src/validation.py).
     """
+    import pandas as pd
+    clean, rejected = validate_frame(pd.DataFrame([patient_data]))
+    if len(rejected):
+        print(f"❌ {rejected['reason'].iloc[0]}")
+        return False
 
-    required_fields = [
-        "Name", "Age", "Gender", "Blood Type", "Medical Condition",
-        "Date of Admission", "Doctor", "Hospital", "Insurance Provider",
-        "Billing Amount", "Room Number", "Admission Type",
-        "Discharge Date", "Medication", "Test Results"
-    ]
-
-    # Vérifier la présence de toutes les clés
-    for field in required_fields:
-        if field not in patient_data:
-            print(f"Champ manquant : {field}")
-            return False
+    return clean.to_dict("records")[0]
 
-    validated = {}
 
-    # Name
-    if isinstance(patient_data["Name"], str) and patient_data["Name"].strip():
-        validated["Name"] = patient_data["Name"].strip()
-    else:
-        return False
-
-    # Age
-    try:
-        age = int(patient_data["Age"])
-        if not (0 <= age <= 150):
-            return False
-        validated["Age"] = age
-    except:
-        return False
+def validate_updates(updates: dict) -> tuple[dict, str | None]:
+    """
+    Valide un dictionnaire de mise à jour partielle.
+    Retourne (champs validés, None) ou ({}, message d'erreur).
+    """
+    validated_updates = {}
+    for key, value in updates.items():
+        if key == "Age":
+            try:
+                age = int(value)
+                if 0 <= age <= 150:
+                    validated_updates["Age"] = age
+                else:
+                    return {}, f"❌ Âge invalide ({value})."
+            except:
+                return {}, f"❌ Âge doit être un nombre entier."
 
-    # Gender
-    gender = patient_data["Gender"].strip()
-    if gender not in ALLOWED_GENDERS:
-        return False
-    validated["Gender"] = gender
+        elif key == "Gender":
+            gender = str(value).strip()
+            if gender in ALLOWED_GENDERS:
+                validated_updates["Gender"] = gender
+            else:
+                return {}, f"❌ Genre invalide (doit être Male, Female ou Other)."
 
-    # Blood Type
-    blood = patient_data["Blood Type"].strip()
-    if blood not in ALLOWED_BLOOD_TYPES:
-        return False
-    validated["Blood Type"] = blood
+        elif key == "Blood Type":
+            blood = str(value).strip()
+            if blood in ALLOWED_BLOOD_TYPES:
+                validated_updates["Blood Type"] = blood
+            else:
+                return {}, f"❌ Groupe sanguin invalide."
 
-    # Medical Condition
-    validated["Medical Condition"] = patient_data["Medical Condition"].strip()
+        elif key in ["Name", "Doctor", "Hospital", "Insurance Provider", "Admission Type", "Medication", "Test Results", "Medical Condition"]:
+            if isinstance(value, str) and value.strip():
+                validated_updates[key] = value.strip()
+            else:
+                return {}, f"❌ {key} ne peut pas être vide."
 
-    # Dates
-    date_adm = validate_date(patient_data["Date of Admission"])
-    date_discharge = validate_date(patient_data["Discharge Date"])
+        elif key == "Billing Amount":
+            try:
+                amount = float(str(value).replace(",", "."))
+                validated_updates["Billing Amount"] = round(amount, 2)
+            except:
+                return {}, f"❌ Montant invalide."
 
-    if not date_adm or not date_discharge:
-        return False
+        elif key == "Room Number":
+            try:
+                validated_updates["Room Number"] = int(value)
+            except:
+                return {}, f"❌ Numéro de chambre invalide."
 
-    validated["Date of Admission"] = date_adm
-    validated["Discharge Date"] = date_discharge
+        elif key in ["Date of Admission", "Discharge Date"]:
+            date_obj = validate_date(value)
+            if date_obj:
+                validated_updates[key] = date_obj
+            else:
+                return {}, f"❌ Format de date invalide pour {key} (YYYY-MM-DD requis)."
 
-    # Doctor, Hospital, Insurance Provider, Admission Type
-    for key in ["Doctor", "Hospital", "Insurance Provider", "Admission Type"]:
-        if isinstance(patient_data[key], str) and patient_data[key].strip():
-            validated[key] = patient_data[key].strip()
         else:
-            return False
+            return {}, f"❌ Champ inconnu : {key}"
 
-    # Billing Amount
-    try:
-        amount = float(patient_data["Billing Amount"])
-        validated["Billing Amount"] = amount
-    except:
-        return False
+    return validated_updates, None
 
-    # Room Number
-    try:
-        validated["Room Number"] = int(patient_data["Room Number"])
-    except:
-        return False
 
-    # Medication / Test Results
-    validated["Medication"] = patient_data["Medication"]
-    validated["Test Results"] = patient_data["Test Results"]
 
-    return validated
+# ===================== CACHE DES LECTURES (optionnel) =====================
+cache = None
 
+def enable_cache(max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS,
+                 max_bytes: int = MAX_BYTES, watch: bool = False) -> PatientCache:
+    """
+    Active le cache LRU/TTL des lectures (par patient_id et par recherche de nom).
+    watch=True : invalidation via change stream pour les écritures d'autres processus.
+    """
+    global cache
+    cache = PatientCache(max_entries=max_entries, ttl=ttl, max_bytes=max_bytes)
+    if watch:
+        watch_invalidations(_collection(), cache)
+    return cache
+
+def disable_cache():
+    global cache
+    cache = None
+
+def cache_stats() -> dict:
+    """Compteurs hits / misses / evictions, nombre d'entrées et octets utilisés"""
+    return cache.stats() if cache else {}
+
+def _update_summaries(collection, changes):
+    """Statistiques pré-calculées (src/summary.py) : changes = paires (avant, après)"""
+    apply_summary_updates(collection.database, summary_updates(changes, get_codec(collection)))
+
+def invalidate_cache(patient_ids=(), names: bool = False):
+    """Invalide le cache après une écriture (names=True : un nom a pu apparaître ou changer)"""
+    if cache is None:
+        return
+    for patient_id in patient_ids:
+        cache.invalidate_patient(patient_id)
+    if names:
+        cache.invalidate_names()
 
 
 # ===================== FONCTIONS CRUD =====================
+def allocate_patient_ids(count: int) -> list[str]:
+    """
+    Réserve count patient_id en une seule opération atomique (compteur $inc).
+    """
+    return _id_allocator().allocate(count)
+
 def get_next_patient_id() -> str:
     """
-    Retourne le prochain patient_id disponible au format P00001, P00002, ...
+    Retourne le prochain patient_id disponible au format P00000001, P00000002, ...
+    Sûr en cas d'ajouts concurrents (pas de tri sur la collection).
     """
-    last_doc = collection.find_one(sort=[("patient_id", -1)])
-    
-    try:
-        last_id = last_doc["patient_id"]  # ex: "P054321"
-        number = int(last_id[1:])         # → 54321
-    except (TypeError, KeyError, ValueError):
-        number = 0
+    return _id_allocator().next_id()
 
-    next_number = number + 1
-    return f"P{next_number:05d}"
+def renew_patient_ids(count: int) -> list[str]:
+    """
+    Identifiants générés déjà présents : le bloc local date d'avant un rechargement
+    de la collection (migrate(drop=True) dans un autre processus). Il est abandonné
+    et count identifiants sont réservés à nouveau.
+    """
+    allocator = _id_allocator()
+    allocator.discard()
+    return allocator.allocate(count)
 
 
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
 def add_patient(patient_data: dict) -> str:
     """
     Ajoute un patient si patient_id n'existe pas déjà.
     Si pas de patient_id fourni → en génère un automatiquement.
     Retourne le patient_id final utilisé.
     """
-    
+    collection = _collection()
     print(collection)
     # Valider la structure et les champs
     validated = validate_patient(patient_data)
     if not validated:
         return "❌ Données invalides — patient non ajouté."
     # Si pas de patient_id fourni → on en génère un
-    collection.create_index("patient_id", unique=True)
-    if "patient_id" not in validated or not validated["patient_id"]:
+    generated = "patient_id" not in validated or not validated["patient_id"]
+    if generated:
         validated["patient_id"] = get_next_patient_id()
+    add_search_fields(validated)
+    stamp(validated)
     
     # Vérifie s'il existe déjà (au cas où)
     try:
-        result = collection.insert_one(validated)
+        try:
+            collection.insert_one(get_codec(collection).encode(validated))
+        except DuplicateKeyError:
+            if not generated:
+                raise
+            # Bloc d'identifiants périmé : un seul nouvel essai avec un identifiant réservé à nouveau
+            validated["patient_id"] = renew_patient_ids(1)[0]
+            collection.insert_one(get_codec(collection).encode(validated))
+        invalidate_cache(names=True)
+        _update_summaries(collection, [(None, validated)])
         return f"✔️ Patient {validated['Name']} ajouté avec l'id {validated['patient_id']}"
     except DuplicateKeyError:
-        return "❌ Patient non ajouté — patient_id déjà existant. Réessayez."
+        return "❌ Patient non ajouté — patient_id déjà existant."
     
-def read_patient(search: str) -> list[dict]:
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def find_patients(query: dict | None = None, fields: list[str] | None = None, limit: int = 0,
+                  sort: list | None = None, as_: str = "patient") -> list:
+    """
+    Requête générique avec projection.
+    as_="patient" : objets Patient compacts décodés à la demande depuis le BSON brut
+    as_="tuple"   : tuples dans l'ordre de fields
+    as_="dict"    : documents complets (dict)
+    query, fields et sort utilisent les noms de champs du CSV, quel que soit le format de stockage.
+    """
+    collection = _collection()
+    codec = get_codec(collection)
+    proj = codec.encode_projection(projection(fields))
+    raw = as_ == "patient" and codec.identity
+    # Partitions concernées par le filtre (src/partitions.py), une seule collection sans archive
+    cursor = get_router(collection).find(codec.encode_query(query or {}), proj, codec.encode_sort(sort), limit,
+                                         codec_options=CodecOptions(document_class=RawBSONDocument) if raw else None)
+
+    if as_ == "patient":
+        if raw:
+            return [Patient(raw=doc.raw) for doc in cursor]
+        # Stockage compact : clés et codes traduits à la lecture (pas de décodage différé)
+        return [Patient.from_doc(codec.decode(doc)) for doc in cursor]
+    if not codec.identity:
+        cursor = map(codec.decode, cursor)
+    if as_ == "tuple":
+        columns = fields or list(FIELD_ATTRS)
+        return [tuple(doc.get(field) for field in columns) for doc in cursor]
+    return list(cursor)
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def search_patients(search: str, limit: int = PAGE_SIZE, after: str | None = None,
+                    mode: str = "prefix", fields: list[str] | None = None) -> tuple[list[dict], str | None]:
+    """
+    Recherche par nom via l'index name_tokens (mode="prefix" : chaque mot saisi est le début
+    d'un mot du nom) ou via l'index texte (mode="text" : mots entiers).
+    fields : projection (seuls ces champs sont transférés).
+    Résultats triés par patient_id, pagination par curseur :
+    retourne (patients, curseur de la page suivante ou None).
     """
-    Recherche des patients par patient_id OU par nom (insensible à la casse, recherche partielle).
-    Retourne une liste de patients trouvés (peut être vide, 1 ou plusieurs).
+    collection = _collection()
+    query = text_query(search, after) if mode == "text" else name_query(search, after)
+    if query is None:
+        return [], None
+
+    key = ("name", mode, normalize_name(search), limit, after, tuple(fields or ()))
+    patients = cache.get(key) if cache else None
+    if patients is None:
+        codec = get_codec(collection)
+        cursor = get_router(collection).find(query, codec.encode_projection(projection(fields)), [("patient_id", 1)], limit)
+        patients = codec.decode_many(list(cursor))
+        if cache:
+            cache.set(key, patients)
+    next_cursor = patients[-1]["patient_id"] if len(patients) == limit else None
+    return patients, next_cursor
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def get_patient(patient_id: str, fields: list[str] | None = None) -> dict | None:
+    """Lecture d'un patient par patient_id (passe par le cache s'il est activé)"""
+    collection = _collection()
+    key = ("id", patient_id, tuple(fields or ()))
+    cached = cache.get(key) if cache else None
+    if cached:
+        return cached[0]
+    codec = get_codec(collection)
+    patient, _ = get_router(collection).locate({"patient_id": patient_id}, codec.encode_projection(projection(fields)))
+    patient = codec.decode(patient)
+    if patient and cache:
+        cache.set(key, [patient])
+    return patient
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def read_patient(search: str, limit: int = PAGE_SIZE, after: str | None = None,
+                 fields: list[str] | None = None) -> list[dict]:
+    """
+    Recherche des patients par patient_id OU par nom (insensible à la casse et aux accents,
+    début de mot : "jack" trouve "Bobby Jackson").
+    limit / after : taille de page et patient_id du dernier résultat de la page précédente.
+    fields : projection, ex. DISPLAY_FIELDS pour ne lire que les champs affichés.
+    Retourne une liste de patients trouvés (peut être vide, 1 ou plusieurs), sous forme de dict :
+    mêmes documents que get_patient / search_patients (et que le cache qu'ils partagent) ou que
+    crud_async.read_patient. Objets Patient compacts : find_patients(..., as_="patient").
     """
     if not search or not isinstance(search, str):
         print("❌ Terme de recherche invalide.")
@@ -180,25 +354,25 @@ def read_patient(search: str) -> list[dict]:
     search = search.strip()
     patients = []
 
-    # 1. Recherche exacte par patient_id 
-    if search.upper().startswith("P") and search[1:].isdigit():
-        patient = collection.find_one({"patient_id": search.upper()})
+    # 1. Recherche exacte par patient_id (P42 → P00000042)
+    patient_id = normalize_patient_id(search)
+    if patient_id:
+        patient = get_patient(patient_id, fields)
         if patient:
             patients = [patient]
-            print(f"✔️ Patient trouvé par ID : {search.upper()}")
+            print(f"✔️ Patient trouvé par ID : {patient_id}")
         else:
-            print(f"❌ Aucun patient trouvé avec l'ID : {search.upper()}")
+            print(f"❌ Aucun patient trouvé avec l'ID : {patient_id}")
 
     # 2. Si pas trouvé par ID → recherche par nom 
     if not patients:
-        # Recherche partielle avec expression régulière
-        regex_query = {"$regex": search, "$options": "i"}  # i => insensible à la casse
-        cursor = collection.find({"Name": regex_query}).limit(20)  # limite la recherche à 20 résultats
-
-        patients = list(cursor)
+        # Recherche par préfixe de mot sur le champ indexé name_tokens
+        patients, next_cursor = search_patients(search, limit, after, fields=fields)
 
         if patients:
             print(f"✔️ {len(patients)} patient(s) trouvé(s) contenant '{search}' dans le nom :")
+            if next_cursor:
+                print(f"   (page suivante : read_patient({search!r}, after={next_cursor!r}))")
         else:
             print(f"❌ Aucun patient trouvé avec le nom contenant '{search}'.")
 
@@ -213,84 +387,47 @@ def read_patient(search: str) -> list[dict]:
 
     return patients
 
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
 def update_patient(patient_id: str, updates: dict) -> str:
     """
     Met à jour un patient existant.
     updates : dictionnaire avec seulement les champs à modifier.
     Retourne un message de succès ou d'erreur.
     """
+    collection = _collection()
     if not patient_id or not isinstance(patient_id, str):
         return "❌ patient_id invalide."
 
-    patient_id = patient_id.strip().upper()
+    patient_id = clean_patient_id(patient_id)
 
     # Vérifier que le patient existe
-    if not collection.find_one({"patient_id": patient_id}):
+    codec = get_codec(collection)
+    patient = codec.decode(collection.find_one({"patient_id": patient_id}))
+    if not patient and get_router(collection).restore([patient_id]):
+        # Séjour archivé : ramené dans la partition chaude avant d'être modifié
+        patient = codec.decode(collection.find_one({"patient_id": patient_id}))
+    if not patient:
         return f"❌ Patient {patient_id} non trouvé — mise à jour impossible."
 
-    # Valider les champs fournis (on réutilise la même logique que validate_patient)
-    validated_updates = {}
-    for key, value in updates.items():
-        if key == "Age":
-            try:
-                age = int(value)
-                if 0 <= age <= 150:
-                    validated_updates["Age"] = age
-                else:
-                    return f"❌ Âge invalide ({value})."
-            except:
-                return f"❌ Âge doit être un nombre entier."
-
-        elif key == "Gender":
-            gender = str(value).strip()
-            if gender in ALLOWED_GENDERS:
-                validated_updates["Gender"] = gender
-            else:
-                return f"❌ Genre invalide (doit être Male, Female ou Other)."
-
-        elif key == "Blood Type":
-            blood = str(value).strip()
-            if blood in ALLOWED_BLOOD_TYPES:
-                validated_updates["Blood Type"] = blood
-            else:
-                return f"❌ Groupe sanguin invalide."
-
-        elif key in ["Name", "Doctor", "Hospital", "Insurance Provider", "Admission Type", "Medication", "Test Results", "Medical Condition"]:
-            if isinstance(value, str) and value.strip():
-                validated_updates[key] = value.strip()
-            else:
-                return f"❌ {key} ne peut pas être vide."
-
-        elif key == "Billing Amount":
-            try:
-                amount = float(str(value).replace(",", "."))
-                validated_updates["Billing Amount"] = round(amount, 2)
-            except:
-                return f"❌ Montant invalide."
-
-        elif key == "Room Number":
-            try:
-                validated_updates["Room Number"] = int(value)
-            except:
-                return f"❌ Numéro de chambre invalide."
-
-        elif key in ["Date of Admission", "Discharge Date"]:
-            date_obj = validate_date(value)
-            if date_obj:
-                validated_updates[key] = date_obj
-            else:
-                return f"❌ Format de date invalide pour {key} (YYYY-MM-DD requis)."
-
-        else:
-            return f"❌ Champ inconnu : {key}"
+    # Valider les champs fournis
+    validated_updates, error = validate_updates(updates)
+    VALIDATIONS.inc(kind="update", result="rejected" if error else "valid")
+    if error:
+        return error
+    # updated_at n'avance que si une valeur change réellement (export incrémental)
+    if any(patient.get(key) != value for key, value in validated_updates.items()):
+        stamp(validated_updates)
+    add_search_fields(validated_updates)
 
     # Appliquer la mise à jour
     try:
         result = collection.update_one(
             {"patient_id": patient_id},
-            {"$set": validated_updates}
+            {"$set": codec.encode(validated_updates)}
         )
+        invalidate_cache([patient_id], names="Name" in validated_updates)
         if result.modified_count:
+            _update_summaries(collection, [(patient, {**patient, **validated_updates})])
             print(f"✔️ Patient {patient_id} mis à jour avec succès.")
             logging.info(f"Mise à jour patient : {patient_id} → {validated_updates}")
             return f"✔️ Mise à jour réussie pour {patient_id}"
@@ -299,18 +436,21 @@ def update_patient(patient_id: str, updates: dict) -> str:
     except Exception as e:
         return f"❌ Erreur lors de la mise à jour : {e}"
     
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
 def delete_patient(patient_id: str) -> str:
     """
     Supprime un patient par patient_id.
     Demande confirmation si lancé interactivement.
     """
+    collection = _collection()
     if not patient_id or not isinstance(patient_id, str):
         return "❌ patient_id invalide."
 
-    patient_id = patient_id.strip().upper()
+    patient_id = clean_patient_id(patient_id)
 
-    # Vérifier existence
-    patient = collection.find_one({"patient_id": patient_id})
+    # Vérifier existence (partition chaude ou archive)
+    patient, owner = get_router(collection).locate({"patient_id": patient_id})
+    patient = get_codec(collection).decode(patient)
     if not patient:
         return f"❌ Patient {patient_id} non trouvé — rien à supprimer."
 
@@ -321,9 +461,203 @@ def delete_patient(patient_id: str) -> str:
             return "❌ Suppression annulée."
 
     try:
-        result = collection.delete_one({"patient_id": patient_id})
+        result = owner.delete_one({"patient_id": patient_id})
+        if result.deleted_count:
+            record_tombstones(collection, [patient_id])
+            DigestIndex(collection).forget([patient_id])
+            _update_summaries(collection, [(patient, None)])
+        invalidate_cache([patient_id])
         print(f"🗑️ Patient {patient_id} supprimé définitivement.")
         logging.warning(f"Suppression patient : {patient_id} | {patient.get('Name')}")
         return f"✔️ Patient {patient_id} supprimé."
     except Exception as e:
-        return f"❌ Erreur lors de la suppression : {e}"
\ No newline at end of file
+        return f"❌ Erreur lors de la suppression : {e}"
+
+
+# ===================== FONCTIONS CRUD EN MASSE =====================
+# Chaque fonction retourne un résultat par élément :
+# {"index", "patient_id", "status", "error"}
+# status : inserted / updated / deleted / invalid / not_found / error
+
+def _result(index: int, patient_id: str | None, status: str, error: str | None = None) -> dict:
+    if error:
+        error = error.removeprefix("❌ ")
+    return {"index": index, "patient_id": patient_id, "status": status, "error": error}
+
+def _apply_bulk_errors(results: list[dict], op_index: list[int], error: BulkWriteError):
+    """Reporte les erreurs d'un bulk_write non ordonné sur les éléments concernés"""
+    for write_error in error.details.get("writeErrors", []):
+        item = results[op_index[write_error["index"]]]
+        item["status"] = "error"
+        item["error"] = write_error.get("errmsg")
+
+def _retry_duplicate_ids(collection, results: list, records: dict, op_index: list, error: BulkWriteError):
+    """Insertions refusées pour un patient_id généré déjà présent : un nouvel essai avec des identifiants réservés à nouveau"""
+    indexes = [op_index[write_error["index"]] for write_error in error.details.get("writeErrors", [])
+               if write_error.get("code") == DUPLICATE_KEY]
+    if not indexes:
+        return
+    for index, patient_id in zip(indexes, renew_patient_ids(len(indexes))):
+        records[index]["patient_id"] = patient_id
+        results[index] = _result(index, patient_id, "inserted")
+    try:
+        collection.bulk_write([InsertOne(doc) for doc in get_codec(collection).encode_many([records[i] for i in indexes])],
+                              ordered=False)
+    except BulkWriteError as e:
+        _apply_bulk_errors(results, indexes, e)
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def add_patients(patients) -> list[dict]:
+    """
+    Ajoute plusieurs patients : validation en lot, patient_id réservés en une fois
+    et un seul bulk_write non ordonné.
+    """
+    collection = _collection()
+    patients = list(patients)
+    if not patients:
+        return []
+
+    import pandas as pd
+    clean, rejected = validate_frame(pd.DataFrame(patients))
+    results = [None] * len(patients)
+    for index, reason in rejected["reason"].items():
+        results[index] = _result(index, None, "invalid", reason)
+
+    ids = iter(allocate_patient_ids(len(clean)))
+    now = utc_now()
+    op_index, records = [], {}
+    for index, record in zip(clean.index, clean.to_dict("records")):
+        record["patient_id"] = next(ids)
+        add_search_fields(record)
+        stamp(record, now)
+        op_index.append(index)
+        records[index] = record
+        results[index] = _result(index, record["patient_id"], "inserted")
+    ops = [InsertOne(doc) for doc in get_codec(collection).encode_many(list(records.values()))]
+
+    if ops:
+        try:
+            collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            _apply_bulk_errors(results, op_index, e)
+            _retry_duplicate_ids(collection, results, records, op_index, e)
+        invalidate_cache(names=True)
+        _update_summaries(collection, [(None, record) for index, record in records.items()
+                                       if results[index]["status"] == "inserted"])
+
+    logging.info(f"Ajout en masse : {sum(r['status'] == 'inserted' for r in results)}/{len(results)} patients")
+    return results
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def update_patients(updates_by_id: dict) -> list[dict]:
+    """
+    Met à jour plusieurs patients {patient_id: {champs}} : une requête pour vérifier
+    l'existence de tous les patients puis un seul bulk_write.
+    """
+    collection = _collection()
+    results = []
+    pending = {}
+    for index, (patient_id, updates) in enumerate(updates_by_id.items()):
+        patient_id = clean_patient_id(patient_id)
+        validated, error = validate_updates(updates) if patient_id else ({}, "patient_id invalide.")
+        VALIDATIONS.inc(kind="update", result="rejected" if error else "valid")
+        results.append(_result(index, patient_id, "invalid" if error else "updated", error))
+        if not error:
+            pending[index] = (patient_id, validated)
+
+    # Valeurs actuelles des champs des statistiques (mises à jour incrémentales) et des champs modifiés
+    codec = get_codec(collection)
+    updated_fields = {field for _, validated in pending.values() for field in validated}
+    summary_projection = codec.encode_projection(
+        {"patient_id": 1, **{field: 1 for field in (*SUMMARY_FIELDS, *updated_fields)}}
+    )
+    pending_ids = [pid for pid, _ in pending.values()]
+    existing = {
+        doc["patient_id"]: codec.decode(doc)
+        for doc in collection.find({"patient_id": {"$in": pending_ids}}, summary_projection)
+    }
+    # Séjours archivés : ramenés dans la partition chaude avant d'être modifiés
+    missing = [pid for pid in pending_ids if pid not in existing]
+    if missing and get_router(collection).restore(missing):
+        existing.update({
+            doc["patient_id"]: codec.decode(doc)
+            for doc in collection.find({"patient_id": {"$in": missing}}, summary_projection)
+        })
+
+    now = utc_now()
+    ops, op_index = [], []
+    for index, (patient_id, validated) in pending.items():
+        if patient_id not in existing:
+            results[index]["status"] = "not_found"
+            continue
+        # updated_at n'avance que si une valeur change réellement (comme update_patient)
+        if any(existing[patient_id].get(key) != value for key, value in validated.items()):
+            stamp(validated, now)
+        ops.append(UpdateOne({"patient_id": patient_id}, {"$set": codec.encode(add_search_fields(validated))}))
+        op_index.append(index)
+
+    if ops:
+        try:
+            collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            _apply_bulk_errors(results, op_index, e)
+        invalidate_cache(
+            [patient_id for patient_id, _ in pending.values()],
+            names=any("Name" in validated for _, validated in pending.values()),
+        )
+        _update_summaries(collection, [
+            (existing[patient_id], {**existing[patient_id], **validated})
+            for index, (patient_id, validated) in pending.items() if results[index]["status"] == "updated"
+        ])
+
+    logging.info(f"Mise à jour en masse : {sum(r['status'] == 'updated' for r in results)}/{len(results)} patients")
+    return results
+
+@timed(CRUD_SECONDS, "Durée des opérations CRUD")
+def delete_patients(patient_ids) -> list[dict]:
+    """
+    Supprime plusieurs patients (sans confirmation interactive) :
+    une requête d'existence puis une seule suppression.
+    """
+    collection = _collection()
+    patient_ids = [clean_patient_id(pid) for pid in patient_ids]
+    valid_ids = [pid for pid in patient_ids if pid]
+    codec = get_codec(collection)
+    summary_projection = codec.encode_projection({"patient_id": 1, **{field: 1 for field in SUMMARY_FIELDS}})
+    # Recherche dans toutes les partitions (chaude puis archives) : owners = nom → (collection, ids)
+    router = get_router(collection)
+    router.refresh()    # partitions froides à jour : un séjour archivé à l'instant n'est pas "not_found"
+    existing, owners = {}, {}
+    for partition in router.collections():
+        remaining = [pid for pid in valid_ids if pid not in existing]
+        if not remaining:
+            break
+        for doc in partition.find({"patient_id": {"$in": remaining}}, summary_projection):
+            existing[doc["patient_id"]] = codec.decode(doc)
+            owners.setdefault(partition.name, (partition, []))[1].append(doc["patient_id"])
+
+    results = []
+    for index, patient_id in enumerate(patient_ids):
+        if not patient_id:
+            results.append(_result(index, patient_id, "invalid", "patient_id invalide."))
+        elif patient_id not in existing:
+            results.append(_result(index, patient_id, "not_found"))
+        else:
+            results.append(_result(index, patient_id, "deleted"))
+
+    if existing:
+        try:
+            for partition, ids in owners.values():
+                partition.bulk_write([DeleteMany({"patient_id": {"$in": ids}})])
+            record_tombstones(collection, existing)
+            DigestIndex(collection).forget(existing)
+            _update_summaries(collection, [(doc, None) for doc in existing.values()])
+        except Exception as e:
+            for item in results:
+                if item["status"] == "deleted":
+                    item["status"], item["error"] = "error", str(e)
+        invalidate_cache(existing)
+
+    logging.warning(f"Suppression en masse : {len(existing)} patients")
+    return results
+
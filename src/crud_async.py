@@ -0,0 +1,382 @@
+import os
+import time
+import asyncio
+import logging
+import functools
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+from .connection import MongoDBConnection, get_collection
+from .crud import validate_patient, validate_updates, allocate_patient_ids, renew_patient_ids, invalidate_cache
+from .validation import validate_frame, VALIDATIONS
+from .ids import normalize_patient_id, clean_patient_id
+from .search import add_search_fields, name_query, PAGE_SIZE
+from .changes import stamp, utc_now, TOMBSTONE_COLLECTION
+from .delta import DIGEST_COLLECTION
+from .models import projection
+from .summary import summary_updates, summary_pipelines
+from .codec import get_codec
+from .partitions import get_router
+
+# ===================== CONFIGURATION =====================
+# Opérations MongoDB simultanées au maximum : au-delà, les appels attendent leur tour
+MAX_CONCURRENCY = 100
+# Ingestion : taille des batchs, writers simultanés, batchs prêts en attente dans la file
+INGEST_BATCH_SIZE = 1000
+INGEST_WORKERS = 4
+INGEST_QUEUE_SIZE = 8
+
+
+# ===================== CLIENT ASYNCIO (motor) =====================
+# motor attache son pool à la boucle d'événements : un client par boucle et par processus
+_state = {"loop": None, "pid": None, "client": None, "collection": None, "semaphore": None, "codec": None}
+
+def get_async_collection():
+    """Collection patients du client motor de la boucle courante (créé à la demande)"""
+    loop = asyncio.get_running_loop()
+    if _state["loop"] is not loop or _state["pid"] != os.getpid():
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+        except ImportError:
+            raise ImportError("motor est requis pour l'API asyncio : pip install motor") from None
+        if _state["client"] is not None and _state["pid"] == os.getpid():
+            _state["client"].close()
+        mongo = MongoDBConnection()
+        client = AsyncIOMotorClient(**mongo.client_settings())
+        _state.update(
+            loop=loop,
+            pid=os.getpid(),
+            client=client,
+            collection=client[mongo.db_name][mongo.collection_name],
+            semaphore=asyncio.Semaphore(MAX_CONCURRENCY),
+            codec=None,
+        )
+    return _state["collection"]
+
+async def _codec():
+    """Format de stockage de la base (src/codec.py), lu une fois via le client synchrone"""
+    if _state["codec"] is None:
+        _state["codec"] = await asyncio.to_thread(lambda: get_codec(get_collection()))
+    return _state["codec"]
+
+async def _partitions(query: dict | None = None) -> list:
+    """Collections motor des partitions concernées par un filtre (routeur synchrone, relu hors de la boucle)"""
+    await _codec()
+    router = get_router(get_collection())
+    if router.stale():
+        await asyncio.to_thread(router.refresh)
+    collection = get_async_collection()
+    return [collection if name == collection.name else collection.database[name]
+            for name in router.collection_names(query)]
+
+async def _convert(codec, func, *args):
+    """Conversion vers le format compact hors de la boucle (le dictionnaire peut interroger MongoDB)"""
+    return func(*args) if codec.identity else await asyncio.to_thread(func, *args)
+
+def close_async_client():
+    if _state["client"] is not None and _state["pid"] == os.getpid():
+        _state["client"].close()
+    _state.update(loop=None, pid=None, client=None, collection=None, semaphore=None, codec=None)
+
+def _bounded(func):
+    """Limite le nombre d'opérations simultanées (sémaphore partagé par toute l'API)"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        get_async_collection()
+        async with _state["semaphore"]:
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+# ===================== LECTURE =====================
+# Les fonctions _xxx ne prennent pas de place dans le sémaphore (appelées par les fonctions publiques)
+
+async def _get_patient(patient_id: str, fields: list[str] | None = None) -> dict | None:
+    codec = await _codec()
+    for collection in await _partitions({"patient_id": patient_id}):
+        doc = await collection.find_one({"patient_id": patient_id}, codec.encode_projection(projection(fields)))
+        if doc is not None:
+            return codec.decode(doc)
+    return None
+
+async def _search_patients(search: str, limit: int = PAGE_SIZE, after: str | None = None,
+                           fields: list[str] | None = None) -> tuple[list[dict], str | None]:
+    query = name_query(search, after)
+    if query is None:
+        return [], None
+    codec = await _codec()
+    partitions = await _partitions(query)
+    pages = await asyncio.gather(*(
+        collection.find(query, codec.encode_projection(projection(fields))).sort("patient_id", 1).limit(limit).to_list(length=limit)
+        for collection in partitions
+    ))
+    docs = pages[0] if len(pages) == 1 else sorted((doc for page in pages for doc in page), key=lambda doc: doc["patient_id"])[:limit]
+    patients = codec.decode_many(docs)
+    next_cursor = patients[-1]["patient_id"] if len(patients) == limit else None
+    return patients, next_cursor
+
+@_bounded
+async def get_patient(patient_id: str, fields: list[str] | None = None) -> dict | None:
+    return await _get_patient(clean_patient_id(patient_id), fields)
+
+@_bounded
+async def search_patients(search: str, limit: int = PAGE_SIZE, after: str | None = None,
+                          fields: list[str] | None = None) -> tuple[list[dict], str | None]:
+    """Recherche par début de mot du nom (index name_tokens), pagination par curseur"""
+    return await _search_patients(search, limit, after, fields)
+
+@_bounded
+async def read_patient(search: str, limit: int = PAGE_SIZE, after: str | None = None,
+                       fields: list[str] | None = None) -> list[dict]:
+    """
+    Version asynchrone de crud.read_patient : par patient_id exact, sinon par nom.
+    Retourne les patients sans affichage (usage serveur).
+    """
+    if not search or not isinstance(search, str):
+        return []
+    search = search.strip()
+
+    patient_id = normalize_patient_id(search)
+    if patient_id:
+        patient = await _get_patient(patient_id, fields)
+        if patient:
+            return [patient]
+
+    patients, _ = await _search_patients(search, limit, after, fields)
+    return patients
+
+
+# ===================== ÉCRITURE =====================
+async def _update_summaries(collection, changes):
+    """Même mise à jour incrémentale des statistiques que le CRUD synchrone"""
+    codec = await _codec()
+    for name, ops in (await _convert(codec, summary_updates, changes, codec)).items():
+        try:
+            await collection.database[name].bulk_write(ops, ordered=True)
+        except Exception as e:
+            logging.warning(f"Statistiques {name} non mises à jour ({e}) - relancer rebuild_summaries()")
+
+async def _rebuild_summaries(collection):
+    """Recalcul complet ($merge), comme summary.rebuild_summaries"""
+    built_at = utc_now()
+    union = [partition.name for partition in await _partitions() if partition.name != collection.name]
+    for name, pipeline in summary_pipelines(built_at, await _codec(), union).items():
+        await collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+        await collection.database[name].delete_many({"built_at": {"$ne": built_at}})
+
+@_bounded
+async def add_patient(patient_data: dict) -> str:
+    """Ajoute un patient (même validation et mêmes messages que crud.add_patient)"""
+    # Validation pandas (quelques ms) hors de la boucle d'événements
+    validated = await asyncio.to_thread(validate_patient, patient_data)
+    if not validated:
+        return "❌ Données invalides — patient non ajouté."
+    generated = "patient_id" not in validated or not validated["patient_id"]
+    if generated:
+        # Le compteur est le même que celui du CRUD synchrone (réservation par blocs)
+        validated["patient_id"] = (await asyncio.to_thread(allocate_patient_ids, 1))[0]
+    add_search_fields(validated)
+    stamp(validated)
+
+    try:
+        collection = get_async_collection()
+        codec = await _codec()
+        try:
+            await collection.insert_one(await _convert(codec, codec.encode, validated))
+        except DuplicateKeyError:
+            if not generated:
+                raise
+            # Bloc d'identifiants périmé (collection rechargée) : un seul nouvel essai
+            validated["patient_id"] = (await asyncio.to_thread(renew_patient_ids, 1))[0]
+            await collection.insert_one(await _convert(codec, codec.encode, validated))
+        invalidate_cache(names=True)
+        await _update_summaries(collection, [(None, validated)])
+        return f"✔️ Patient {validated['Name']} ajouté avec l'id {validated['patient_id']}"
+    except DuplicateKeyError:
+        return "❌ Patient non ajouté — patient_id déjà existant."
+
+@_bounded
+async def update_patient(patient_id: str, updates: dict) -> str:
+    """Met à jour un patient existant (mêmes règles que crud.update_patient)"""
+    if not patient_id or not isinstance(patient_id, str):
+        return "❌ patient_id invalide."
+    patient_id = clean_patient_id(patient_id)
+    collection = get_async_collection()
+    codec = await _codec()
+
+    patient = codec.decode(await collection.find_one({"patient_id": patient_id}))
+    if not patient and await asyncio.to_thread(get_router(get_collection()).restore, [patient_id]):
+        # Séjour archivé : ramené dans la partition chaude avant d'être modifié
+        patient = codec.decode(await collection.find_one({"patient_id": patient_id}))
+    if not patient:
+        return f"❌ Patient {patient_id} non trouvé — mise à jour impossible."
+
+    validated_updates, error = validate_updates(updates)
+    VALIDATIONS.inc(kind="update", result="rejected" if error else "valid")
+    if error:
+        return error
+    if any(patient.get(key) != value for key, value in validated_updates.items()):
+        stamp(validated_updates)
+    add_search_fields(validated_updates)
+
+    try:
+        stored = await _convert(codec, codec.encode, validated_updates)
+        result = await collection.update_one({"patient_id": patient_id}, {"$set": stored})
+        invalidate_cache([patient_id], names="Name" in validated_updates)
+        if result.modified_count:
+            await _update_summaries(collection, [(patient, {**patient, **validated_updates})])
+            logging.info(f"Mise à jour patient : {patient_id} → {validated_updates}")
+            return f"✔️ Mise à jour réussie pour {patient_id}"
+        return "ℹ️ Aucune modification appliquée (valeurs identiques)."
+    except Exception as e:
+        return f"❌ Erreur lors de la mise à jour : {e}"
+
+@_bounded
+async def delete_patient(patient_id: str) -> str:
+    """Supprime un patient (sans confirmation interactive) et trace la suppression"""
+    if not patient_id or not isinstance(patient_id, str):
+        return "❌ patient_id invalide."
+    patient_id = clean_patient_id(patient_id)
+    collection = get_async_collection()
+
+    try:
+        patient = None
+        for attempt in range(2):
+            for partition in await _partitions({"patient_id": patient_id}):
+                patient = await partition.find_one_and_delete({"patient_id": patient_id})
+                if patient is not None:
+                    break
+            # Introuvable : description des partitions relue une fois (archivage récent par un autre processus)
+            if patient is not None or attempt or not await asyncio.to_thread(get_router(get_collection()).refreshed):
+                break
+        patient = (await _codec()).decode(patient)
+        if not patient:
+            return f"❌ Patient {patient_id} non trouvé — rien à supprimer."
+        await _update_summaries(collection, [(patient, None)])
+        await collection.database[TOMBSTONE_COLLECTION].insert_one({"patient_id": patient_id, "deleted_at": utc_now()})
+        await collection.database[DIGEST_COLLECTION].delete_many({"patient_id": patient_id})
+        invalidate_cache([patient_id])
+        logging.warning(f"Suppression patient : {patient_id}")
+        return f"✔️ Patient {patient_id} supprimé."
+    except Exception as e:
+        return f"❌ Erreur lors de la suppression : {e}"
+
+
+# ===================== INGESTION PAR BATCHS =====================
+async def _insert_batch(collection, batch_no: int, records: list[dict]) -> dict:
+    """Même résultat que loader.insert_batch : {"batch", "inserted", "failed", "error", "committed", "seconds"}"""
+    start = time.perf_counter()
+    try:
+        result = await collection.insert_many(records, ordered=False)
+        outcome = {"batch": batch_no, "inserted": len(result.inserted_ids), "failed": 0, "error": None, "committed": True}
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        outcome = {
+            "batch": batch_no,
+            "inserted": e.details.get("nInserted", 0),
+            "failed": len(errors),
+            "error": errors[0].get("errmsg") if errors else str(e),
+            "committed": True,
+        }
+    except Exception as e:
+        outcome = {"batch": batch_no, "inserted": 0, "failed": len(records), "error": str(e), "committed": False}
+    outcome["seconds"] = time.perf_counter() - start
+    return outcome
+
+async def _aiter(records):
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
+
+async def _ingest_frames(frames) -> dict:
+    """
+    Pipeline : validation + attribution des patient_id (dans un thread) → asyncio.Queue bornée → writers.
+    Quand les writers sont en retard, la file se remplit et le producteur attend (backpressure).
+    """
+    start = datetime.now()
+    collection = get_async_collection()
+    codec = await _codec()
+    queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+    results = []
+    totals = {"rows": 0, "rejected": 0}
+
+    async def writer():
+        while (item := await queue.get()) is not None:
+            batch_no, records, stored = item
+            async with _state["semaphore"]:
+                result = await _insert_batch(collection, batch_no, stored)
+                results.append(result)
+                if not result["failed"]:
+                    await _update_summaries(collection, [(None, record) for record in records])
+
+    writers = [asyncio.create_task(writer()) for _ in range(INGEST_WORKERS)]
+    try:
+        batch_no = 0
+        async for df in frames:
+            batch_no += 1
+            totals["rows"] += len(df)
+            clean, rejected = await asyncio.to_thread(validate_frame, df)
+            totals["rejected"] += len(rejected)
+            records = clean.to_dict("records")
+            ids = await asyncio.to_thread(allocate_patient_ids, len(records)) if records else []
+            now = utc_now()
+            for record, patient_id in zip(records, ids):
+                record["patient_id"] = patient_id
+                stamp(add_search_fields(record), now)
+            if records:
+                # Documents au format de stockage ; records (décodés) servent aux statistiques
+                await queue.put((batch_no, records, await _convert(codec, codec.encode_many, records)))
+    finally:
+        for _ in writers:
+            await queue.put(None)
+        await asyncio.gather(*writers)
+
+    invalidate_cache(names=True)
+    if any(r["failed"] for r in results):
+        # Insertions partielles : on ne sait pas quelles lignes comptent, recalcul complet
+        await _rebuild_summaries(collection)
+    summary = {
+        **totals,
+        "batches": len(results),
+        "inserted": sum(r["inserted"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "failed_batches": sorted((r for r in results if r["failed"]), key=lambda r: r["batch"]),
+        "seconds": round((datetime.now() - start).total_seconds(), 3),
+    }
+    print(f"✔️ Ingestion terminée : {summary['inserted']:,} insérés | {summary['rejected']:,} rejetés | "
+          f"{summary['failed']:,} échecs en {summary['seconds']} s")
+    logging.info(f"Ingestion asynchrone - {summary['inserted']} insérés - {summary['rejected']} rejetés - "
+                 f"{summary['failed']} échecs - {summary['seconds']} s")
+    return summary
+
+async def ingest(records, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """
+    Ingestion asynchrone d'un itérable (ou itérable asynchrone) de dicts patients,
+    par batchs de batch_size, avec la validation de la migration.
+    """
+    import pandas as pd
+
+    async def frames():
+        rows = []
+        async for record in _aiter(records):
+            rows.append(record)
+            if len(rows) == batch_size:
+                yield pd.DataFrame(rows)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows)
+    return await _ingest_frames(frames())
+
+async def ingest_file(path: str, batch_size: int = INGEST_BATCH_SIZE) -> dict:
+    """Ingestion d'un fichier CSV ou Parquet lu par chunks (lecture dans un thread)"""
+    from .migration import iter_source_chunks
+    chunks = iter_source_chunks(path, batch_size)
+
+    async def frames():
+        while (item := await asyncio.to_thread(next, chunks, None)) is not None:
+            yield item[0]
+    return await _ingest_frames(frames())
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import datetime
+from pymongo import UpdateOne
+
+from .validation import PATIENT_FIELDS
+
+# ===================== CONFIGURATION =====================
+DIGEST_COLLECTION = "patient_digests"
+
+# Champs pris en compte dans l'empreinte d'une ligne
+DIGEST_FIELDS = PATIENT_FIELDS
+
+# Clé naturelle d'un séjour : stable d'un export à l'autre, associée à un patient_id.
+# Deux lignes avec la même clé désignent le même séjour (la dernière l'emporte).
+NATURAL_KEY = ["Name", "Date of Admission", "Hospital"]
+
+
+# ===================== NORMALISATION & HASH =====================
+def normalize_value(value) -> str:
+    """Représentation canonique d'une valeur (identique qu'elle vienne du CSV ou de MongoDB)"""
+    if value is None or (isinstance(value, float) and value != value):   # None / NaN
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def row_digest(record: dict) -> str:
+    """Empreinte du contenu normalisé d'une ligne"""
+    canonical = "\x1f".join(normalize_value(record.get(field)) for field in DIGEST_FIELDS)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def natural_key(record: dict) -> str:
+    """Hash de la clé naturelle (insensible à la casse et aux espaces)"""
+    canonical = "\x1f".join(normalize_value(record.get(field)).lower() for field in NATURAL_KEY)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+# ===================== INDEX DES EMPREINTES =====================
+class DigestIndex:
+    """
+    Index des empreintes stocké dans MongoDB :
+    {_id: clé naturelle, patient_id, digest, run}
+    run : dernier run de migrate_delta qui a vu la clé dans la source (None : entrée initialisée
+    depuis la collection, pas encore vue dans une source).
+    C'est aussi la correspondance stable clé naturelle → patient_id.
+    Ses index sont déclarés dans src/indexes.py (DIGEST_INDEXES).
+    """
+
+    def __init__(self, collection):
+        self.digests = collection.database[DIGEST_COLLECTION]
+
+    def is_empty(self) -> bool:
+        return self.digests.find_one({}, {"_id": 1}) is None
+
+    def lookup(self, keys: list[str]) -> dict:
+        """Retourne {clé: {"patient_id", "digest"}} pour les clés déjà connues"""
+        cursor = self.digests.find({"_id": {"$in": keys}}, {"patient_id": 1, "digest": 1})
+        return {doc["_id"]: doc for doc in cursor}
+
+    def upsert_ops(self, entries: list[tuple[str, str, str]], run: str | None) -> list:
+        """Opérations d'écriture pour des (clé, patient_id, digest) nouveaux ou modifiés"""
+        return [
+            UpdateOne({"_id": key}, {"$set": {"patient_id": patient_id, "digest": digest, "run": run}}, upsert=True)
+            for key, patient_id, digest in entries
+        ]
+
+    def write(self, ops: list):
+        if ops:
+            self.digests.bulk_write(ops, ordered=False)
+
+    def touch(self, keys: list[str], run: str):
+        """Marque les clés inchangées comme vues pendant ce run (une seule requête par chunk)"""
+        if keys:
+            self.digests.update_many({"_id": {"$in": keys}}, {"$set": {"run": run}})
+
+    def stale(self, run: str):
+        """Clés non vues pendant ce run → séjours supprimés de la source"""
+        return self.digests.find({"run": {"$ne": run}}, {"patient_id": 1})
+
+    def remove(self, keys: list[str]):
+        if keys:
+            self.digests.delete_many({"_id": {"$in": keys}})
+
+    def forget(self, patient_ids):
+        """
+        Séjours supprimés hors migration (CRUD) : leur clé naturelle est oubliée,
+        une ligne encore présente dans la source sera réinsérée au prochain run
+        """
+        patient_ids = list(patient_ids)
+        if patient_ids:
+            self.digests.delete_many({"patient_id": {"$in": patient_ids}})
+
+    def clear(self):
+        """Collection rechargée : les patient_id sont renumérotés, les correspondances ne valent plus"""
+        self.digests.drop()
@@ -1,11 +1,44 @@
 # export_patients.py
 
-from pymongo import MongoClient
 from pymongo.collection import Collection
-import pandas as pd
 import json
+import math
+import shutil
+import logging
 from pathlib import Path
 from datetime import datetime 
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .search import NAME_TOKENS_FIELD
+from .ids import parse_patient_id, format_patient_id, PATIENT_ID_PREFIX, PATIENT_ID_WIDTH
+from .loader import WORKERS
+from .validation import PATIENT_FIELDS
+from .columnar import ColumnBuffer, ROW_GROUP_SIZE
+from .changes import UPDATED_AT_FIELD, WATERMARK_LAG, ExportWatermark, tombstones, utc_now
+from .compress import open_text_output, compressed_extension
+from .metrics import counter, histogram, profile
+from .codec import get_codec
+from .partitions import get_router
+
+# Champs techniques (recherche) exclus des exports
+EXPORT_PROJECTION = {NAME_TOKENS_FIELD: 0}
+# Colonnes des exports tabulaires (ordre fixe, connu avant de lire le curseur)
+EXPORT_FIELDS = ["_id", "patient_id", *PATIENT_FIELDS, UPDATED_AT_FIELD]
+# Nombre de documents lus par aller-retour / écrits par bloc CSV
+CHUNK_SIZE = 5000
+EXPORT_DIR = Path("export")
+
+# label format : JSON, CSV, Excel... (une valeur par sortie)
+EXPORT_SECONDS = histogram("export_seconds", "Durée d'un export (passage complet sur le curseur)")
+EXPORT_DOCS = counter("export_docs_total", "Documents exportés")
+EXPORT_BYTES = counter("export_bytes_total", "Octets écrits sur disque (après compression)")
+
+__all__ = [
+    "export_all", "export_json", "export_csv", "export_excel", "export_parquet", "export_arrow",
+    "export_changes", "export_parallel", "export_to_sinks", "SINKS",
+]
+# JSON indenté (lisible) ou compact (un document par ligne dans le tableau)
+PRETTY_JSON = True
+JSON_INDENT = 4
 
 # Fonction de conversion pour JSON
 def convert_doc(doc):
@@ -19,44 +52,542 @@ def convert_doc(doc):
     for key in ["Date of Admission", "Discharge Date"]:
         if key in doc_copy and hasattr(doc_copy[key], "strftime"):
             doc_copy[key] = doc_copy[key].strftime("%Y-%m-%d")
+
+    # Date de dernière écriture : horodatage complet (UTC)
+    if hasattr(doc_copy.get(UPDATED_AT_FIELD), "isoformat"):
+        doc_copy[UPDATED_AT_FIELD] = doc_copy[UPDATED_AT_FIELD].isoformat()
     
     return doc_copy
 
-# Créer le dossier de sortie si inexistant
-output_dir = Path("data")
-output_dir.mkdir(exist_ok=True)
-
 # Pour générer le timestamp
 def get_timestamp() -> str:
     """Retourne le timestamp au format YYYYMMDD_HHMMSS"""
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Export JSON
-def export_json(collection: Collection):
-    data = list(collection.find())
-    data_clean = [convert_doc(d) for d in data]
+def output_path(extension: str, timestamp: str | None = None, prefix: str = "collection_export") -> Path:
+    """export/<prefix>_<timestamp>.<extension> (crée le dossier si besoin)"""
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    return EXPORT_DIR / f"{prefix}_{timestamp or get_timestamp()}.{extension}"
+
+
+# ===================== SORTIES EN STREAMING =====================
+# Chaque sortie reçoit les documents un par un (write) et n'en garde
+# au plus qu'un bloc en mémoire ; close() termine le fichier.
+
+class TextSink:
+    """Base des sorties texte : fichier classique ou compressé (gzip / zstd / xz) en arrière-plan"""
+
+    def __init__(self, path: Path, compression: str | None = None, level: int | None = None):
+        self.path = path
+        self.compression = compression
+        self.file = open_text_output(path, compression, level)
+        self.count = 0
+
+    @property
+    def raw_bytes(self) -> int:
+        """Taille non compressée écrite"""
+        raw = getattr(self.file, "raw_bytes", None)
+        return raw if raw is not None else Path(self.path).stat().st_size
+
+    def close(self):
+        self.file.close()
+
+
+class JsonSink(TextSink):
+    """
+    Tableau JSON écrit document par document : indenté (pretty=True)
+    ou compact, un document par ligne (pretty=False)
+    """
+    label = "JSON"
+    extension = "json"
+
+    def __init__(self, path: Path, compression: str | None = None, level: int | None = None,
+                 pretty: bool = PRETTY_JSON):
+        super().__init__(path, compression, level)
+        self.pretty = pretty
+
+    def write(self, doc: dict):
+        if self.pretty:
+            text = json.dumps(convert_doc(doc), ensure_ascii=False, indent=JSON_INDENT)
+            text = " " * JSON_INDENT + text.replace("\n", "\n" + " " * JSON_INDENT)
+        else:
+            text = json.dumps(convert_doc(doc), ensure_ascii=False, separators=(",", ":"))
+        self.file.write(("[\n" if self.count == 0 else ",\n") + text)
+        self.count += 1
+
+    def close(self):
+        self.file.write("\n]" if self.count else "[]")
+        self.file.close()
+
+
+class NdjsonSink(TextSink):
+    """Un document JSON compact par ligne (NDJSON)"""
+    label = "NDJSON"
+    extension = "ndjson"
+
+    def write(self, doc: dict):
+        self.file.write(json.dumps(convert_doc(doc), ensure_ascii=False) + "\n")
+        self.count += 1
+
+
+class CsvSink(TextSink):
+    """CSV écrit par blocs de CHUNK_SIZE lignes (en-tête au premier bloc)"""
+    label = "CSV"
+    extension = "csv"
+
+    def __init__(self, path: Path, compression: str | None = None, level: int | None = None,
+                 chunk_size: int = CHUNK_SIZE):
+        super().__init__(path, compression, level)
+        self.chunk_size = chunk_size
+        self.buffer = []
+        self.header = True
+
+    def write(self, doc: dict):
+        self.buffer.append(doc)
+        if len(self.buffer) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer and not self.header:
+            return
+        import pandas as pd
+        df = pd.DataFrame(self.buffer, columns=EXPORT_FIELDS)
+        self.file.write(df.to_csv(index=False, header=self.header))
+        self.header = False
+        self.count += len(self.buffer)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class ExcelSink:
+    """Classeur openpyxl en mode write-only : les lignes sont écrites au fil de l'eau"""
+    label = "Excel"
+    extension = "xlsx"
+
+    def __init__(self, path: Path):
+        from openpyxl import Workbook
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet("Sheet1")
+        self.sheet.append(EXPORT_FIELDS)
+        self.count = 0
+
+    def write(self, doc: dict):
+        row = []
+        for field in EXPORT_FIELDS:
+            value = doc.get(field)
+            if field == "_id" and value is not None:
+                value = str(value)
+            elif isinstance(value, float) and value != value:     # NaN → cellule vide
+                value = None
+            row.append(value)
+        self.sheet.append(row)
+        self.count += 1
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+class ParquetSink:
+    """Parquet à schéma fixe, un row group écrit tous les ROW_GROUP_SIZE documents"""
+    label = "Parquet"
+    extension = "parquet"
+
+    def __init__(self, path: Path, row_group_size: int = ROW_GROUP_SIZE):
+        self.path = path
+        self.buffer = ColumnBuffer()
+        import pyarrow.parquet as pq
+        self.writer = pq.ParquetWriter(path, self.buffer.schema, compression="snappy")
+        self.row_group_size = row_group_size
+        self.count = 0
+
+    def write(self, doc: dict):
+        self.buffer.append(doc)
+        if self.buffer.rows == self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer.rows:
+            self.count += self.buffer.rows
+            self.writer.write_batch(self.buffer.take())
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ArrowSink(ParquetSink):
+    """Fichier Arrow IPC (Feather v2) : lecture sans décodage par pyarrow / pandas / polars"""
+    label = "Arrow"
+    extension = "arrow"
+
+    def __init__(self, path: Path, row_group_size: int = ROW_GROUP_SIZE):
+        self.path = path
+        self.buffer = ColumnBuffer()
+        import pyarrow as pa
+        self.writer = pa.ipc.new_file(str(path), self.buffer.schema)
+        self.row_group_size = row_group_size
+        self.count = 0
+
+
+SINKS = {"json": JsonSink, "ndjson": NdjsonSink, "csv": CsvSink, "xlsx": ExcelSink,
+         "parquet": ParquetSink, "arrow": ArrowSink}
+
+
+def make_sink(fmt: str, timestamp: str, prefix: str = "collection_export",
+              compression: str | None = None, level: int | None = None, pretty: bool = PRETTY_JSON):
+    """
+    Crée la sortie d'un format. La compression ne s'applique qu'aux formats texte
+    (JSON, NDJSON, CSV) : XLSX, Parquet et Arrow sont déjà compressés.
+    """
+    sink_class = SINKS[fmt]
+    if not issubclass(sink_class, TextSink):
+        return sink_class(output_path(sink_class.extension, timestamp, prefix))
+    path = output_path(compressed_extension(sink_class.extension, compression), timestamp, prefix)
+    if sink_class is JsonSink:
+        return JsonSink(path, compression, level, pretty=pretty)
+    return sink_class(path, compression, level)
+
+def sink_stats(sink, seconds: float) -> dict:
+    """Taille, taux de compression et débit d'une sortie terminée"""
+    size = Path(sink.path).stat().st_size
+    raw = getattr(sink, "raw_bytes", None)
+    return {
+        "count": sink.count,
+        "bytes": size,
+        "raw_bytes": raw,
+        "ratio": round(raw / size, 2) if raw and size else None,
+        "seconds": round(seconds, 3),
+        "docs_per_s": round(sink.count / seconds) if seconds else None,
+        "mb_per_s": round((raw or size) / seconds / 1e6, 2) if seconds else None,
+    }
+
+def format_stats(stats: dict) -> str:
+    text = f"{stats['count']:,} documents, {stats['bytes'] / 1e6:.2f} Mo"
+    if stats["ratio"] and stats["raw_bytes"] != stats["bytes"]:
+        text += f" (brut {stats['raw_bytes'] / 1e6:.2f} Mo, ratio x{stats['ratio']})"
+    if stats["docs_per_s"] is not None:
+        text += f", {stats['docs_per_s']:,} doc/s, {stats['mb_per_s']} Mo/s"
+    return text
+
+
+# ===================== EXPORT =====================
+def export_to_sinks(collection: Collection, sinks: list, query: dict | None = None,
+                    sort: list | None = None, verbose: bool = True) -> list:
+    """
+    Lit le curseur une seule fois et envoie chaque document à toutes les sorties.
+    Les documents sont décodés du format de stockage (src/codec.py) : mêmes fichiers en standard et en compact.
+    Les partitions froides concernées par le filtre sont lues aussi (src/partitions.py).
+    """
+    start = datetime.now()
+    codec = get_codec(collection)
+    with profile("export_" + "_".join(sink.label.lower() for sink in sinks)):
+        cursor = get_router(collection).find(codec.encode_query(query or {}), EXPORT_PROJECTION,
+                                             codec.encode_sort(sort), batch_size=CHUNK_SIZE)
+        try:
+            for doc in (cursor if codec.identity else map(codec.decode, cursor)):
+                for sink in sinks:
+                    sink.write(doc)
+        finally:
+            if hasattr(cursor, "close"):    # fusion de plusieurs partitions : curseurs lus jusqu'au bout
+                cursor.close()
+            for sink in sinks:
+                sink.close()
+
+    # Un seul passage sur le curseur : la durée est commune à toutes les sorties
+    seconds = (datetime.now() - start).total_seconds()
+    for sink in sinks:
+        sink.stats = sink_stats(sink, seconds)
+        EXPORT_SECONDS.observe(seconds, format=sink.label)
+        EXPORT_DOCS.inc(sink.count, format=sink.label)
+        EXPORT_BYTES.inc(sink.stats["bytes"], format=sink.label)
+        if verbose:
+            print(f"✅ Export {sink.label} terminé : {sink.path} ({format_stats(sink.stats)})")
+            logging.info(f"Export {sink.label} - {sink.path} - {sink.stats}")
+    return sinks
+
+def export_all(collection: Collection, formats=("json", "csv", "xlsx"), compression: str | None = None,
+               level: int | None = None, pretty: bool = PRETTY_JSON) -> list:
+    """
+    Export multi-format en un seul passage sur la collection.
+    compression : None, "gzip", "zstd" ou "xz" (formats texte), level : niveau de compression.
+    pretty=False : JSON compact.
+    """
     timestamp = get_timestamp()
-    output_file = f"export/collection_export_{timestamp}.json"
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(data_clean, f, ensure_ascii=False, indent=4)
-    print(f"✅ Export JSON terminé : {output_file}")
+    sinks = [make_sink(fmt, timestamp, compression=compression, level=level, pretty=pretty) for fmt in formats]
+    return export_to_sinks(collection, sinks)
+
+# Export JSON
+def export_json(collection: Collection, ndjson: bool = False, compression: str | None = None,
+                pretty: bool = PRETTY_JSON):
+    return export_all(collection, ["ndjson" if ndjson else "json"], compression, pretty=pretty)[0].path
 
 
 # Export CSV
-def export_csv(collection: Collection):
-    data = list(collection.find())
-    df = pd.DataFrame(data)
-    timestamp = get_timestamp()
-    output_file = f"export/collection_export_{timestamp}.csv"
-    df.to_csv(output_file, index=False, encoding="utf-8")
-    print(f"✅ Export CSV terminé : {output_file}")
+def export_csv(collection: Collection, compression: str | None = None):
+    return export_all(collection, ["csv"], compression)[0].path
 
 
 # Export Excel
 def export_excel(collection: Collection):
-    data = list(collection.find())
-    df = pd.DataFrame(data)
+    return export_all(collection, ["xlsx"])[0].path
+
+
+# Export Parquet / Arrow (nécessite pyarrow)
+def export_parquet(collection: Collection):
+    return export_all(collection, ["parquet"])[0].path
+
+def export_arrow(collection: Collection):
+    return export_all(collection, ["arrow"])[0].path
+
+
+# ===================== EXPORT INCRÉMENTAL =====================
+def export_changes(collection: Collection, formats=("ndjson",), lag=WATERMARK_LAG,
+                   compression: str | None = None) -> dict:
+    """
+    Exporte uniquement les patients ajoutés / modifiés depuis le dernier export incrémental
+    (updated_at dans la fenêtre ]watermark, maintenant - lag]) et les suppressions
+    correspondantes (export/collection_changes_<timestamp>.deleted.ndjson).
+    Sans watermark (premier export, collection rechargée) : export complet (full=True), borné lui aussi
+    à updated_at <= maintenant - lag : l'export suivant ne reprend pas les mêmes documents.
+    Le watermark n'est enregistré qu'une fois tous les fichiers écrits.
+    Un document modifié pendant l'export peut figurer dans deux exports successifs (ancienne puis
+    nouvelle version) : les consommateurs appliquent les fichiers par upsert sur patient_id.
+    """
+    watermark = ExportWatermark(collection)
+    since = watermark.load()
+    until = utc_now() - lag
+    timestamp = get_timestamp()
+
+    window = {"$lte": until}
+    if since is not None:
+        window["$gt"] = since
+    # Export complet : tous les documents de la fenêtre, y compris ceux antérieurs au champ updated_at
+    query = {UPDATED_AT_FIELD: window}
+    if since is None:
+        query = {"$or": [query, {UPDATED_AT_FIELD: {"$exists": False}}]}
+
+    sinks = [make_sink(fmt, timestamp, "collection_changes", compression) for fmt in formats]
+    export_to_sinks(collection, sinks, query)
+    count = sinks[0].count if sinks else collection.count_documents(query)
+
+    deleted = 0
+    deleted_path = output_path("deleted.ndjson", timestamp, "collection_changes")
+    with open(deleted_path, "w", encoding="utf-8") as f:
+        if since is not None:
+            for doc in tombstones(collection).find({"deleted_at": window}, {"_id": 0}).sort("deleted_at", 1):
+                doc["deleted_at"] = doc["deleted_at"].isoformat()
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+                deleted += 1
+
+    summary = {
+        "since": since,
+        "full": since is None,
+        "count": count,
+        "deleted": deleted,
+        "files": [str(sink.path) for sink in sinks] + [str(deleted_path)],
+    }
+    watermark.save(until, summary)
+
+    print(f"✅ Export incrémental terminé : {count:,} patient(s) ajouté(s)/modifié(s), "
+          f"{deleted:,} suppression(s) {'(export complet)' if since is None else f'depuis {since}'}")
+    logging.info(f"Export incrémental - {count} documents - {deleted} suppressions - fenêtre {since} → {until}")
+    return {**summary, "until": until}
+
+
+# ===================== EXPORT PARALLÈLE PAR PLAGES DE patient_id =====================
+# Les patient_id ont une largeur fixe : l'ordre alphabétique est l'ordre numérique,
+# on découpe donc [premier, dernier] en plages numériques de même largeur.
+# Chaque plage est exportée par son propre worker (connexion et curseur dédiés)
+# dans des fichiers part-00001.<ext>, décrits par un manifest.json.
+
+def patient_id_ranges(collection: Collection, parts: int) -> list[tuple[str | None, str | None]]:
+    """
+    Bornes (incluse, exclue) des plages de patient_id. La première plage n'a pas de borne
+    basse et la dernière pas de borne haute : tout document appartient à une seule plage.
+    """
+    # Seuls les identifiants au format standard servent à calculer les bornes
+    canonical = {"patient_id": {"$regex": f"^{PATIENT_ID_PREFIX}[0-9]{{{PATIENT_ID_WIDTH}}}$"}}
+    first = collection.find_one(canonical, {"patient_id": 1}, sort=[("patient_id", 1)])
+    last = collection.find_one(canonical, {"patient_id": 1}, sort=[("patient_id", -1)])
+    low = parse_patient_id(first["patient_id"]) if first else None
+    high = parse_patient_id(last["patient_id"]) if last else None
+    if low is None or high is None or parts <= 1:
+        return [(None, None)]
+
+    step = max(1, math.ceil((high - low + 1) / parts))
+    bounds = [format_patient_id(n) for n in range(low + step, high + 1, step)]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+def range_query(lower: str | None, upper: str | None, query: dict | None = None) -> dict:
+    """Filtre d'une plage (utilise l'index unique sur patient_id)"""
+    if lower is None and upper is None:
+        condition = {}
+    elif lower is None:
+        # $not inclut aussi les documents sans patient_id (ou non texte)
+        condition = {"patient_id": {"$not": {"$gte": upper}}}
+    else:
+        condition = {"patient_id": {"$gte": lower, **({"$lt": upper} if upper else {})}}
+    if query:
+        return {"$and": [query, condition]} if condition else query
+    return condition
+
+def _export_part(collection: Collection, part: int, query: dict, formats: list[str], directory: str) -> dict:
+    """Exporte une plage dans ses fichiers part-XXXXX.<ext>"""
+    start = datetime.now()
+    sinks = [SINKS[fmt](Path(directory) / f"part-{part:05d}.{SINKS[fmt].extension}") for fmt in formats]
+    export_to_sinks(collection, sinks, query, sort=[("patient_id", 1)], verbose=False)
+    return {
+        "part": part,
+        "count": sinks[0].count if sinks else 0,
+        "files": {fmt: sink.path.name for fmt, sink in zip(formats, sinks)},
+        "seconds": round((datetime.now() - start).total_seconds(), 3),
+    }
+
+def _process_export_part(db_name: str, collection_name: str, part: int, query: dict,
+                         formats: list[str], directory: str) -> dict:
+    """Worker processus : client partagé propre au processus (recréé après le fork)"""
+    from .connection import get_client
+    return _export_part(get_client()[db_name][collection_name], part, query, formats, directory)
+
+
+# ----- Concaténation des parties -----
+def _copy_bytes(path: Path, out, start: int, end: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            out.write(block)
+            remaining -= len(block)
+
+def _concat_json(paths: list[Path], dest: Path):
+    """Fusionne les tableaux JSON ("[\n" ... "\n]") sans les relire en mémoire"""
+    with open(dest, "wb") as out:
+        first = True
+        for path in paths:
+            size = path.stat().st_size
+            if size <= 2:       # partie vide : "[]"
+                continue
+            out.write(b"[\n" if first else b",\n")
+            _copy_bytes(path, out, 2, size - 2)
+            first = False
+        out.write(b"[]" if first else b"\n]")
+
+def _concat_lines(paths: list[Path], dest: Path, header: bool = False):
+    """NDJSON / CSV : simple concaténation (en-tête CSV conservé une seule fois)"""
+    with open(dest, "wb") as out:
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                if header and i > 0:
+                    f.readline()
+                shutil.copyfileobj(f, out, 1 << 20)
+
+def _concat_xlsx(paths: list[Path], dest: Path):
+    from openpyxl import Workbook, load_workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    for i, path in enumerate(paths):
+        part = load_workbook(path, read_only=True)
+        for row in part.active.iter_rows(min_row=1 if i == 0 else 2, values_only=True):
+            sheet.append(row)
+        part.close()
+    workbook.save(dest)
+
+def _concat_parquet(paths: list[Path], dest: Path):
+    """Recopie les row groups un par un"""
+    import pyarrow.parquet as pq
+    writer = None
+    for path in paths:
+        part = pq.ParquetFile(path)
+        writer = writer or pq.ParquetWriter(dest, part.schema_arrow, compression="snappy")
+        for i in range(part.num_row_groups):
+            writer.write_table(part.read_row_group(i))
+    if writer:
+        writer.close()
+
+def _concat_arrow(paths: list[Path], dest: Path):
+    import pyarrow as pa
+    writer = None
+    for path in paths:
+        with pa.ipc.open_file(str(path)) as part:
+            writer = writer or pa.ipc.new_file(str(dest), part.schema)
+            for i in range(part.num_record_batches):
+                writer.write_batch(part.get_batch(i))
+    if writer:
+        writer.close()
+
+CONCAT = {
+    "json": _concat_json,
+    "ndjson": _concat_lines,
+    "csv": lambda paths, dest: _concat_lines(paths, dest, header=True),
+    "xlsx": _concat_xlsx,
+    "parquet": _concat_parquet,
+    "arrow": _concat_arrow,
+}
+
+
+def export_parallel(collection: Collection, formats=("json", "csv", "xlsx"), parts: int | None = None,
+                    workers: int = WORKERS, use_processes: bool = True, concat: bool = False,
+                    query: dict | None = None) -> dict:
+    """
+    Export parallèle : une plage de patient_id par worker (processus par défaut,
+    threads si use_processes=False), fichiers part-XXXXX.<ext> + manifest.json
+    dans export/collection_export_<timestamp>_parts/.
+    concat=True : fusionne aussi les parties en export/collection_export_<timestamp>.<ext>
+    (même contenu que export_all, dans l'ordre des patient_id).
+    Retourne le manifest.
+    """
+    start = datetime.now()
+    formats = list(formats)
     timestamp = get_timestamp()
-    output_file = f"export/collection_export_{timestamp}.xlsx"
-    df.to_excel(output_file, index=False)
-    print(f"✅ Export Excel terminé : {output_file}")
+    directory = EXPORT_DIR / f"collection_export_{timestamp}_parts"
+    directory.mkdir(parents=True, exist_ok=True)
+
+    ranges = patient_id_ranges(collection, parts or workers)
+    queries = [range_query(lower, upper, query) for lower, upper in ranges]
+    print(f"Export parallèle : {len(ranges)} plage(s) de patient_id, {workers} worker(s)...")
+
+    if use_processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        target = (_process_export_part, collection.database.name, collection.name)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        target = (_export_part, collection)
+    with executor:
+        futures = [executor.submit(*target, part, q, formats, str(directory))
+                   for part, q in enumerate(queries, start=1)]
+        results = [future.result() for future in futures]
+
+    for result, (lower, upper) in zip(results, ranges):
+        result["range"] = {"from": lower, "to": upper}
+        print(f"→ Partie {result['part']} ({lower or '…'} → {upper or '…'}) : {result['count']:,} documents")
+
+    manifest = {
+        "collection": f"{collection.database.name}.{collection.name}",
+        "created": start.isoformat(timespec="seconds"),
+        "formats": formats,
+        "count": sum(r["count"] for r in results),
+        "parts": results,
+        "files": {},
+    }
+
+    if concat:
+        for fmt in formats:
+            dest = output_path(SINKS[fmt].extension, timestamp)
+            CONCAT[fmt]([directory / r["files"][fmt] for r in results], dest)
+            manifest["files"][fmt] = str(dest)
+            print(f"✅ Export {SINKS[fmt].label} terminé : {dest}")
+
+    manifest["seconds"] = round((datetime.now() - start).total_seconds(), 3)
+    with open(directory / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+    print(f"✅ Export parallèle terminé : {manifest['count']:,} documents en {manifest['seconds']} s → {directory}")
+    logging.info(f"Export parallèle - {manifest['count']} documents - {len(results)} parties - {manifest['seconds']} s")
+    return manifest
@@ -0,0 +1,133 @@
+import weakref
+import threading
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# ===================== CONFIGURATION =====================
+COUNTER_COLLECTION = "counters"
+PATIENT_ID_PREFIX = "P"
+# Largeur fixe : l'ordre alphabétique des patient_id reste l'ordre numérique
+# jusqu'à 99 999 999 patients (P00000001 ...)
+PATIENT_ID_WIDTH = 8
+# Nombre d'identifiants réservés à la fois par un processus
+BLOCK_SIZE = 50
+# Code d'erreur MongoDB d'une clé unique déjà présente
+DUPLICATE_KEY = 11000
+
+
+# ===================== FORMAT DES IDENTIFIANTS =====================
+def format_patient_id(number: int) -> str:
+    """1 → P00000001"""
+    return f"{PATIENT_ID_PREFIX}{number:0{PATIENT_ID_WIDTH}d}"
+
+def parse_patient_id(value) -> int | None:
+    """P00000042 (ou p42, P00042) → 42, None si ce n'est pas un patient_id"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().upper()
+    if not value.startswith(PATIENT_ID_PREFIX) or not value[1:].isdigit():
+        return None
+    return int(value[1:])
+
+def normalize_patient_id(value) -> str | None:
+    """Remet un patient_id saisi à la largeur standard (P42 → P00000042)"""
+    number = parse_patient_id(value)
+    return format_patient_id(number) if number is not None else None
+
+def clean_patient_id(value) -> str | None:
+    """patient_id saisi par un utilisateur : largeur standard si reconnu, sinon tel quel en majuscules"""
+    if not value or not isinstance(value, str):
+        return None
+    return normalize_patient_id(value) or value.strip().upper()
+
+def legacy_id_query() -> dict:
+    """Filtre des patient_id plus courts que la largeur standard (bases chargées au format P00042)"""
+    return {"patient_id": {"$regex": f"^{PATIENT_ID_PREFIX}[0-9]{{1,{PATIENT_ID_WIDTH - 1}}}$"}}
+
+
+# ===================== ALLOCATEUR =====================
+# Allocateurs du processus (crud, migration incrémentale...) : reset() vide tous leurs blocs
+_allocators = weakref.WeakSet()
+
+class PatientIdAllocator:
+    """
+    Allocation atomique des patient_id via un document compteur
+    ({_id: "<collection>.patient_id", seq: n}) incrémenté par find_one_and_update/$inc.
+    Chaque processus réserve un bloc d'identifiants et les distribue localement :
+    aucun tri de la collection, aucune collision entre writers concurrents.
+    Les identifiants non utilisés d'un bloc sont perdus à l'arrêt du processus (trous).
+    reset() vide le bloc de tous les allocateurs du processus ; un autre processus garde le sien
+    jusqu'au premier conflit (DuplicateKeyError) : discard() puis nouvelle réservation.
+    """
+
+    def __init__(self, collection, block_size: int = BLOCK_SIZE):
+        self.collection = collection
+        self.counters = collection.database[COUNTER_COLLECTION]
+        self.key = f"{collection.name}.patient_id"
+        self.block_size = max(1, block_size)
+        self.lock = threading.Lock()
+        self.next_number = 1
+        self.end_number = 0         # bloc local vide
+        self.seeded = False
+        _allocators.add(self)
+
+    def sync(self):
+        """Aligne le compteur sur le plus grand patient_id présent (ne le fait jamais reculer)"""
+        last_doc = self.collection.find_one({"patient_id": {"$exists": True}}, {"patient_id": 1}, sort=[("patient_id", -1)])
+        number = parse_patient_id(last_doc["patient_id"]) if last_doc else None
+        self.advance_to(number or 0)
+
+    def advance_to(self, number: int):
+        """Garantit que les prochains identifiants seront > number"""
+        try:
+            self.counters.update_one({"_id": self.key}, {"$max": {"seq": number}}, upsert=True)
+        except DuplicateKeyError:
+            # Upsert concurrent : le document existe maintenant, on rejoue
+            self.counters.update_one({"_id": self.key}, {"$max": {"seq": number}})
+
+    def discard(self):
+        """Abandonne le bloc local (périmé) : la prochaine allocation fait une nouvelle réservation"""
+        with self.lock:
+            self.next_number, self.end_number = 1, 0
+            self.seeded = False
+
+    def reset(self):
+        """Supprime le compteur (collection vidée) et les blocs locaux des allocateurs du processus"""
+        self.counters.delete_one({"_id": self.key})
+        for allocator in list(_allocators):
+            if allocator.key == self.key and allocator.counters.full_name == self.counters.full_name:
+                allocator.discard()
+
+    def _reserve(self, count: int) -> range:
+        """Réserve count numéros consécutifs côté serveur (opération atomique)"""
+        if not self.seeded:
+            if self.counters.find_one({"_id": self.key}) is None:
+                self.sync()
+            self.seeded = True
+        doc = self.counters.find_one_and_update(
+            {"_id": self.key},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        end = doc["seq"]
+        return range(end - count + 1, end + 1)
+
+    def allocate(self, count: int) -> list[str]:
+        """Retourne count nouveaux patient_id (bloc local d'abord, puis une seule réservation)"""
+        with self.lock:
+            local = min(count, self.end_number - self.next_number + 1)
+            numbers = list(range(self.next_number, self.next_number + local))
+            self.next_number += local
+
+            missing = count - local
+            if missing:
+                # Réserve le reste + un bloc pour les prochains appels
+                reserved = self._reserve(missing + self.block_size)
+                numbers.extend(reserved[:missing])
+                self.next_number, self.end_number = reserved[missing], reserved[-1]
+
+        return [format_patient_id(n) for n in numbers]
+
+    def next_id(self) -> str:
+        return self.allocate(1)[0]
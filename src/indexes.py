@@ -0,0 +1,210 @@
+import logging
+from datetime import datetime, timedelta
+from pymongo import IndexModel
+
+from .search import NAME_INDEX, name_query
+from .changes import UPDATED_AT_FIELD, tombstones, utc_now
+from .codec import get_codec
+from .delta import DIGEST_COLLECTION
+
+# ===================== INDEX DÉCLARÉS =====================
+# Tous les index de la collection patients sont déclarés ici.
+# Les noms des index existants (patient_id_1, updated_at_1...) sont conservés :
+# une base déjà migrée n'est pas reconstruite.
+PATIENT_INDEXES = [
+    # Identifiant métier : lecture par id, pagination, plages de l'export parallèle
+    IndexModel([("patient_id", 1)], name="patient_id_1", unique=True),
+    # Recherche par début de mot du nom, triée par patient_id
+    IndexModel(NAME_INDEX, name="name_tokens_patient_id"),
+    # Export incrémental (fenêtre sur updated_at)
+    IndexModel([(UPDATED_AT_FIELD, 1)], name="updated_at_1"),
+    # Requêtes par établissement sur une période
+    IndexModel([("Hospital", 1), ("Date of Admission", 1)], name="hospital_admission"),
+    IndexModel([("Medical Condition", 1)], name="medical_condition"),
+    IndexModel([("Doctor", 1)], name="doctor"),
+]
+# Index présents pendant un chargement en masse (unicité de patient_id) ; les autres sont construits après
+LOAD_INDEXES = ["patient_id_1"]
+TOMBSTONE_INDEXES = [IndexModel([("deleted_at", 1)], name="deleted_at_1")]
+# Index des empreintes de la migration incrémentale : clés non vues pendant un run,
+# correspondances à oublier lors d'une suppression par le CRUD
+DIGEST_INDEXES = [IndexModel([("run", 1)], name="run_1"), IndexModel([("patient_id", 1)], name="patient_id_1")]
+
+
+def patient_indexes(collection) -> list[IndexModel]:
+    """PATIENT_INDEXES avec les noms de champs du format de stockage (mêmes noms d'index)"""
+    codec = get_codec(collection)
+    if codec.identity:
+        return PATIENT_INDEXES
+    models = []
+    for model in PATIENT_INDEXES:
+        options = {k: v for k, v in model.document.items() if k != "key"}
+        models.append(IndexModel([(codec.field(field), direction) for field, direction in model.document["key"].items()], **options))
+    return models
+
+def ensure_indexes(collection) -> list[str]:
+    """
+    Crée les index déclarés qui n'existent pas encore (sans effet sinon).
+    Un seul createIndexes : MongoDB construit tous les nouveaux index en un parcours de la collection.
+    """
+    names = collection.create_indexes(patient_indexes(collection))
+    tombstones(collection).create_indexes(TOMBSTONE_INDEXES)
+    collection.database[DIGEST_COLLECTION].create_indexes(DIGEST_INDEXES)
+    return names
+
+def ensure_load_indexes(collection) -> list[str]:
+    """Index unique sur patient_id créé avant le chargement : une reprise ou un ajout ne peut pas créer de doublon"""
+    return collection.create_indexes([model for model in patient_indexes(collection) if model.document["name"] in LOAD_INDEXES])
+
+def build_indexes(collection) -> list[str]:
+    """Construction des index après un chargement en masse (les insertions n'ont pas eu à les maintenir)"""
+    start = datetime.now()
+    existing = set(collection.index_information())
+    names = ensure_indexes(collection)
+    built = [name for name in names if name not in existing]
+    duration = datetime.now() - start
+    if built:
+        print(f"Index construits après chargement : {', '.join(built)} en {duration}")
+    logging.info(f"Index construits après chargement - {built} - durée {duration}")
+    return built
+
+def missing_indexes(collection) -> list[str]:
+    existing = set(collection.index_information())
+    return [model.document["name"] for model in PATIENT_INDEXES if model.document["name"] not in existing]
+
+
+# ===================== ANALYSE DES REQUÊTES (explain) =====================
+def plan_stages(plan: dict) -> list[str]:
+    """Étapes d'un plan d'exécution (COLLSCAN, IXSCAN, FETCH, SORT...), de la racine aux feuilles"""
+    stages = []
+    pending = [plan]
+    while pending:
+        node = pending.pop(0)
+        if "queryPlan" in node:        # moteur SBE (MongoDB 7+) : le plan classique est dans queryPlan
+            node = node["queryPlan"]
+        if "stage" in node:
+            stages.append(node["stage"])
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return stages
+
+def plan_indexes(plan: dict) -> list[str]:
+    names = []
+    pending = [plan]
+    while pending:
+        node = pending.pop(0)
+        node = node.get("queryPlan", node)
+        if node.get("indexName"):
+            names.append(node["indexName"])
+        if "inputStage" in node:
+            pending.append(node["inputStage"])
+        pending.extend(node.get("inputStages", []))
+    return names
+
+def suggest_index(query: dict, sort: list | None = None) -> list[tuple]:
+    """
+    Index conseillé pour une requête (règle ESR) : champs en égalité, puis champs du tri,
+    puis champs en plage. Les opérateurs $and sont aplatis, $or / $not ignorés.
+    """
+    equality, ranges = [], []
+    conditions = [query]
+    while conditions:
+        condition = conditions.pop(0)
+        for field, value in condition.items():
+            if field == "$and":
+                conditions.extend(value)
+            elif field.startswith("$"):
+                continue
+            elif isinstance(value, dict) and any(op in value for op in ("$gt", "$gte", "$lt", "$lte", "$regex", "$ne", "$not")):
+                ranges.append(field)
+            else:
+                equality.append(field)
+    keys = []
+    for field in [*equality, *(field for field, _ in sort or []), *ranges]:
+        if field not in [key for key, _ in keys]:
+            keys.append((field, 1))
+    return keys
+
+def query_shapes(collection) -> list[dict]:
+    """
+    Requêtes émises par read_patient / get_patient, les exports et les filtres des tableaux de bord,
+    avec des valeurs prises dans un document existant.
+    full_scan=True : parcours complet attendu (export de toute la collection).
+    """
+    codec = get_codec(collection)
+    sample = codec.decode(collection.find_one({}, codec.encode_projection({
+        "patient_id": 1, "Name": 1, "Hospital": 1, "Doctor": 1, "Medical Condition": 1, "Date of Admission": 1}))) or {}
+    patient_id = sample.get("patient_id", "P00000001")
+    name = (sample.get("Name") or "jackson").split()[0][:4]
+    admission = sample.get("Date of Admission") or datetime(2020, 1, 1)
+    since = utc_now() - timedelta(days=1)
+    return [
+        {"name": "read_patient (id)", "query": {"patient_id": patient_id}, "limit": 1},
+        {"name": "read_patient (nom)", "query": name_query(name), "sort": [("patient_id", 1)], "limit": 20},
+        {"name": "read_patient (nom, page suivante)", "query": name_query(name, patient_id),
+         "sort": [("patient_id", 1)], "limit": 20},
+        {"name": "export_all", "query": {}, "full_scan": True},
+        {"name": "export_parallel (plage)", "query": {"patient_id": {"$gte": patient_id}}, "sort": [("patient_id", 1)]},
+        {"name": "export_changes", "query": {UPDATED_AT_FIELD: {"$gt": since, "$lte": utc_now()}}},
+        {"name": "hôpital + période", "query": {"Hospital": sample.get("Hospital", ""),
+                                                "Date of Admission": {"$gte": admission}}},
+        {"name": "pathologie", "query": {"Medical Condition": sample.get("Medical Condition", "")}},
+        {"name": "médecin", "query": {"Doctor": sample.get("Doctor", "")}},
+    ]
+
+def explain_query(collection, query: dict, sort: list | None = None, limit: int = 0) -> dict:
+    """Plan retenu et statistiques d'exécution d'une requête find"""
+    cursor = collection.find(query)
+    if sort:
+        cursor = cursor.sort(sort)
+    if limit:
+        cursor = cursor.limit(limit)
+    explain = cursor.explain()
+    plan = explain["queryPlanner"]["winningPlan"]
+    stats = explain.get("executionStats", {})
+    stages = plan_stages(plan)
+    return {
+        "stages": stages,
+        "indexes": plan_indexes(plan),
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "returned": stats.get("nReturned"),
+        "ms": stats.get("executionTimeMillis"),
+    }
+
+def index_report(collection, verbose: bool = True) -> list[dict]:
+    """
+    Passe chaque requête connue dans explain() et signale les parcours complets de collection,
+    avec l'index conseillé (les index déclarés manquants sont aussi listés).
+    Les requêtes sont traduites dans le format de stockage (src/codec.py) avant explain().
+    """
+    codec = get_codec(collection)
+    report = []
+    for shape in query_shapes(collection):
+        query, sort = codec.encode_query(shape["query"]), codec.encode_sort(shape.get("sort"))
+        result = {"name": shape["name"], **explain_query(collection, query, sort, shape.get("limit", 0))}
+        result["expected_scan"] = shape.get("full_scan", False)
+        if result["collscan"] and not result["expected_scan"]:
+            result["suggested_index"] = suggest_index(query, sort)
+        report.append(result)
+
+    if verbose:
+        from tabulate import tabulate
+        rows = [[
+            r["name"],
+            " → ".join(r["stages"]),
+            ", ".join(r["indexes"]) or "-",
+            r["docs_examined"], r["keys_examined"], r["returned"],
+            "✅" if not r["collscan"] else ("ℹ️ attendu" if r["expected_scan"] else f"⚠️ COLLSCAN → {r['suggested_index']}"),
+        ] for r in report]
+        print(tabulate(rows, headers=["Requête", "Plan", "Index", "Docs lus", "Clés lues", "Retournés", "Verdict"]))
+        missing = missing_indexes(collection)
+        if missing:
+            print(f"⚠️ Index déclarés absents : {', '.join(missing)} → ensure_indexes(collection)")
+
+    scans = [r["name"] for r in report if r["collscan"] and not r["expected_scan"]]
+    if scans:
+        logging.warning(f"Requêtes en parcours complet de collection : {scans}")
+    return report
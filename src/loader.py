@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from pymongo import WriteConcern
+from pymongo.errors import BulkWriteError
+
+from .connection import get_collection
+
+# ===================== CONFIGURATION =====================
+WORKERS = 4
+# Chargement en masse : write concern des insertions (BULK_WRITE_W dans le .env)
+#   "1" (défaut) : acquittement du primaire seul, sans attendre le journal. Plus rapide que le défaut
+#                  implicite d'un replica set (w: "majority" depuis MongoDB 5.0) ; sur un serveur seul,
+#                  c'est déjà le défaut : rien n'est gagné
+#   "0"          : aucun acquittement, le plus rapide ; les erreurs par batch ne sont plus remontées
+#                  (le nombre de documents est affiché en fin de migration)
+#   "majority"   : aucun relâchement (même garantie que les écritures courantes d'un replica set)
+# Lu à la construction du BulkLoader (le .env n'est chargé qu'à la première connexion)
+DEFAULT_BULK_WRITE_W = "1"
+# Écriture finale journalisée : les insertions acquittées qui précèdent sont sur disque
+JOURNALED_WRITE_CONCERN = WriteConcern(w=1, j=True)
+META_COLLECTION = "migration_meta"
+
+
+def bulk_write_concern(w: int | str | None = None) -> WriteConcern:
+    """
+    Write concern du chargement en masse : w=0 / 1 / n ou "majority", jamais journalisé.
+    Sans w explicite, BULK_WRITE_W est lu dans l'environnement au moment de l'appel.
+    """
+    if w is None:
+        w = os.getenv("BULK_WRITE_W", DEFAULT_BULK_WRITE_W)
+    w = int(w) if str(w).isdigit() else w
+    return WriteConcern(w=w) if w == 0 else WriteConcern(w=w, j=False)
+
+
+# ===================== INSERTION D'UN BATCH =====================
+def insert_batch(collection, batch_no: int, records: list[dict]) -> dict:
+    """
+    Insère un batch en mode non ordonné.
+    Retourne le résultat du batch : {"batch", "inserted", "failed", "error", "committed", "seconds"}
+    committed=False si le batch n'a pas été traité par le serveur (erreur réseau...).
+    seconds : durée de l'insertion (mesurée dans le worker, thread ou processus).
+    """
+    if not records:     # batch entièrement rejeté par la validation
+        return {"batch": batch_no, "inserted": 0, "failed": 0, "error": None, "committed": True, "seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        result = collection.insert_many(records, ordered=False)
+        outcome = {"batch": batch_no, "inserted": len(result.inserted_ids), "failed": 0, "error": None, "committed": True}
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        outcome = {
+            "batch": batch_no,
+            "inserted": e.details.get("nInserted", 0),
+            "failed": len(errors),
+            "error": errors[0].get("errmsg") if errors else str(e),
+            "committed": True,
+        }
+    except Exception as e:
+        outcome = {"batch": batch_no, "inserted": 0, "failed": len(records), "error": str(e), "committed": False}
+    outcome["seconds"] = time.perf_counter() - start
+    return outcome
+
+
+# ===================== WORKERS PROCESSUS =====================
+# Chaque processus ouvre sa propre connexion (un MongoClient ne survit pas à un fork) :
+# le client partagé de src/connection.py est recréé dans le processus enfant
+_worker_collection = None
+
+def _init_process_worker(write_concern: dict):
+    global _worker_collection
+    _worker_collection = get_collection().with_options(write_concern=WriteConcern(**write_concern))
+
+def _process_insert_batch(batch_no: int, records: list[dict]) -> dict:
+    return insert_batch(_worker_collection, batch_no, records)
+
+
+# ===================== CHARGEUR PARALLÈLE =====================
+class BulkLoader:
+    """
+    Chargeur pipeliné : le thread appelant construit les batchs pendant que
+    plusieurs writers les insèrent en parallèle (threads ou processus).
+    Le nombre de batchs en attente est borné (2 x workers) pour limiter la mémoire.
+    """
+
+    def __init__(self, collection, workers: int = WORKERS, use_processes: bool = False,
+                 write_concern: WriteConcern | None = None, on_result=None):
+        # collection déjà ouverte → .env chargé : BULK_WRITE_W est résolu ici, pas à l'import
+        write_concern = write_concern or bulk_write_concern()
+        self.collection = collection
+        self.workers = max(1, workers)
+        self.use_processes = use_processes
+        self.on_result = on_result
+        self.max_pending = self.workers * 2
+        self.pending = set()
+        self.results = []
+
+        if use_processes:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_process_worker,
+                initargs=(write_concern.document,),
+            )
+        else:
+            self.bulk_collection = collection.with_options(write_concern=write_concern)
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def submit(self, batch_no: int, records: list[dict]):
+        """Envoie un batch à un writer (bloque si trop de batchs sont en attente)"""
+        if len(self.pending) >= self.max_pending:
+            self._collect(FIRST_COMPLETED)
+
+        if self.use_processes:
+            future = self.executor.submit(_process_insert_batch, batch_no, records)
+        else:
+            future = self.executor.submit(insert_batch, self.bulk_collection, batch_no, records)
+        self.pending.add(future)
+
+    def _collect(self, return_when):
+        done, self.pending = wait(self.pending, return_when=return_when)
+        for future in done:
+            result = future.result()
+            self.results.append(result)
+            if self.on_result:
+                self.on_result(result)
+
+    def close(self) -> list[dict]:
+        """Attend tous les writers, rétablit la journalisation et retourne les résultats triés par batch"""
+        self._collect(ALL_COMPLETED)
+        self.executor.shutdown()
+        self.restore_journaling()
+        return sorted(self.results, key=lambda r: r["batch"])
+
+    def restore_journaling(self):
+        """
+        Écriture journalisée de fin de chargement : elle n'est acquittée qu'une fois
+        le journal écrit sur disque, ce qui couvre toutes les insertions acquittées précédentes
+        (avec w=0, des insertions peuvent encore être en cours d'application).
+        """
+        meta = self.collection.database[META_COLLECTION].with_options(write_concern=JOURNALED_WRITE_CONCERN)
+        meta.update_one(
+            {"_id": "bulk_load"},
+            {"$set": {
+                "collection": self.collection.name,
+                "batches": len(self.results),
+                "inserted": sum(r["inserted"] for r in self.results),
+                "failed": sum(r["failed"] for r in self.results),
+                "finished_at": datetime.now(),
+            }},
+            upsert=True,
+        )
+        logging.info("Chargement terminé - journalisation rétablie (écriture j=True)")
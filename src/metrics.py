@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+import contextlib
+from pathlib import Path
+
+from pymongo import monitoring
+
+# ===================== CONFIGURATION =====================
+# Bornes des histogrammes (Prometheus : compteurs cumulés "le")
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+DOCS_BUCKETS = (1, 10, 100, 500, 1000, 2500, 5000, 10000, 50000)
+BYTES_BUCKETS = tuple(2 ** n for n in range(10, 31, 2))   # 1 Kio → 1 Gio
+# Dossier des profils par phase (cProfile + tracemalloc) : PROFILE_DIR dans le .env, désactivé si vide
+PROFILE_TOP = 25
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = [*extra, *key]
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+# ===================== MÉTRIQUES =====================
+class Counter:
+    """Compteur monotone, une valeur par combinaison de labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = _key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self.values.get(_key(labels), 0)
+
+    def samples(self) -> list[dict]:
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+    def prometheus(self) -> list[str]:
+        with self.lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self.values.items()]
+
+
+class Histogram:
+    """Distribution (latences, tailles de batch) : buckets cumulés, somme et nombre"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}        # labels → [compte par bucket..., +Inf, somme]
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(labels)
+        with self.lock:
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            else:
+                data[len(self.buckets)] += 1
+            data[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _cumulative(self, data: list) -> list:
+        total, cumulative = 0, []
+        for count in data[:-1]:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def samples(self) -> list[dict]:
+        with self.lock:
+            items = [(key, list(data)) for key, data in self.values.items()]
+        samples = []
+        for key, data in items:
+            cumulative = self._cumulative(data)
+            count = cumulative[-1]
+            samples.append({
+                "labels": dict(key),
+                "count": count,
+                "sum": data[-1],
+                "mean": data[-1] / count if count else None,
+                "buckets": {**{str(b): c for b, c in zip(self.buckets, cumulative)}, "+Inf": count},
+            })
+        return samples
+
+    def prometheus(self) -> list[str]:
+        lines = []
+        for sample in self.samples():
+            key = _key(sample["labels"])
+            for bound, count in sample["buckets"].items():
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', bound),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {sample['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {sample['count']}")
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques du processus (une seule instance par nom)"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get(Counter, name, help)
+
+    def histogram(self, name: str, help: str = "", buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def reset(self):
+        """Remet toutes les valeurs à zéro (les métriques déclarées restent enregistrées)"""
+        with self.lock:
+            for metric in self.metrics.values():
+                with metric.lock:
+                    metric.values.clear()
+
+    def to_dict(self) -> dict:
+        return {name: {"type": m.kind, "help": m.help, "samples": m.samples()} for name, m in sorted(self.metrics.items())}
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+
+def timed(name: str, help: str = "", label: str = "operation"):
+    """Décorateur : durée de chaque appel dans l'histogramme name, label = nom de la fonction"""
+    def decorator(func):
+        metric = histogram(name, help)
+        labels = {label: func.__name__}
+        errors = counter(f"{name.removesuffix('_seconds')}_errors_total", f"Exceptions levées ({help})")
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                errors.inc(**labels)
+                raise
+            finally:
+                metric.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def write_metrics(path: str) -> str:
+    """Écrit toutes les métriques : format Prometheus (.prom / .txt) ou JSON (.json)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".json":
+        path.write_text(json.dumps(REGISTRY.to_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+    else:
+        path.write_text(REGISTRY.to_prometheus(), encoding="utf-8")
+    logging.info(f"Métriques écrites dans {path}")
+    return str(path)
+
+
+# ===================== COMMANDES MONGODB =====================
+MONGO_COMMAND_SECONDS = histogram("mongo_command_seconds", "Durée des commandes MongoDB (aller-retour serveur)")
+MONGO_COMMAND_FAILURES = counter("mongo_command_failures_total", "Commandes MongoDB en échec")
+MONGO_COMMAND_RETRIES = counter("mongo_command_retries_total", "Commandes MongoDB relancées par le driver (retryable reads/writes)")
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Listener pymongo : latence et échecs de chaque commande (insert, find, getMore, update...).
+    Une relance garde l'operation_id de la commande en échec : c'est ainsi que les retries sont comptés.
+    """
+    MAX_TRACKED = 1024
+
+    def __init__(self):
+        self.failed_operations = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        if self.failed_operations and event.operation_id in self.failed_operations:
+            with self.lock:
+                self.failed_operations.pop(event.operation_id, None)
+            MONGO_COMMAND_RETRIES.inc(command=event.command_name)
+
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, command=event.command_name)
+        MONGO_COMMAND_FAILURES.inc(command=event.command_name)
+        with self.lock:
+            self.failed_operations[event.operation_id] = True
+            if len(self.failed_operations) > self.MAX_TRACKED:
+                self.failed_operations.pop(next(iter(self.failed_operations)))
+
+_listener = None
+
+def command_listener() -> CommandMetrics:
+    """Listener partagé par tous les clients du processus"""
+    global _listener
+    if _listener is None:
+        _listener = CommandMetrics()
+    return _listener
+
+
+# ===================== PROFILAGE PAR PHASE =====================
+# explicit : enable_profiling / disable_profiling l'emportent sur PROFILE_DIR
+_profiling = {"directory": None, "explicit": False, "active": False}
+
+def enable_profiling(directory: str = "logs/profiles"):
+    """Active profile(phase) : un .prof cProfile et un relevé tracemalloc par phase dans directory"""
+    _profiling.update(directory=Path(directory), explicit=True)
+
+def disable_profiling():
+    _profiling.update(directory=None, explicit=True)
+
+def _profile_directory() -> Path | None:
+    """Dossier des profils ; PROFILE_DIR est lu à chaque phase (le .env n'est chargé qu'à la connexion)"""
+    if _profiling["explicit"]:
+        return _profiling["directory"]
+    directory = os.getenv("PROFILE_DIR")
+    return Path(directory) if directory else None
+
+@contextlib.contextmanager
+def profile(phase: str):
+    """
+    Profil CPU (cProfile, thread appelant uniquement) et allocations mémoire (tracemalloc)
+    d'une phase. Sans effet si le profilage n'est pas activé ou si une phase est déjà profilée.
+    """
+    directory = _profile_directory()
+    if directory is None or _profiling["active"]:
+        yield
+        return
+
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    directory.mkdir(parents=True, exist_ok=True)
+    _profiling["active"] = True
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        seconds = time.perf_counter() - start
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        _profiling["active"] = False
+
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{phase}"
+        profiler.dump_stats(directory / f"{name}.prof")
+        with open(directory / f"{name}.txt", "w", encoding="utf-8") as f:
+            f.write(f"Phase {phase} : {seconds:.3f} s, pic mémoire tracé {peak / 1e6:.1f} Mo\n\n")
+            f.write(f"=== {PROFILE_TOP} fonctions les plus coûteuses (temps cumulé) ===\n")
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            f.write(f"\n=== {PROFILE_TOP} plus fortes allocations pendant la phase ===\n")
+            for stat in after.compare_to(before, "lineno")[:PROFILE_TOP]:
+                f.write(f"{stat}\n")
+        logging.info(f"Profil de la phase {phase} : {directory / name}.prof / .txt ({seconds:.3f} s)")
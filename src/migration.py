@@ -1,55 +1,81 @@
+from __future__ import annotations
+
 import os
+import io
 import logging
 from datetime import datetime
-import pandas as pd
-from tabulate import tabulate
+from typing import TYPE_CHECKING
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import OperationFailure, BulkWriteError
 
 # Pour une connexion sécurisée
-from .connection import MongoDBConnection
+from .connection import get_collection
+from .loader import BulkLoader, WORKERS
+from .checkpoint import CheckpointStore, file_fingerprint
+from .delta import DigestIndex, DIGEST_COLLECTION, DIGEST_FIELDS, natural_key, row_digest
+from .validation import validate_frame
+from .ids import PatientIdAllocator, format_patient_id, normalize_patient_id, legacy_id_query, PATIENT_ID_WIDTH
+from .search import NAME_TOKENS_FIELD, name_tokens, add_search_fields
+from .changes import UPDATED_AT_FIELD, ExportWatermark, record_tombstones, stamp, tombstones, utc_now
+from .indexes import build_indexes, ensure_indexes, ensure_load_indexes
+from .columnar import is_parquet, iter_parquet_chunks, parquet_row_count, parquet_columns, read_parquet
+from .metrics import counter, histogram, profile, DOCS_BUCKETS, BYTES_BUCKETS
+from .summary import rebuild_summaries
+from .codec import get_codec, set_storage_mode, default_storage_mode
+from .partitions import get_router
+
+# pandas n'est importé qu'à la lecture du fichier source (import du module rapide)
+if TYPE_CHECKING:
+    import pandas as pd
 
 # ===================== CONFIGURATION =====================
 CSV_PATH = "./data/healthcare_dataset.csv"
+# migrate(source=...) accepte aussi un fichier .parquet (export_parquet) : pas de parsing CSV
 BATCH_SIZE = 1000
+# Mode streaming : le CSV est lu par chunks de BATCH_SIZE lignes,
+# la mémoire utilisée dépend de la taille du batch et non du fichier
+STREAM = False
 
-# Configuration du logging
+# Métriques par batch, relevées dans le processus principal (workers threads ou processus)
+BATCH_SECONDS = histogram("migration_batch_seconds", "Durée d'insertion d'un batch")
+BATCH_DOCS = histogram("migration_batch_docs", "Documents insérés par batch", DOCS_BUCKETS)
+BATCH_BYTES = histogram("migration_batch_bytes", "Octets du CSV lus par batch (mode streaming)", BYTES_BUCKETS)
+MIGRATED_DOCS = counter("migration_docs_total", "Documents migrés par statut (inserted / failed)")
+MIGRATION_BATCHES = counter("migration_batches_total", "Batchs traités (committed=False : non validé par le serveur)")
+
+# Configuration du logging (appliquée par setup_logging(), pas à l'import)
 log_dir = os.path.join(os.path.dirname(__file__), "..", "logs")
-os.makedirs(log_dir, exist_ok=True)
 log_file = os.path.join(log_dir, "migration_report.log")
+_logging_ready = False
 
-logging.basicConfig(
-    filename=log_file,
-    encoding='utf-8',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filemode='a',
-    force=True
-)
+def setup_logging():
+    """Journal logs/migration_report.log (configuré une seule fois, au premier appel)"""
+    global _logging_ready
+    if _logging_ready:
+        return
+    os.makedirs(log_dir, exist_ok=True)
+    logging.basicConfig(
+        filename=log_file,
+        encoding='utf-8',
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        filemode='a',
+        force=True
+    )
+    _logging_ready = True
 
 # ===================== CONNEXION SÉCURISÉE =====================
-print("Connexion à MongoDB en cours...")
-mongo = MongoDBConnection()
-
-if not mongo.connect():
-    print("Échec de la connexion. Arrêt du script.")
-    exit(1)
-
-collection = mongo.collection
-print(f"Connecté à la base '{mongo.db_name}' → collection '{mongo.collection_name}'")
+# Client partagé du processus (src/connection.py), ouvert au premier appel de get_collection()
+def __getattr__(name):
+    if name == "collection":
+        return get_collection()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ===================== FONCTIONS =====================
-def check_data_integrity(df: pd.DataFrame):
-    """Vérifications complètes avant migration"""
-    print("\nVérification de l'intégrité des données...")
-    logging.info("Début vérification intégrité données")
-
+def scan_integrity(df: pd.DataFrame) -> tuple[pd.Series, list[str]]:
+    """Retourne les valeurs manquantes par colonne et la liste des problèmes détectés"""
     issues = []
-    print(f"→ {len(df):,} lignes | {len(df.columns)} colonnes")
-
-    # Valeurs manquantes
     missing = df.isnull().sum()
-    if missing.sum() > 0:
-        print("Valeurs manquantes détectées :")
-        print(missing[missing > 0])
 
     # Doublons sur patient_id
     if 'patient_id' in df.columns:
@@ -58,60 +84,349 @@ def check_data_integrity(df: pd.DataFrame):
             issues.append(f"{dup} doublons sur patient_id")
             logging.warning(f"{dup} doublons détectés sur patient_id")
 
-    # Typage
-    if 'diagnosis_date' in df.columns:
-        df['diagnosis_date'] = pd.to_datetime(df['diagnosis_date'], errors='coerce')
+    return missing, issues
+
+def report_integrity(missing: pd.Series, issues: list[str], rejected: pd.Series | None = None):
+    """Affiche le résultat de la vérification d'intégrité (rejected : nombre de lignes rejetées par motif)"""
+    if missing.sum() > 0:
+        print("Valeurs manquantes détectées :")
+        print(missing[missing > 0])
+
+    if rejected is not None and rejected.sum() > 0:
+        print(f"⚠️ {int(rejected.sum()):,} ligne(s) rejetée(s) par la validation (non migrées)")
+        for reason, count in rejected.items():
+            logging.warning(f"{int(count)} ligne(s) rejetée(s) : {reason}")
 
     if issues:
         print("Attention : Problèmes détectés :", issues)
     else:
         print("Données propres et prêtes pour la migration")
     logging.info("Vérification intégrité terminée")
+
+def validate_rows(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.Series]:
+    """
+    Validation et typage vectorisés (mêmes règles que add_patient) :
+    retourne les lignes valides et le nombre de lignes rejetées par motif.
+    """
+    clean, rejected = validate_frame(df)
+    return clean, rejected["reason"].value_counts()
+
+def check_data_integrity(df: pd.DataFrame):
+    """Vérifications complètes avant migration"""
+    print("\nVérification de l'intégrité des données...")
+    logging.info("Début vérification intégrité données")
+    print(f"→ {len(df):,} lignes | {len(df.columns)} colonnes")
+
+    missing, issues = scan_integrity(df)
+    df, rejected = validate_rows(df)
+
+    report_integrity(missing, issues, rejected)
     return df
 
+def count_csv_rows(path: str) -> int:
+    """Compte les lignes de données du CSV (hors en-tête) sans le charger en mémoire"""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1          # dernière ligne sans retour à la ligne
+    return max(lines - 1, 0)
+
 def generate_patient_id(row_index: int) -> str:
-    """Génère P00001, P00002, P00003..."""
-    return f"P{row_index + 1:05d}"   # :05d → 5 chiffres avec zéros
+    """Génère P00000001, P00000002, P00000003... (largeur fixe, tri alphabétique = tri numérique)"""
+    return format_patient_id(row_index + 1)
+
+def prepare_frame(df: pd.DataFrame, start_index: int = 0) -> pd.DataFrame:
+    """
+    Ajoute les patient_id en première colonne. Le numéro suit la position de la ligne
+    dans le fichier source (start_index + index), les lignes rejetées laissent un trou.
+    """
+    df['patient_id'] = [generate_patient_id(start_index + i) for i in df.index]
+    # Mots du nom normalisés pour la recherche indexée
+    df[NAME_TOKENS_FIELD] = df['Name'].map(name_tokens)
+    # Date d'écriture (export incrémental)
+    df[UPDATED_AT_FIELD] = utc_now()
+
+    # patient_id en première colonne 
+    cols = ['patient_id'] + [col for col in df.columns if col != 'patient_id']
+    return df[cols]
+
+def read_csv(source, **kwargs) -> pd.DataFrame:
+    import pandas as pd
+    return pd.read_csv(source, **kwargs)
+
+def iter_csv_chunks(path: str, chunk_size: int, offset: int = 0):
+    """
+    Lit le CSV par blocs de chunk_size lignes à partir de la position offset (en octets).
+    Renvoie (DataFrame, position de fin du bloc) : la position permet de reprendre
+    la lecture exactement après le dernier bloc inséré.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        if offset:
+            f.seek(offset)
+
+        lines = []
+        pending = b""
+        for line in f:
+            pending += line
+            # Un champ entre guillemets peut contenir un retour à la ligne
+            if pending.count(b'"') % 2:
+                continue
+            lines.append(pending)
+            pending = b""
+            if len(lines) == chunk_size:
+                yield read_csv(io.BytesIO(header + b"".join(lines))), f.tell()
+                lines = []
+        if pending:
+            lines.append(pending)
+        if lines:
+            yield read_csv(io.BytesIO(header + b"".join(lines))), f.tell()
+
+def iter_source_chunks(path: str, chunk_size: int, offset: int = 0):
+    """Chunks du fichier source : offset en octets pour un CSV, en lignes pour un Parquet"""
+    if is_parquet(path):
+        return iter_parquet_chunks(path, chunk_size, offset)
+    return iter_csv_chunks(path, chunk_size, offset)
+
+def count_source_rows(path: str) -> int:
+    return parquet_row_count(path) if is_parquet(path) else count_csv_rows(path)
+
+def source_columns(path: str) -> list[str]:
+    return parquet_columns(path) if is_parquet(path) else list(read_csv(path, nrows=0).columns)
+
+def read_source(path: str) -> pd.DataFrame:
+    return read_parquet(path) if is_parquet(path) else read_csv(path)
+
+def iter_batches(path: str, batch_size: int = BATCH_SIZE, offset: int = 0, start_index: int = 0):
+    """
+    Lecture en streaming : lit le fichier source (CSV ou Parquet) par chunks de batch_size lignes et renvoie
+    (index de la première ligne, nombre de lignes lues, liste de documents valides,
+    position de fin du chunk) pour chaque chunk.
+    Vérification d'intégrité, validation et attribution des patient_id faites chunk par chunk.
+    """
+    missing = None
+    rejected = None
+    issues = []
+
+    for chunk, end_offset in iter_source_chunks(path, batch_size, offset):
+        rows = len(chunk)
+        chunk_missing, chunk_issues = scan_integrity(chunk)
+        chunk, chunk_rejected = validate_rows(chunk)
+        missing = chunk_missing if missing is None else missing.add(chunk_missing, fill_value=0)
+        rejected = chunk_rejected if rejected is None else rejected.add(chunk_rejected, fill_value=0)
+        issues.extend(chunk_issues)
+
+        chunk = prepare_frame(chunk, start_index)
+        yield start_index, rows, chunk.to_dict("records"), end_offset
+        start_index += rows
+
+    # Bilan d'intégrité cumulé sur l'ensemble des chunks
+    if missing is not None:
+        report_integrity(missing.astype(int), issues, rejected)
+
+# ===================== STATISTIQUES PRÉ-CALCULÉES =====================
+def refresh_summaries(collection):
+    """Recalcul des statistiques (src/summary.py) ; un échec n'invalide pas la migration"""
+    print("\nCalcul des statistiques des tableaux de bord...")
+    start = datetime.now()
+    try:
+        counts = rebuild_summaries(collection)
+        print(f"→ {sum(counts.values()):,} documents de statistiques en {datetime.now() - start}")
+    except Exception as e:
+        print(f"⚠️ Statistiques non recalculées : {e}")
+        logging.warning(f"Statistiques non recalculées : {e}")
 
 # ===================== SUPPRESSION DE L'ANCIENNE COLLECTION =====================
-print("==========================================")
-print(f"Suppression de l'ancienne collection ''{mongo.collection_name}' si elle existe...")
-collection.drop()                                     
-print(f"Collection '{mongo.collection_name}' supprimée (ou inexistante → OK)")
-logging.info("Ancienne collection supprimée avant nouvelle migration")
-print("==========================================")
-
-def migrate():
-    """Migration principale"""
+def reset_collection():
+    """Supprime la collection (et son point de reprise) avant une nouvelle migration complète"""
+    collection = get_collection()
+    print("==========================================")
+    print(f"Suppression de l'ancienne collection ''{collection.name}' si elle existe...")
+    collection.drop()
+    # Partitions froides de l'ancienne collection (src/partitions.py)
+    get_router(collection).drop_partitions()
+    CheckpointStore(collection).clear()
+    PatientIdAllocator(collection).reset()
+    # Index des empreintes reconstruit par le prochain migrate_delta (build_digest_index)
+    DigestIndex(collection).clear()
+    # Collection rechargée : le prochain export incrémental repart d'un export complet
+    tombstones(collection).drop()
+    ExportWatermark(collection).clear()
+    # drop() supprime aussi les index : patient_id unique est recréé avant le chargement, les autres après (build_indexes)
+    print(f"Collection '{collection.name}' supprimée (ou inexistante → OK)")
+    logging.info("Ancienne collection supprimée avant nouvelle migration")
+    print("==========================================")
+
+def migrate(stream: bool = STREAM, batch_size: int = BATCH_SIZE,
+            workers: int = WORKERS, use_processes: bool = False,
+            drop: bool = False, resume: bool = False, source: str = CSV_PATH, storage: str | None = None):
+    """
+    Migration principale.
+    stream=True : lecture du fichier source par chunks (mémoire bornée par batch_size).
+    workers : nombre de writers parallèles (threads, ou processus si use_processes=True).
+    drop=True : supprime la collection avant la migration.
+    resume=True : reprend après le dernier batch validé (implique stream=True).
+    source : fichier CSV ou Parquet (.parquet) à migrer.
+    storage : format de stockage "standard" ou "compact" (src/codec.py), appliqué à une collection
+    rechargée (drop=True, défaut STORAGE_MODE) ou vide ; une collection existante garde son format.
+    """
+    setup_logging()
     start = datetime.now()
     logging.info("=== DÉBUT DE LA MIGRATION ===")
     print("\nDémarrage de la migration...")
 
-    if not os.path.exists(CSV_PATH):
-        print(f"Fichier introuvable : {CSV_PATH}")
+    if not os.path.exists(source):
+        print(f"Fichier introuvable : {source}")
         return False
 
-    df = pd.read_csv(CSV_PATH)
-    df = check_data_integrity(df)
-    
-    df['patient_id'] = [generate_patient_id(i) for i in range(len(df))]
+    collection = get_collection()
+    checkpoints = CheckpointStore(collection)
+    fingerprint = file_fingerprint(source)
+    checkpoint = None
 
-    # patient_id en première colonne 
-    cols = ['patient_id'] + [col for col in df.columns if col != 'patient_id']
-    df = df[cols]
+    if resume:
+        stream = True
+        checkpoint = checkpoints.load()
+        if checkpoint and (checkpoint["fingerprint"] != fingerprint or checkpoint["batch_size"] != batch_size):
+            print("Fichier source ou taille de batch modifiés depuis le dernier point de reprise → rechargement complet")
+            logging.warning("Point de reprise invalide (fichier ou batch_size différent) - rechargement complet")
+            checkpoint = None
+            drop = True
+        elif checkpoint and checkpoint["completed"]:
+            print("Migration déjà terminée pour ce fichier → rien à reprendre")
+            logging.info("Reprise demandée : migration déjà terminée")
+            return True
+        elif not checkpoint:
+            print("Aucun point de reprise trouvé → migration complète")
 
-    records = df.to_dict("records")
-    total = len(records)
-    print(f"\nInsertion de {total:,} patients par batchs de {BATCH_SIZE}...")
+    if drop:
+        reset_collection()
+        set_storage_mode(collection.database, storage or default_storage_mode())
+    elif storage and storage != get_codec(collection).mode:
+        if collection.estimated_document_count():
+            print(f"❌ La collection est au format {get_codec(collection).mode} : migrate(drop=True, storage={storage!r}) pour la recharger")
+            return False
+        set_storage_mode(collection.database, storage)
+    codec = get_codec(collection)
+    print(f"Format de stockage : {codec.mode}")
 
-    for i in range(0, total, BATCH_SIZE):
-        batch = records[i:i + BATCH_SIZE]
-        try:
-            collection.insert_many(batch, ordered=False)
-        except Exception as e:
-            logging.warning(f"Erreurs ignorées dans le batch {i//BATCH_SIZE + 1}: {e}")
+    # Unicité de patient_id garantie pendant les insertions (reprise, collection existante sans index)
+    try:
+        ensure_load_indexes(collection)
+    except OperationFailure as e:
+        print(f"❌ Index unique sur patient_id impossible (doublons déjà présents ?) : {e}")
+        logging.error(f"Index unique patient_id non créé avant la migration - {e}")
+        return False
+
+    offset, start_index, last_batch = 0, 0, 0
+    if checkpoint:
+        offset = checkpoint["offset"] or 0
+        start_index = checkpoint["rows"]
+        last_batch = checkpoint["last_batch"]
+        # Les batchs postérieurs au point de reprise ont pu être insérés partiellement
+        collection.delete_many({"patient_id": {"$gte": generate_patient_id(start_index)}})
+        print(f"Reprise après le batch {last_batch} ({start_index:,} lignes déjà migrées)")
+        logging.info(f"Reprise de la migration après le batch {last_batch} - {start_index} lignes")
+    else:
+        checkpoints.start(source, fingerprint, batch_size)
+
+    if stream:
+        # Mode streaming : seul un chunk de batch_size lignes est en mémoire
+        total = count_source_rows(source)
+        columns = source_columns(source)
+        print("\nVérification de l'intégrité des données...")
+        logging.info("Début vérification intégrité données")
+        print(f"→ {total:,} lignes | {len(columns)} colonnes")
+        batches = iter_batches(source, batch_size, offset, start_index)
+    else:
+        with profile("migrate_read"):
+            df = read_source(source)
+            df = check_data_integrity(df)
+            df = prepare_frame(df)
+            records = df.to_dict("records")
+
+        total = len(records)
+        batches = ((i, len(records[i:i + batch_size]), records[i:i + batch_size], None)
+                   for i in range(0, total, batch_size))
+
+    print(f"\nInsertion de {total - start_index:,} patients par batchs de {batch_size} ({workers} writers)...")
+
+    progress = {"done": start_index, "next_batch": last_batch + 1}
+    batch_ends = {}
+    batch_rows = {}
+    batch_bytes = {}
+    committed = set()
+
+    def on_result(result: dict):
+        progress["done"] += batch_rows.pop(result["batch"])
+        print(f"Progression : {min(progress['done'], total):,}/{total:,}")
+        BATCH_SECONDS.observe(result["seconds"])
+        BATCH_DOCS.observe(result["inserted"])
+        MIGRATED_DOCS.inc(result["inserted"], status="inserted")
+        MIGRATED_DOCS.inc(result["failed"], status="failed")
+        MIGRATION_BATCHES.inc(committed=result["committed"])
+        if result["batch"] in batch_bytes:
+            BATCH_BYTES.observe(batch_bytes.pop(result["batch"]))
 
-        print(f"Progression : {min(i + BATCH_SIZE, total):,}/{total:,}")    
+        # Le point de reprise n'avance que sur une suite continue de batchs validés
+        if not result["committed"]:
+            return
+        committed.add(result["batch"])
+        last = None
+        while progress["next_batch"] in committed:
+            last = progress["next_batch"]
+            committed.discard(last)
+            progress["next_batch"] += 1
+        if last is not None and stream:
+            end_offset, rows = batch_ends.pop(last)
+            for done in [b for b in batch_ends if b < last]:
+                batch_ends.pop(done)
+            checkpoints.save(last, end_offset, rows)
+
+    # En streaming CSV, la position de fin de batch est un offset en octets
+    csv_stream = stream and not is_parquet(source)
+    previous_offset = offset
+    with profile("migrate_load"):
+        loader = BulkLoader(collection, workers=workers, use_processes=use_processes, on_result=on_result)
+        for i, rows, batch, end_offset in batches:
+            batch_no = i // batch_size + 1
+            batch_ends[batch_no] = (end_offset, i + rows)
+            batch_rows[batch_no] = rows
+            if csv_stream:
+                batch_bytes[batch_no] = end_offset - previous_offset
+                previous_offset = end_offset
+            loader.submit(batch_no, codec.encode_many(batch))
+        results = loader.close()
+
+    # Rapport par batch
+    failed_batches = [r for r in results if r["failed"]]
+    for r in failed_batches:
+        logging.warning(f"Erreurs ignorées dans le batch {r['batch']}: {r['failed']} échec(s) - {r['error']}")
+    if failed_batches:
+        print(f"⚠️ {len(failed_batches)} batch(s) avec erreurs (voir migration_report.log)")
+
+    # Index construits une fois les données chargées : un seul parcours, au lieu d'une mise à jour
+    # de chaque index à chaque insertion (sans effet si la collection les avait déjà)
+    try:
+        build_indexes(collection)
+    except OperationFailure as e:
+        print(f"⚠️ Index non construits : {e} → ensure_indexes(collection) après correction")
+        logging.warning(f"Index non construits après chargement - {e}")
+
+    # Le compteur de patient_id repart après le plus grand identifiant migré
+    PatientIdAllocator(collection).sync()
+
+    # Statistiques des tableaux de bord recalculées une fois, après le chargement
+    refresh_summaries(collection)
+
+    if all(r["committed"] for r in results):
+        checkpoints.complete()
+    else:
+        print("⚠️ Certains batchs n'ont pas été validés → relancer avec migrate(resume=True)")
 
     duration = datetime.now() - start
     count = collection.count_documents({})
@@ -123,3 +438,195 @@ def migrate():
 
     return True
 
+
+# ===================== MIGRATION INCRÉMENTALE (DELTA) =====================
+def build_digest_index(index: DigestIndex, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Initialise l'index des empreintes à partir de la collection déjà migrée.
+    Les documents en double sur la clé naturelle (hors premier) sont supprimés.
+    """
+    print("Initialisation de l'index des empreintes à partir de la collection...")
+    collection = get_collection()
+    codec = get_codec(collection)
+    projection = codec.encode_projection({"_id": 0, "patient_id": 1, **{field: 1 for field in DIGEST_FIELDS}})
+    router = get_router(collection)
+    # Partitions froides comprises : un séjour archivé garde son empreinte (pas de réinsertion)
+    cursor = router.find({}, projection, [("patient_id", 1)], batch_size=batch_size)
+
+    duplicates = []
+    batch = []
+
+    def flush(docs: list[dict]):
+        entries = {}
+        known = index.lookup(list({natural_key(d) for d in docs}))
+        for doc in docs:
+            key = natural_key(doc)
+            if key in known or key in entries:
+                duplicates.append(doc["patient_id"])
+            else:
+                entries[key] = (key, doc["patient_id"], row_digest(doc))
+        # run=None : entrée vue dans la collection, pas dans la source ; seul le run qui la retrouve
+        # dans le fichier la marque, les autres sont supprimées comme absentes (index.stale)
+        index.write(index.upsert_ops(list(entries.values()), None))
+
+    for doc in cursor:
+        batch.append(codec.decode(doc))
+        if len(batch) == batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    if duplicates:
+        router.delete(duplicates)
+        record_tombstones(collection, duplicates)
+        logging.warning(f"Index des empreintes : {len(duplicates)} doublons de clé naturelle supprimés")
+    return len(duplicates)
+
+def migrate_delta(batch_size: int = BATCH_SIZE, source: str = CSV_PATH):
+    """
+    Migration incrémentale : compare l'empreinte de chaque ligne du fichier source (CSV ou Parquet) à l'index
+    des empreintes et n'envoie que les insertions, mises à jour et suppressions.
+    """
+    setup_logging()
+    start = datetime.now()
+    run = start.strftime("%Y%m%d%H%M%S%f")
+    logging.info("=== DÉBUT DE LA MIGRATION INCRÉMENTALE ===")
+    print("\nDémarrage de la migration incrémentale...")
+
+    if not os.path.exists(source):
+        print(f"Fichier introuvable : {source}")
+        return False
+
+    collection = get_collection()
+    index = DigestIndex(collection)
+    if index.is_empty() and collection.estimated_document_count():
+        build_digest_index(index, batch_size)
+
+    id_allocator = PatientIdAllocator(collection)
+    codec = get_codec(collection)
+    router = get_router(collection)
+    ensure_indexes(collection)
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "rejected": 0}
+
+    for chunk, _ in iter_source_chunks(source, batch_size):
+        chunk, rejected = validate_rows(chunk)
+        counts["rejected"] += int(rejected.sum())
+
+        # Même clé naturelle dans le chunk → la dernière ligne l'emporte
+        rows = {natural_key(record): record for record in chunk.to_dict("records")}
+        known = index.lookup(list(rows))
+        new_ids = iter(id_allocator.allocate(sum(key not in known for key in rows)))
+        now = utc_now()
+
+        docs, replaced, entries, unchanged = [], [], [], []
+        for key, record in rows.items():
+            digest = row_digest(record)
+            entry = known.get(key)
+            if entry is None:
+                patient_id = next(new_ids)
+                counts["inserted"] += 1
+            elif entry["digest"] != digest:
+                patient_id = entry["patient_id"]
+                counts["updated"] += 1
+            else:
+                unchanged.append(key)
+                counts["unchanged"] += 1
+                continue
+            docs.append(stamp(add_search_fields({"patient_id": patient_id, **record}), now))
+            replaced.append(entry is not None)
+            entries.append((key, patient_id, digest))
+
+        # Conversion au format de stockage en une fois pour tout le chunk
+        # upsert : un séjour modifié dont le patient_id a disparu (archivé en Parquet...) est réinséré
+        ops = [ReplaceOne({"patient_id": doc["patient_id"]}, doc, upsert=True) if replace else InsertOne(doc)
+               for doc, replace in zip(codec.encode_many(docs), replaced)]
+        if ops:
+            # Séjours modifiés encore archivés : ramenés dans la partition chaude avant le remplacement
+            router.restore([doc["patient_id"] for doc, replace in zip(docs, replaced) if replace])
+            result = collection.bulk_write(ops, ordered=False)
+            if result.upserted_count:
+                counts["updated"] -= result.upserted_count
+                counts["inserted"] += result.upserted_count
+                logging.warning(f"Migration incrémentale : {result.upserted_count} séjour(s) modifié(s) absent(s) de la collection, réinséré(s)")
+        index.write(index.upsert_ops(entries, run))
+        index.touch(unchanged, run)
+
+    # Clés absentes du fichier → séjours supprimés
+    stale_keys, stale_ids = [], []
+    for doc in index.stale(run):
+        stale_keys.append(doc["_id"])
+        stale_ids.append(doc["patient_id"])
+        if len(stale_keys) == batch_size:
+            router.delete(stale_ids)
+            record_tombstones(collection, stale_ids)
+            index.remove(stale_keys)
+            counts["deleted"] += len(stale_keys)
+            stale_keys, stale_ids = [], []
+    if stale_keys:
+        router.delete(stale_ids)
+        record_tombstones(collection, stale_ids)
+        index.remove(stale_keys)
+        counts["deleted"] += len(stale_keys)
+
+    if counts["inserted"] or counts["updated"] or counts["deleted"]:
+        refresh_summaries(collection)
+
+    duration = datetime.now() - start
+    print(f"\nMIGRATION INCRÉMENTALE TERMINÉE EN {duration} !")
+    print(f"→ {counts['inserted']:,} ajoutés | {counts['updated']:,} modifiés | "
+          f"{counts['deleted']:,} supprimés | {counts['unchanged']:,} inchangés | {counts['rejected']:,} rejetés")
+    logging.info(f"Migration incrémentale réussie - {counts} - durée {duration}")
+    logging.info(f"Date : {start} ")
+    logging.info(f"==========================================")
+
+    return True
+
+
+# ===================== IDENTIFIANTS HÉRITÉS (P00042) =====================
+def widen_patient_ids(batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Migration ponctuelle d'une base chargée avec l'ancien format à 5 chiffres (P00042) :
+    les patient_id sont remis à la largeur standard (P00000042) dans la collection patients,
+    ses partitions froides, les suppressions tracées et l'index des empreintes.
+    Les identifiants saisis (read_patient, update_patient...) sont normalisés à cette largeur :
+    sans cette migration, les documents hérités ne sont plus trouvés.
+    Sans effet sur une base déjà au format. Retourne le nombre d'identifiants modifiés par collection.
+    """
+    setup_logging()
+    collection = get_collection()
+    database = collection.database
+    targets = [*get_router(collection).collections(), tombstones(collection), database[DIGEST_COLLECTION]]
+    counts, conflicts = {}, 0
+
+    def flush(target, docs: list[dict]) -> int:
+        ops = [UpdateOne({"_id": doc["_id"]}, {"$set": {"patient_id": normalize_patient_id(doc["patient_id"])}})
+               for doc in docs]
+        try:
+            return target.bulk_write(ops, ordered=False).modified_count
+        except BulkWriteError as e:
+            # P00042 et P00000042 présents tous les deux : le document hérité garde son identifiant
+            nonlocal conflicts
+            conflicts += len(e.details.get("writeErrors", []))
+            return e.details.get("nModified", 0)
+
+    for target in targets:
+        widened, batch = 0, []
+        for doc in target.find(legacy_id_query(), {"patient_id": 1}).batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) == batch_size:
+                widened += flush(target, batch)
+                batch = []
+        if batch:
+            widened += flush(target, batch)
+        if widened:
+            counts[target.name] = widened
+
+    if counts:
+        # Identifiants modifiés : le prochain export incrémental repart d'un export complet
+        ExportWatermark(collection).clear()
+    print(f"✅ patient_id élargis à {PATIENT_ID_WIDTH} chiffres : {counts or 'aucun identifiant hérité'}")
+    if conflicts:
+        print(f"⚠️ {conflicts} identifiant(s) hérité(s) non modifié(s) : la version élargie existe déjà")
+    logging.info(f"Élargissement des patient_id - {counts} - {conflicts} conflit(s)")
+    return counts
@@ -0,0 +1,94 @@
+from bson import decode as bson_decode
+
+# ===================== CORRESPONDANCE CHAMPS → ATTRIBUTS =====================
+FIELD_ATTRS = {
+    "_id": "id",
+    "patient_id": "patient_id",
+    "Name": "name",
+    "Age": "age",
+    "Gender": "gender",
+    "Blood Type": "blood_type",
+    "Medical Condition": "medical_condition",
+    "Date of Admission": "date_of_admission",
+    "Doctor": "doctor",
+    "Hospital": "hospital",
+    "Insurance Provider": "insurance_provider",
+    "Billing Amount": "billing_amount",
+    "Room Number": "room_number",
+    "Admission Type": "admission_type",
+    "Discharge Date": "discharge_date",
+    "Medication": "medication",
+    "Test Results": "test_results",
+}
+ATTR_FIELDS = {attr: field for field, attr in FIELD_ATTRS.items()}
+
+# Champs affichés par read_patient
+DISPLAY_FIELDS = ["patient_id", "Name", "Age", "Medical Condition", "Date of Admission", "Hospital"]
+
+
+def projection(fields: list[str] | None) -> dict | None:
+    """Projection MongoDB (patient_id toujours inclus, _id seulement s'il est demandé)"""
+    if not fields:
+        return None
+    proj = {field: 1 for field in fields}
+    proj["patient_id"] = 1
+    if "_id" not in fields:
+        proj["_id"] = 0
+    return proj
+
+
+# ===================== ENREGISTREMENT PATIENT =====================
+class Patient:
+    """
+    Enregistrement patient compact (__slots__, pas de dict par objet).
+    Construit à partir du BSON brut : le décodage n'a lieu qu'au premier accès à un attribut.
+    Les champs non projetés valent None.
+    Accès aussi par nom de champ MongoDB : patient["Name"], patient.get("Age").
+    """
+
+    __slots__ = (*FIELD_ATTRS.values(), "_raw")
+
+    def __init__(self, raw: bytes | None = None, **values):
+        self._raw = raw
+        for attr, value in values.items():
+            setattr(self, attr, value)
+
+    @classmethod
+    def from_doc(cls, doc: dict) -> "Patient":
+        return cls(**{FIELD_ATTRS[k]: v for k, v in doc.items() if k in FIELD_ATTRS})
+
+    def _decode(self):
+        raw, self._raw = self._raw, None
+        for field, value in bson_decode(raw).items():
+            attr = FIELD_ATTRS.get(field)
+            if attr:
+                setattr(self, attr, value)
+
+    def __getattr__(self, attr):
+        # Appelé uniquement pour un slot non encore rempli
+        if attr not in ATTR_FIELDS:
+            raise AttributeError(attr)
+        if self._raw is not None:
+            self._decode()
+            try:
+                return object.__getattribute__(self, attr)
+            except AttributeError:
+                pass
+        return None
+
+    def get(self, field: str, default=None):
+        attr = FIELD_ATTRS.get(field)
+        value = getattr(self, attr) if attr else None
+        return default if value is None else value
+
+    def __getitem__(self, field: str):
+        if field not in FIELD_ATTRS:
+            raise KeyError(field)
+        return getattr(self, FIELD_ATTRS[field])
+
+    def to_dict(self) -> dict:
+        values = {field: getattr(self, attr) for field, attr in FIELD_ATTRS.items()}
+        return {field: value for field, value in values.items() if value is not None}
+
+    def __repr__(self):
+        return f"Patient({self.patient_id}, {self.name!r})"
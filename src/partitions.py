@@ -0,0 +1,398 @@
+import os
+import time
+import heapq
+import logging
+import itertools
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from pymongo import ReplaceOne, DeleteMany
+
+from .loader import META_COLLECTION
+from .codec import get_codec
+from .changes import utc_now
+
+# ===================== CONFIGURATION =====================
+# Partitionnement optionnel sur la date d'admission. La collection patients reste la partition
+# "chaude" (séjours en cours et récents) ; archive_patients() déplace les séjours terminés depuis
+# plus de ARCHIVE_RETENTION_DAYS vers des partitions "froides" :
+#   layout="single" : <collection>_archive
+#   layout="yearly" : <collection>_archive_<année d'admission>
+# ou hors de MongoDB, dans des fichiers Parquet (target="parquet").
+# ARCHIVE_RETENTION_DAYS dans le .env, lu à chaque archivage (voir archive_retention_days)
+DEFAULT_ARCHIVE_RETENTION_DAYS = 3 * 365
+ARCHIVE_LAYOUTS = ("single", "yearly")
+ARCHIVE_TARGETS = ("collection", "parquet")
+ARCHIVE_SUFFIX = "_archive"
+ARCHIVE_DIR = Path("archive")
+ARCHIVE_BATCH_SIZE = 1000
+# Lignes par fichier Parquet : les séjours ne sont supprimés qu'une fois leur fichier fermé
+ARCHIVE_FILE_ROWS = 100000
+# Description des partitions relue au plus tard après ce délai (archivage par un autre processus)
+ROUTER_REFRESH_SECONDS = 30
+
+ADMISSION_FIELD = "Date of Admission"
+DISCHARGE_FIELD = "Discharge Date"
+
+
+# ===================== BORNES DE DATES D'UN FILTRE =====================
+def _naive_utc(value: datetime) -> datetime:
+    """Les dates MongoDB sont relues sans fuseau (UTC) : comparaisons entre dates naïves"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+def date_bounds(query: dict | None, field: str) -> tuple[datetime | None, datetime | None]:
+    """
+    Bornes (basse, haute) imposées à field par le filtre : égalité, $gt/$gte/$lt/$lte, $and.
+    $or / $nor ne sont pas analysés (aucune borne : toutes les partitions sont lues).
+    """
+    low = high = None
+    conditions = [query or {}]
+    while conditions:
+        condition = conditions.pop()
+        for key, value in condition.items():
+            if key == "$and":
+                conditions.extend(value)
+            elif key == field:
+                operators = {"$eq": value} if isinstance(value, datetime) else value
+                if not isinstance(operators, dict):
+                    continue
+                for op, bound in operators.items():
+                    if not isinstance(bound, datetime):
+                        continue
+                    bound = _naive_utc(bound)
+                    if op in ("$eq", "$gt", "$gte"):
+                        low = bound if low is None else max(low, bound)
+                    if op in ("$eq", "$lt", "$lte"):
+                        high = bound if high is None else min(high, bound)
+    return low, high
+
+def _sort_key(sort: list):
+    fields = [field for field, _ in sort]
+    return lambda doc: tuple(doc.get(field) for field in fields)
+
+
+# ===================== ROUTEUR =====================
+class PartitionRouter:
+    """
+    Partitions à interroger pour un filtre. Description stockée dans migration_meta :
+    {_id: "partitions:<collection>", layout, archived_before, latest_admission, collections}
+    Tout séjour archivé est sorti avant archived_before et admis au plus tard le latest_admission :
+    un filtre dont la date de sortie ou d'admission commence après ne lit que la partition chaude ;
+    en layout yearly, seules les années comprises dans les bornes du filtre sont lues.
+    Les filtres, projections et tris sont au format de stockage (src/codec.py).
+    Sans archive, une seule collection : aucun surcoût.
+    """
+
+    def __init__(self, collection):
+        self.hot = collection
+        self.meta = collection.database[META_COLLECTION]
+        self.key = f"partitions:{collection.name}"
+        self.codec = get_codec(collection)
+        self.state = {}
+        self.loaded_at = None
+
+    # ----- Description des partitions -----
+    def refresh(self):
+        self.state = self.meta.find_one({"_id": self.key}) or {}
+        self.loaded_at = time.monotonic()
+
+    def refreshed(self) -> bool:
+        """Relit la description ; True si les partitions froides ont changé (archivage par un autre processus)"""
+        before = list(self.state.get("collections", []))
+        self.refresh()
+        return self.state.get("collections", []) != before
+
+    def stale(self) -> bool:
+        return self.loaded_at is None or time.monotonic() - self.loaded_at > ROUTER_REFRESH_SECONDS
+
+    def _state(self) -> dict:
+        if self.stale():
+            self.refresh()
+        return self.state
+
+    def cold_names(self) -> list[str]:
+        return list(self._state().get("collections", []))
+
+    def partition_name(self, admission) -> str:
+        """Partition froide d'un séjour selon le layout enregistré"""
+        name = f"{self.hot.name}{ARCHIVE_SUFFIX}"
+        if self._state().get("layout") == "yearly" and isinstance(admission, datetime):
+            name += f"_{admission.year}"
+        return name
+
+    def _partition_year(self, name: str) -> int | None:
+        suffix = name.removeprefix(f"{self.hot.name}{ARCHIVE_SUFFIX}_")
+        return int(suffix) if suffix.isdigit() else None
+
+    def collection_names(self, query: dict | None = None) -> list[str]:
+        """Partition chaude, puis partitions froides pouvant contenir des documents du filtre"""
+        state = self._state()
+        cold = state.get("collections")
+        if not cold:
+            return [self.hot.name]
+        archived_before, latest_admission = state.get("archived_before"), state.get("latest_admission")
+        low, high = date_bounds(query, self.codec.field(ADMISSION_FIELD))
+        discharge_low, _ = date_bounds(query, self.codec.field(DISCHARGE_FIELD))
+        if (archived_before is not None and discharge_low is not None and discharge_low >= archived_before) or \
+                (latest_admission is not None and low is not None and low > latest_admission):
+            return [self.hot.name]
+
+        names = [self.hot.name]
+        for name in cold:
+            year = self._partition_year(name)
+            if year is not None and ((low and year < low.year) or (high and year > high.year)):
+                continue
+            names.append(name)
+        return names
+
+    def collections(self, query: dict | None = None, codec_options=None) -> list:
+        database = self.hot.database
+        collections = []
+        for name in self.collection_names(query):
+            collection = self.hot if name == self.hot.name else database[name]
+            collections.append(collection.with_options(codec_options=codec_options) if codec_options else collection)
+        return collections
+
+    # ----- Lecture -----
+    def find(self, query: dict | None = None, projection: dict | None = None, sort: list | None = None,
+             limit: int = 0, codec_options=None, batch_size: int = 0):
+        """
+        find() sur les partitions concernées. Avec un tri, les curseurs (triés par le serveur)
+        sont fusionnés : même ordre qu'une collection unique (tous les champs du tri dans le même sens).
+        """
+        cursors = []
+        for collection in self.collections(query, codec_options):
+            cursor = collection.find(query or {}, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            if batch_size:
+                cursor = cursor.batch_size(batch_size)
+            cursors.append(cursor)
+        if len(cursors) == 1:
+            return cursors[0]
+        if sort:
+            merged = heapq.merge(*cursors, key=_sort_key(sort), reverse=sort[0][1] < 0)
+        else:
+            merged = itertools.chain(*cursors)
+        return itertools.islice(merged, limit) if limit else merged
+
+    def locate(self, query: dict, projection: dict | None = None):
+        """
+        (document, collection) du premier document trouvé, partition chaude d'abord.
+        Introuvable : la description est relue une fois (séjour archivé depuis moins de ROUTER_REFRESH_SECONDS).
+        """
+        for attempt in range(2):
+            for collection in self.collections(query):
+                doc = collection.find_one(query, projection)
+                if doc is not None:
+                    return doc, collection
+            if attempt or not self.refreshed():
+                break
+        return None, None
+
+    # ----- Écriture -----
+    def restore(self, patient_ids) -> int:
+        """
+        Ramène des séjours archivés dans la partition chaude (avant une mise à jour :
+        les partitions froides restent en lecture seule). Retourne le nombre de séjours ramenés.
+        """
+        patient_ids = list(patient_ids)
+        restored = 0
+        if patient_ids:
+            self.refresh()      # séjours absents de la partition chaude : description à jour avant de conclure
+        for name in self.cold_names() if patient_ids else []:
+            cold = self.hot.database[name]
+            docs = list(cold.find({"patient_id": {"$in": patient_ids}}))
+            if not docs:
+                continue
+            # Copie puis suppression : relancer après une interruption ne perd aucun séjour
+            self.hot.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+            cold.delete_many({"_id": {"$in": [doc["_id"] for doc in docs]}})
+            restored += len(docs)
+        if restored:
+            logging.info(f"{restored} séjour(s) archivé(s) ramené(s) dans {self.hot.name}")
+        return restored
+
+    def delete(self, patient_ids) -> int:
+        """Supprime des séjours quelle que soit leur partition"""
+        patient_ids = list(patient_ids)
+        deleted = 0
+        for collection in self.collections() if patient_ids else []:
+            deleted += collection.delete_many({"patient_id": {"$in": patient_ids}}).deleted_count
+        return deleted
+
+    def record_archive(self, layout: str, archived_before: datetime | None, names,
+                       latest_admission: datetime | None = None):
+        """
+        Enregistre les partitions froides et les bornes archived_before / latest_admission (qui ne reculent jamais).
+        latest_admission est enregistré avant la copie des séjours : le routeur ne les manque jamais.
+        """
+        update = {"$set": {"layout": layout, "updated_at": utc_now()}, "$addToSet": {"collections": {"$each": sorted(names)}}}
+        bounds = {"archived_before": archived_before, "latest_admission": latest_admission}
+        if any(value is not None for value in bounds.values()):
+            update["$max"] = {key: value for key, value in bounds.items() if value is not None}
+        self.meta.update_one({"_id": self.key}, update, upsert=True)
+        self.refresh()
+
+    def drop_partitions(self):
+        """Collection rechargée : partitions froides et description supprimées"""
+        for name in self.cold_names():
+            self.hot.database[name].drop()
+        self.meta.delete_one({"_id": self.key})
+        self.refresh()
+
+
+_routers = {}
+
+def get_router(collection) -> PartitionRouter:
+    """Routeur de la collection patients (un par client et par processus)"""
+    key = (id(collection.database.client), collection.full_name, os.getpid())
+    router = _routers.get(key)
+    if router is None or router.codec is not get_codec(collection):
+        router = _routers[key] = PartitionRouter(collection)
+    return router
+
+
+# ===================== ARCHIVAGE =====================
+def archive_retention_days() -> int:
+    """
+    ARCHIVE_RETENTION_DAYS lu au moment de l'appel (le .env n'est chargé qu'à la première connexion).
+    Lève ValueError si la valeur n'est pas un nombre de jours entier positif.
+    """
+    value = os.getenv("ARCHIVE_RETENTION_DAYS")
+    if value is None or not value.strip():
+        return DEFAULT_ARCHIVE_RETENTION_DAYS
+    try:
+        days = int(value)
+    except ValueError:
+        days = -1
+    if days < 0:
+        raise ValueError(f"ARCHIVE_RETENTION_DAYS invalide : {value!r} (nombre de jours entier positif attendu)")
+    return days
+
+def archive_patients(collection=None, retention_days: int | None = None, target: str = "collection",
+                     layout: str | None = None, batch_size: int = ARCHIVE_BATCH_SIZE,
+                     directory: Path | str | None = None) -> dict:
+    """
+    Déplace les séjours terminés depuis plus de retention_days (Discharge Date) hors de la partition chaude
+    (défaut : ARCHIVE_RETENTION_DAYS, 3 ans).
+    target="collection" : vers <collection>_archive (layout="single") ou <collection>_archive_<année>
+    (layout="yearly") ; le CRUD et les exports continuent de les lire via le routeur.
+    target="parquet" : vers archive/<collection>_<timestamp>/part-XXXXX.parquet, hors de MongoDB
+    (statistiques décomptées ; l'index des empreintes les garde : migrate_delta ne réinsère que ceux modifiés dans la source).
+    Copie puis suppression par batch : relancer après une interruption termine le travail.
+    """
+    from .connection import get_collection
+    from .indexes import ensure_indexes
+
+    if target not in ARCHIVE_TARGETS:
+        raise ValueError(f"Cible d'archivage inconnue : {target} (attendu : {', '.join(ARCHIVE_TARGETS)})")
+    collection = collection if collection is not None else get_collection()
+    if retention_days is None:
+        retention_days = archive_retention_days()
+    router = get_router(collection)
+    router.refresh()
+    layout = layout or router.state.get("layout") or "single"
+    if layout not in ARCHIVE_LAYOUTS:
+        raise ValueError(f"Layout inconnu : {layout} (attendu : {', '.join(ARCHIVE_LAYOUTS)})")
+    if target == "collection" and router.state.get("layout", layout) != layout:
+        raise ValueError(f"Partitions déjà au layout {router.state['layout']} : drop_partitions() avant d'en changer")
+
+    start = datetime.now()
+    codec = router.codec
+    cutoff = _naive_utc(utc_now()) - timedelta(days=retention_days)
+    query = {codec.field(DISCHARGE_FIELD): {"$lt": cutoff}}
+    print(f"Archivage des séjours terminés avant le {cutoff:%Y-%m-%d} → {target} ({layout if target == 'collection' else ARCHIVE_DIR})...")
+
+    if target == "collection":
+        router.record_archive(layout, None, [])     # layout enregistré avant le premier déplacement
+        moved, names = _archive_to_collections(collection, router, query, batch_size, ensure_indexes)
+        router.record_archive(layout, cutoff, names)
+        files = []
+    else:
+        moved, files = _archive_to_parquet(collection, query, batch_size, Path(directory or ARCHIVE_DIR))
+        names = []
+
+    summary = {
+        "target": target,
+        "archived": moved,
+        "archived_before": cutoff,
+        "collections": sorted(names),
+        "files": files,
+        "seconds": round((datetime.now() - start).total_seconds(), 3),
+    }
+    print(f"✅ {moved:,} séjour(s) archivé(s) en {summary['seconds']} s")
+    logging.info(f"Archivage - {moved} séjours terminés avant {cutoff} - {target} - {summary['collections'] or files}")
+    return summary
+
+def _archive_to_collections(collection, router, query: dict, batch_size: int, ensure_indexes) -> tuple[int, set]:
+    """Copie (ReplaceOne upsert, même _id) dans la partition froide, puis suppression de la partition chaude"""
+    admission = router.codec.field(ADMISSION_FIELD)
+    moved, names = 0, set()
+    while True:
+        batch = list(collection.find(query).sort("patient_id", 1).limit(batch_size))
+        if not batch:
+            return moved, names
+        groups = {}
+        for doc in batch:
+            groups.setdefault(router.partition_name(doc.get(admission)), []).append(doc)
+        # Partitions et dates d'admission visibles par le routeur avant la copie
+        admissions = [doc[admission] for doc in batch if isinstance(doc.get(admission), datetime)]
+        router.record_archive(router.state.get("layout", "single"), None, groups, max(admissions, default=None))
+        for name, docs in groups.items():
+            cold = collection.database[name]
+            if name not in names:
+                ensure_indexes(cold)
+                names.add(name)
+            cold.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in docs], ordered=False)
+        collection.bulk_write([DeleteMany({"_id": {"$in": [doc["_id"] for doc in batch]}})])
+        moved += len(batch)
+        print(f"Progression : {moved:,} séjour(s) archivé(s)")
+
+def _archive_to_parquet(collection, query: dict, batch_size: int, directory: Path) -> tuple[int, list[str]]:
+    """Fichiers de ARCHIVE_FILE_ROWS séjours ; chaque fichier fermé, ses séjours sont supprimés"""
+    from .export import ParquetSink
+    from .summary import SUMMARY_FIELDS, summary_updates, apply_summary_updates
+
+    codec = get_codec(collection)
+    directory = directory / f"{collection.name}_{datetime.now():%Y%m%d_%H%M%S}"
+    directory.mkdir(parents=True, exist_ok=True)
+    moved, files = 0, []
+
+    def flush(sink, ids, docs):
+        sink.close()
+        collection.bulk_write([DeleteMany({"_id": {"$in": ids}})])
+        apply_summary_updates(collection.database, summary_updates([(doc, None) for doc in docs], codec))
+        files.append(str(sink.path))
+
+    sink, ids, docs = None, [], []
+    cursor = collection.find(query).sort("patient_id", 1).batch_size(batch_size)
+    for stored in cursor:
+        if sink is None:
+            sink = ParquetSink(directory / f"part-{len(files) + 1:05d}.parquet")
+        doc = codec.decode(stored)
+        sink.write(doc)
+        ids.append(stored["_id"])
+        docs.append({field: doc.get(field) for field in SUMMARY_FIELDS})
+        moved += 1
+        if len(ids) == ARCHIVE_FILE_ROWS:
+            flush(sink, ids, docs)
+            sink, ids, docs = None, [], []
+            print(f"Progression : {moved:,} séjour(s) archivé(s)")
+    if sink is not None:
+        flush(sink, ids, docs)
+    return moved, files
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archivage des séjours terminés (partitions froides ou Parquet)")
+    parser.add_argument("--retention-days", type=int, help="défaut : ARCHIVE_RETENTION_DAYS (3 ans)")
+    parser.add_argument("--target", choices=ARCHIVE_TARGETS, default="collection")
+    parser.add_argument("--layout", choices=ARCHIVE_LAYOUTS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    archive_patients(retention_days=args.retention_days, target=args.target, layout=args.layout,
+                     batch_size=args.batch_size)
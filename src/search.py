@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from pymongo import UpdateOne
+
+from .codec import get_codec
+
+# ===================== CONFIGURATION =====================
+# Mots du nom normalisés (minuscules, sans accents) : index multikey utilisable
+# par les recherches par préfixe, contrairement à une regex insensible à la casse
+NAME_TOKENS_FIELD = "name_tokens"
+NAME_INDEX = [(NAME_TOKENS_FIELD, 1), ("patient_id", 1)]
+PAGE_SIZE = 20
+
+
+# ===================== NORMALISATION =====================
+def normalize_name(name) -> str:
+    """ " Émilie  DUPONT " → "emilie dupont" """
+    if not isinstance(name, str):
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.lower().split())
+
+def name_tokens(name) -> list[str]:
+    return normalize_name(name).split()
+
+def add_search_fields(doc: dict) -> dict:
+    """Ajoute (ou met à jour) les champs de recherche dérivés du nom"""
+    if "Name" in doc:
+        doc[NAME_TOKENS_FIELD] = name_tokens(doc["Name"])
+    return doc
+
+
+# ===================== REQUÊTES =====================
+def name_query(search: str, after: str | None = None) -> dict | None:
+    """
+    Filtre MongoDB : chaque mot saisi est le préfixe d'un mot du nom.
+    Regex ancrée sur une valeur en minuscules + caractères échappés → bornes d'index exactes.
+    after : patient_id du dernier résultat de la page précédente (pagination).
+    """
+    tokens = name_tokens(search)
+    if not tokens:
+        return None
+    conditions = [{NAME_TOKENS_FIELD: {"$regex": f"^{re.escape(token)}"}} for token in tokens]
+    if after:
+        conditions.append({"patient_id": {"$gt": after}})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def text_query(search: str, after: str | None = None) -> dict:
+    """Recherche par mots entiers via l'index texte (ensure_search_indexes(text=True))"""
+    query = {"$text": {"$search": search}}
+    if after:
+        query["patient_id"] = {"$gt": after}
+    return query
+
+
+# ===================== INDEX & RATTRAPAGE =====================
+def ensure_search_indexes(collection, text: bool = False):
+    collection.create_index(NAME_INDEX, name="name_tokens_patient_id")
+    if text:
+        collection.create_index([(get_codec(collection).field("Name"), "text")], name="name_text", default_language="none")
+
+def backfill_name_tokens(collection, batch_size: int = 1000) -> int:
+    """Calcule name_tokens pour les documents existants qui ne l'ont pas encore"""
+    name_field = get_codec(collection).field("Name")
+    updated = 0
+    ops = []
+    for doc in collection.find({NAME_TOKENS_FIELD: {"$exists": False}}, {name_field: 1}):
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {NAME_TOKENS_FIELD: name_tokens(doc.get(name_field))}}))
+        if len(ops) == batch_size:
+            collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+    return updated
@@ -0,0 +1,214 @@
+import logging
+from datetime import datetime
+from pymongo import UpdateOne, DeleteOne
+
+from .changes import utc_now
+from .codec import database_codec, get_codec
+
+# ===================== CONFIGURATION =====================
+# Statistiques pré-calculées pour les tableaux de bord (quelques centaines de documents
+# au lieu d'un parcours complet de la collection patients)
+BILLING_COLLECTION = "stats_billing"                   # montant facturé par hôpital et assureur
+ADMISSIONS_COLLECTION = "stats_admissions_monthly"     # admissions par mois et pathologie
+STAY_COLLECTION = "stats_stay_by_doctor"               # durée de séjour par médecin
+# Champs patient utilisés par les statistiques (lus avant une mise à jour / suppression)
+SUMMARY_FIELDS = ["Hospital", "Insurance Provider", "Billing Amount", "Medical Condition",
+                  "Doctor", "Date of Admission", "Discharge Date"]
+MS_PER_DAY = 24 * 60 * 60 * 1000
+# Champs de regroupement : texte, ou code entier du dictionnaire en stockage compact
+KEY_TYPE = {"$type": ["string", "int"]}
+
+
+# ===================== CONTRIBUTION D'UN PATIENT =====================
+# Chaque fonction retourne (_id du document de statistiques, valeurs à additionner),
+# ou None si le patient n'a pas les champs nécessaires (même filtre que le $match du pipeline)
+
+def _billing(doc: dict):
+    hospital, insurer, amount = doc.get("Hospital"), doc.get("Insurance Provider"), doc.get("Billing Amount")
+    if not isinstance(hospital, str) or not isinstance(insurer, str) or not isinstance(amount, (int, float)):
+        return None
+    return {"hospital": hospital, "insurer": insurer}, {"billing_total": float(amount), "patients": 1}
+
+def _admissions(doc: dict):
+    admission, condition = doc.get("Date of Admission"), doc.get("Medical Condition")
+    if not isinstance(admission, datetime) or not isinstance(condition, str):
+        return None
+    return {"month": admission.strftime("%Y-%m"), "condition": condition}, {"admissions": 1}
+
+def _stay(doc: dict):
+    doctor, admission, discharge = doc.get("Doctor"), doc.get("Date of Admission"), doc.get("Discharge Date")
+    if not isinstance(doctor, str) or not isinstance(admission, datetime) or not isinstance(discharge, datetime):
+        return None
+    days = (discharge - admission).total_seconds() * 1000 / MS_PER_DAY
+    return doctor, {"stay_days_total": days, "stays": 1}
+
+# Collection → (contribution, champ de comptage, champs patient de la clé, filtre et regroupement
+# du recalcul complet). match / group reçoivent f(champ) → nom du champ stocké (src/codec.py) :
+# en stockage compact, les clés des statistiques contiennent les codes du dictionnaire.
+# La moyenne de séjour n'est pas stockée (somme + nombre) : elle reste exacte après un $inc
+ROLLUPS = {
+    BILLING_COLLECTION: {
+        "contribution": _billing,
+        "count": "patients",
+        "key_fields": {"hospital": "Hospital", "insurer": "Insurance Provider"},
+        "match": lambda f: {f("Hospital"): KEY_TYPE, f("Insurance Provider"): KEY_TYPE,
+                            f("Billing Amount"): {"$type": "number"}},
+        "group": lambda f: {
+            "_id": {"hospital": f"${f('Hospital')}", "insurer": f"${f('Insurance Provider')}"},
+            # Montants en Decimal128 (stockage compact) : totaux en double comme les $inc incrémentaux
+            "billing_total": {"$sum": {"$toDouble": f"${f('Billing Amount')}"}},
+            "patients": {"$sum": 1},
+        },
+    },
+    ADMISSIONS_COLLECTION: {
+        "contribution": _admissions,
+        "count": "admissions",
+        "key_fields": {"condition": "Medical Condition"},
+        "match": lambda f: {f("Date of Admission"): {"$type": "date"}, f("Medical Condition"): {"$type": "string"}},
+        "group": lambda f: {
+            "_id": {
+                "month": {"$dateToString": {"format": "%Y-%m", "date": f"${f('Date of Admission')}"}},
+                "condition": f"${f('Medical Condition')}",
+            },
+            "admissions": {"$sum": 1},
+        },
+    },
+    STAY_COLLECTION: {
+        "contribution": _stay,
+        "count": "stays",
+        "key_fields": "Doctor",
+        "match": lambda f: {f("Doctor"): KEY_TYPE, f("Date of Admission"): {"$type": "date"},
+                            f("Discharge Date"): {"$type": "date"}},
+        "group": lambda f: {
+            "_id": f"${f('Doctor')}",
+            "stay_days_total": {"$sum": {"$divide": [{"$subtract": [f"${f('Discharge Date')}", f"${f('Date of Admission')}"]}, MS_PER_DAY]}},
+            "stays": {"$sum": 1},
+        },
+    },
+}
+
+def _convert_key(key, fields, convert):
+    """Applique convert(champ patient, valeur) aux parties de la clé issues d'un champ patient"""
+    if isinstance(fields, str):
+        return convert(fields, key)
+    return {part: convert(fields[part], value) if part in fields else value for part, value in key.items()}
+
+# ===================== RECALCUL COMPLET ($merge) =====================
+def summary_pipelines(built_at: datetime, codec=None, union=()) -> dict[str, list]:
+    """
+    Pipeline d'agrégation de chaque collection de statistiques (résultat fusionné par $merge).
+    union : partitions froides (src/partitions.py) ajoutées par $unionWith, avec le même filtre.
+    """
+    field = codec.field if codec else (lambda name: name)
+    return {
+        name: [
+            {"$match": rollup["match"](field)},
+            *({"$unionWith": {"coll": cold, "pipeline": [{"$match": rollup["match"](field)}]}} for cold in union),
+            {"$group": rollup["group"](field)},
+            {"$set": {"built_at": built_at}},
+            {"$merge": {"into": name, "whenMatched": "replace", "whenNotMatched": "insert"}},
+        ]
+        for name, rollup in ROLLUPS.items()
+    }
+
+def rebuild_summaries(collection) -> dict:
+    """
+    Recalcule toutes les statistiques à partir de la collection patients.
+    Les documents sont remplacés sur place ($merge), puis ceux qui n'existent plus
+    (built_at antérieur) sont supprimés : les tableaux de bord ne voient jamais de collection vide.
+    Les séjours archivés dans des partitions froides sont comptés ; ceux archivés en Parquet ne le sont plus.
+    Retourne le nombre de documents par collection de statistiques.
+    """
+    from .partitions import get_router
+
+    built_at = utc_now()
+    database = collection.database
+    counts = {}
+    union = get_router(collection).cold_names()
+    for name, pipeline in summary_pipelines(built_at, get_codec(collection), union).items():
+        collection.aggregate(pipeline, allowDiskUse=True)
+        database[name].delete_many({"built_at": {"$ne": built_at}})
+        counts[name] = database[name].estimated_document_count()
+    logging.info(f"Statistiques recalculées : {counts}")
+    return counts
+
+
+# ===================== MISE À JOUR INCRÉMENTALE =====================
+def summary_updates(changes, codec=None) -> dict[str, list]:
+    """
+    Opérations à appliquer aux statistiques pour des écritures patients.
+    changes : paires (ancien document ou None, nouveau document ou None), documents décodés
+    → ajout (None, doc), mise à jour (avant, après), suppression (doc, None).
+    codec : format de stockage, les clés sont converties comme celles du recalcul complet.
+    Les écarts sont cumulés par document de statistiques : un seul $inc par clé.
+    """
+    updates = {}
+    for name, rollup in ROLLUPS.items():
+        deltas = {}
+        for old, new in changes:
+            for doc, sign in ((old, -1), (new, 1)):
+                contribution = rollup["contribution"](doc) if doc else None
+                if contribution is None:
+                    continue
+                key, values = contribution
+                if codec is not None and not codec.identity:
+                    key = _convert_key(key, rollup["key_fields"], codec.encode_value)
+                marker = tuple(key.items()) if isinstance(key, dict) else key
+                _, totals = deltas.setdefault(marker, (key, {}))
+                for field, value in values.items():
+                    totals[field] = totals.get(field, 0) + sign * value
+
+        ops = []
+        for key, totals in deltas.values():
+            if all(abs(value) < 1e-9 for value in totals.values()):
+                continue    # mise à jour sans effet sur cette statistique
+            ops.append(UpdateOne({"_id": key}, {"$inc": totals}, upsert=True))
+            if totals.get(rollup["count"], 0) < 0:
+                # Plus aucun patient pour cette clé : le document disparaît
+                ops.append(DeleteOne({"_id": key, rollup["count"]: {"$lte": 0}}))
+        if ops:
+            updates[name] = ops
+    return updates
+
+def apply_summary_updates(database, updates: dict[str, list]):
+    """Applique summary_updates() ; une erreur n'interrompt pas l'écriture patient (rebuild_summaries corrige)"""
+    for name, ops in updates.items():
+        try:
+            database[name].bulk_write(ops, ordered=True)
+        except Exception as e:
+            print(f"⚠️ Statistiques {name} non mises à jour : {e}")
+            logging.warning(f"Statistiques {name} non mises à jour ({e}) - relancer rebuild_summaries()")
+
+
+# ===================== LECTURE (TABLEAUX DE BORD) =====================
+def _decode_key(database, name: str, key):
+    codec = database_codec(database)
+    return key if codec.identity else _convert_key(key, ROLLUPS[name]["key_fields"], codec.decode_value)
+
+def billing_by_hospital(database, hospital: str | None = None, insurer: str | None = None) -> list[dict]:
+    codec = database_codec(database)
+    query = {}
+    if hospital:
+        query["_id.hospital"] = codec.query_value("Hospital", hospital)
+    if insurer:
+        query["_id.insurer"] = codec.query_value("Insurance Provider", insurer)
+    return [
+        {**_decode_key(database, BILLING_COLLECTION, doc["_id"]), "billing_total": round(doc["billing_total"], 2),
+         "patients": doc["patients"], "billing_average": round(doc["billing_total"] / doc["patients"], 2)}
+        for doc in database[BILLING_COLLECTION].find(query).sort("billing_total", -1)
+    ]
+
+def admissions_by_month(database, condition: str | None = None) -> list[dict]:
+    query = {"_id.condition": condition} if condition else {}
+    return [
+        {**doc["_id"], "admissions": doc["admissions"]}
+        for doc in database[ADMISSIONS_COLLECTION].find(query).sort("_id.month", 1)
+    ]
+
+def average_stay_by_doctor(database, limit: int = 0) -> list[dict]:
+    """Durée moyenne de séjour (jours) par médecin, calculée à la lecture (somme / nombre)"""
+    return [
+        {"doctor": _decode_key(database, STAY_COLLECTION, doc["_id"]), "stays": doc["stays"],
+         "average_stay_days": round(doc["stay_days_total"] / doc["stays"], 2)}
+        for doc in database[STAY_COLLECTION].find({"stays": {"$gt": 0}}).sort("stays", -1).limit(limit)
+    ]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
+
+from .metrics import counter
+
+# pandas n'est importé qu'au premier appel (import du module instantané)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# ===================== RÈGLES DE VALIDATION =====================
+PATIENT_FIELDS = [
+    "Name", "Age", "Gender", "Blood Type", "Medical Condition",
+    "Date of Admission", "Doctor", "Hospital", "Insurance Provider",
+    "Billing Amount", "Room Number", "Admission Type",
+    "Discharge Date", "Medication", "Test Results"
+]
+
+ALLOWED_GENDERS = {"Male", "Female", "Other"}
+ALLOWED_BLOOD_TYPES = {"A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"}
+
+# Champs texte obligatoires (non vides)
+TEXT_FIELDS = ["Name", "Medical Condition", "Doctor", "Hospital", "Insurance Provider", "Admission Type"]
+DATE_FIELDS = ["Date of Admission", "Discharge Date"]
+DATE_FORMAT = "%Y-%m-%d"
+AGE_RANGE = (0, 150)
+
+# kind : row (ligne complète) / update (mise à jour partielle), result : valid / rejected
+VALIDATIONS = counter("validation_total", "Validations de patients par résultat")
+
+
+# ===================== VALIDATION VECTORISÉE =====================
+def _strip(series: pd.Series) -> pd.Series:
+    """Supprime les espaces autour des chaînes, sans toucher aux autres types"""
+    return series.map(lambda v: v.strip() if isinstance(v, str) else v)
+
+def _as_text(series: pd.Series) -> pd.Series:
+    """Convertit en texte (les valeurs manquantes restent manquantes)"""
+    return series.astype("string").str.strip()
+
+def _to_number(series: pd.Series) -> pd.Series:
+    """Conversion numérique (accepte la virgule décimale), NaN si impossible"""
+    import pandas as pd
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    return pd.to_numeric(_as_text(series).str.replace(",", ".", regex=False), errors="coerce")
+
+def _to_date(series: pd.Series) -> pd.Series:
+    """Dates au format YYYY-MM-DD (ou déjà typées), NaT si invalide"""
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(_as_text(series), format=DATE_FORMAT, errors="coerce")
+
+def validate_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Valide et type un DataFrame de patients colonne par colonne.
+    Retourne (lignes valides typées, lignes rejetées avec une colonne "reason").
+    """
+    import pandas as pd
+    missing_fields = [field for field in PATIENT_FIELDS if field not in df.columns]
+    if missing_fields:
+        rejected = df.copy()
+        rejected["reason"] = f"Champ manquant : {', '.join(missing_fields)}"
+        VALIDATIONS.inc(len(rejected), kind="row", result="rejected")
+        return pd.DataFrame(columns=PATIENT_FIELDS), rejected
+
+    clean = pd.DataFrame(index=df.index)
+    reasons = pd.Series("", index=df.index, dtype="object")
+
+    def reject(mask: pd.Series, reason: str):
+        mask = mask.fillna(True).astype(bool)
+        reasons[mask] = reasons[mask] + reason + "; "
+
+    # Champs texte obligatoires
+    for field in TEXT_FIELDS:
+        is_text = df[field].map(lambda v: isinstance(v, str))
+        text = _as_text(df[field])
+        reject(~is_text | text.isna() | (text == ""), f"{field} vide")
+        clean[field] = text
+
+    # Age : entier entre 0 et 150
+    age = _to_number(df["Age"])
+    reject(age.isna() | (age % 1 != 0) | ~age.between(*AGE_RANGE), "Age invalide")
+    clean["Age"] = age
+
+    # Valeurs énumérées
+    gender = _as_text(df["Gender"])
+    reject(~gender.isin(ALLOWED_GENDERS), "Gender invalide")
+    clean["Gender"] = gender
+
+    blood = _as_text(df["Blood Type"])
+    reject(~blood.isin(ALLOWED_BLOOD_TYPES), "Blood Type invalide")
+    clean["Blood Type"] = blood
+
+    # Dates
+    for field in DATE_FIELDS:
+        dates = _to_date(df[field])
+        reject(dates.isna(), f"{field} invalide")
+        clean[field] = dates
+
+    # Montant arrondi au centime
+    amount = _to_number(df["Billing Amount"])
+    reject(amount.isna(), "Billing Amount invalide")
+    clean["Billing Amount"] = amount.round(2)
+
+    # Numéro de chambre entier
+    room = _to_number(df["Room Number"])
+    reject(room.isna() | (room % 1 != 0), "Room Number invalide")
+    clean["Room Number"] = room
+
+    # Champs libres
+    clean["Medication"] = _strip(df["Medication"])
+    clean["Test Results"] = _strip(df["Test Results"])
+
+    valid = reasons == ""
+    clean = clean.loc[valid, PATIENT_FIELDS]
+    clean["Age"] = clean["Age"].astype("int64")
+    clean["Room Number"] = clean["Room Number"].astype("int64")
+    clean = clean.astype({field: object for field in TEXT_FIELDS + ["Gender", "Blood Type"]})
+
+    rejected = df.loc[~valid].copy()
+    rejected["reason"] = reasons[~valid].str.rstrip("; ")
+    VALIDATIONS.inc(len(clean), kind="row", result="valid")
+    VALIDATIONS.inc(len(rejected), kind="row", result="rejected")
+    return clean, rejected
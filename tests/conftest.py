@@ -0,0 +1,61 @@
+import os
+import itertools
+
+import pytest
+
+from src import connection, crud, migration
+
+# Base MongoDB en mémoire (mongomock, dépendance de test uniquement : requirements-dev.txt)
+mongomock = pytest.importorskip("mongomock")
+
+_databases = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    return mongomock.MongoClient()
+
+@pytest.fixture(autouse=True)
+def mongo(mongo_client, monkeypatch, tmp_path):
+    """
+    Une base vide par test sur le client mongomock partagé (codecs et routeurs
+    sont mis en cache par client et par base). Journal de migration écrit dans tmp_path.
+    """
+    monkeypatch.setenv("MONGO_DB", f"test_{next(_databases)}")
+    for var, value in {"MONGO_PORT": "27017", "MONGO_USER": "test", "MONGO_PASSWORD": "test",
+                       "MONGO_AUTH_SOURCE": "admin", "MONGO_COLLECTION": "patients"}.items():
+        monkeypatch.setenv(var, os.getenv(var) or value)
+    monkeypatch.setattr(connection, "MongoClient", lambda **settings: mongo_client)
+    monkeypatch.setattr(migration, "log_dir", str(tmp_path))
+    monkeypatch.setattr(migration, "log_file", str(tmp_path / "migration_report.log"))
+    monkeypatch.setattr(migration, "_logging_ready", False)
+    crud.disable_cache()
+    connection.close_connection()
+    yield mongo_client
+    connection.close_connection()
+
+@pytest.fixture
+def dotenv_file(tmp_path, monkeypatch):
+    """
+    Écrit un .env et le charge après l'import des modules, comme la première connexion :
+    les réglages doivent être lus à l'appel, pas à l'import.
+    """
+    from dotenv import load_dotenv
+
+    def write(**variables):
+        path = tmp_path / ".env"
+        path.write_text("".join(f"{name}={value}\n" for name, value in variables.items()), encoding="utf-8")
+        for name in variables:
+            monkeypatch.setenv(name, "")     # restauré (supprimé) à la fin du test
+            monkeypatch.delenv(name)
+        load_dotenv(path)
+        return path
+
+    return write
+
+@pytest.fixture
+def patients_csv(tmp_path):
+    """CSV synthétique de 40 séjours valides (mêmes colonnes que healthcare_dataset.csv)"""
+    from bench.dataset import generate_csv
+
+    return generate_csv(str(tmp_path / "patients.csv"), 40, seed=7)
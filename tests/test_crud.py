@@ -0,0 +1,64 @@
+import itertools
+from datetime import timedelta
+
+import pytest
+
+from bench.dataset import generate_rows
+from src import crud
+from src.connection import get_collection
+from src.changes import utc_now
+from src.ids import clean_patient_id
+
+
+@pytest.fixture
+def patient_ids():
+    results = crud.add_patients(itertools.islice(generate_rows(3, seed=11), 3))
+    assert [result["status"] for result in results] == ["inserted"] * 3
+    return [result["patient_id"] for result in results]
+
+def _updated_at(patient_id):
+    return get_collection().find_one({"patient_id": patient_id})["updated_at"]
+
+
+@pytest.mark.parametrize("value, expected", [("p42", "P00000042"), (" P00000042 ", "P00000042"),
+                                             ("x-7", "X-7"), ("", None), (42, None)])
+def test_clean_patient_id(value, expected):
+    assert clean_patient_id(value) == expected
+
+def test_update_patients_stamps_only_changed_patients(patient_ids, monkeypatch):
+    later = utc_now() + timedelta(seconds=1)
+    monkeypatch.setattr(crud, "utc_now", lambda: later)
+    unchanged, changed, _ = patient_ids
+    stamps = {pid: _updated_at(pid) for pid in patient_ids}
+    age = get_collection().find_one({"patient_id": unchanged})["Age"]
+
+    results = crud.update_patients({unchanged: {"Age": age}, changed: {"Age": 7}, "P99999999": {"Age": 7}})
+
+    assert [result["status"] for result in results] == ["updated", "updated", "not_found"]
+    assert _updated_at(unchanged) == stamps[unchanged]
+    assert _updated_at(changed) > stamps[changed]
+    assert get_collection().find_one({"patient_id": changed})["Age"] == 7
+
+def test_update_patient_without_change_keeps_stamp(patient_ids):
+    patient_id = patient_ids[0]
+    stamp = _updated_at(patient_id)
+    age = get_collection().find_one({"patient_id": patient_id})["Age"]
+    assert crud.update_patient(patient_id.lower(), {"Age": age}).startswith("ℹ️")
+    assert _updated_at(patient_id) == stamp
+
+def test_read_patient_returns_dicts(patient_ids):
+    short_id = f"p{int(patient_ids[1][1:])}"     # P00000002 → p2
+    patients = crud.read_patient(short_id, fields=crud.DISPLAY_FIELDS)
+    assert len(patients) == 1
+    assert isinstance(patients[0], dict)
+    assert patients[0]["patient_id"] == patient_ids[1]
+
+def test_cache_invalidated_after_update(patient_ids):
+    crud.enable_cache()
+    try:
+        patient_id = patient_ids[0]
+        assert crud.get_patient(patient_id)["Age"] != 5
+        crud.update_patient(patient_id, {"Age": 5})
+        assert crud.get_patient(patient_id)["Age"] == 5
+    finally:
+        crud.disable_cache()
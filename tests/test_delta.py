@@ -0,0 +1,40 @@
+import pandas as pd
+
+from src.connection import get_collection
+from src.migration import migrate, migrate_delta
+
+
+def _stay(row) -> dict:
+    return {"Name": row["Name"], "Age": int(row["Age"]), "Room Number": int(row["Room Number"])}
+
+def test_first_delta_after_full_load_deletes_removed_rows(patients_csv, tmp_path):
+    assert migrate(drop=True, source=patients_csv, batch_size=16)
+    collection = get_collection()
+    rows = pd.read_csv(patients_csv)
+    removed = rows.iloc[3]
+    assert collection.count_documents(_stay(removed)) == 1
+
+    source = tmp_path / "without_row.csv"
+    rows.drop(index=3).to_csv(source, index=False)
+    migrate_delta(source=str(source), batch_size=16)
+
+    assert collection.count_documents(_stay(removed)) == 0
+    assert collection.count_documents({}) == len(rows) - 1
+
+def test_delta_updates_changed_rows_only(patients_csv, tmp_path):
+    migrate(drop=True, source=patients_csv, batch_size=16)
+    collection = get_collection()
+    rows = pd.read_csv(patients_csv)
+    before = {doc["patient_id"]: doc.get("updated_at") for doc in collection.find({}, {"patient_id": 1, "updated_at": 1})}
+
+    changed = rows.copy()
+    changed.loc[5, "Room Number"] = 999
+    source = tmp_path / "changed.csv"
+    changed.to_csv(source, index=False)
+    migrate_delta(source=str(source), batch_size=16)
+
+    updated = collection.find_one(_stay(changed.iloc[5]))
+    assert updated is not None
+    assert collection.count_documents({}) == len(rows)
+    after = {doc["patient_id"]: doc.get("updated_at") for doc in collection.find({}, {"patient_id": 1, "updated_at": 1})}
+    assert [pid for pid in after if after[pid] != before.get(pid)] == [updated["patient_id"]]
@@ -0,0 +1,68 @@
+import pytest
+
+from src.connection import get_collection
+from src.codec import get_codec
+from src.loader import BulkLoader
+from src.metrics import profile, enable_profiling, disable_profiling, _profiling
+from src.migration import migrate
+from src.partitions import archive_retention_days, DEFAULT_ARCHIVE_RETENTION_DAYS
+
+# Réglages du .env chargés après l'import des modules (load_dotenv à la première connexion)
+
+
+@pytest.mark.parametrize("value, expected", [("0", {"w": 0}), ("majority", {"w": "majority", "j": False})])
+def test_bulk_write_concern_read_from_dotenv(dotenv_file, value, expected):
+    dotenv_file(BULK_WRITE_W=value)
+    loader = BulkLoader(get_collection(), workers=1)
+    try:
+        assert loader.bulk_collection.write_concern.document == expected
+    finally:
+        loader.executor.shutdown()
+
+def test_bulk_write_concern_default():
+    loader = BulkLoader(get_collection(), workers=1)
+    try:
+        assert loader.bulk_collection.write_concern.document == {"w": 1, "j": False}
+    finally:
+        loader.executor.shutdown()
+
+def test_storage_mode_read_from_dotenv(dotenv_file, patients_csv):
+    dotenv_file(STORAGE_MODE="compact")
+    assert migrate(drop=True, source=patients_csv, batch_size=16)
+    assert get_codec(get_collection()).mode == "compact"
+
+def test_storage_argument_wins_over_dotenv(dotenv_file, patients_csv):
+    dotenv_file(STORAGE_MODE="compact")
+    assert migrate(drop=True, source=patients_csv, batch_size=16, storage="standard")
+    assert get_codec(get_collection()).mode == "standard"
+
+def test_archive_retention_days(dotenv_file):
+    assert archive_retention_days() == DEFAULT_ARCHIVE_RETENTION_DAYS
+    dotenv_file(ARCHIVE_RETENTION_DAYS="30")
+    assert archive_retention_days() == 30
+
+@pytest.mark.parametrize("value", ["3 ans", "-1"])
+def test_invalid_archive_retention_days(dotenv_file, value):
+    dotenv_file(ARCHIVE_RETENTION_DAYS=value)
+    with pytest.raises(ValueError, match="ARCHIVE_RETENTION_DAYS"):
+        archive_retention_days()
+
+def test_profile_dir_read_from_dotenv(dotenv_file, tmp_path, monkeypatch):
+    monkeypatch.setitem(_profiling, "explicit", False)
+    directory = tmp_path / "profiles"
+    dotenv_file(PROFILE_DIR=directory)
+    with profile("phase"):
+        sum(range(100))
+    assert sorted(path.suffix for path in directory.iterdir()) == [".prof", ".txt"]
+
+def test_explicit_profiling_wins_over_dotenv(dotenv_file, tmp_path, monkeypatch):
+    monkeypatch.setitem(_profiling, "explicit", False)
+    dotenv_file(PROFILE_DIR=tmp_path / "from_env")
+    disable_profiling()
+    with profile("phase"):
+        pass
+    assert not (tmp_path / "from_env").exists()
+    enable_profiling(str(tmp_path / "explicit"))
+    with profile("phase"):
+        pass
+    assert (tmp_path / "explicit").exists()